@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_d5_parser.py - '-d+5' parser throughput benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the throughput of the '-d+5' parser on a synthetic log, in lines per
+second.
+
+The log mimics real '-d+5' rule flow: each target is built by a few nested
+calls of declared rules, among many more calls of builtin rules, variable
+settings and dependencies. For comparison, the parser is also run with the
+original line handling, which read the log in text mode and tried each kind
+of line in turn, and with the previous handling, which scanned the lines
+found by the shared log scanner but still tried each kind of line in turn.
+Each is timed several times, and the fastest run is reported.
+
+Run from the repository root:
+
+    $ python3 bench/bench_d5_parser.py [-n NUM_LINES] [-r REPEAT]
+
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import parsers
+
+
+# Rule flow for each target.
+_TARGET_LINES = [
+    ">> Main prog{0} : file{0}.c",
+    ">>>> MainFromObjects prog{0} : file{0}.o",
+    ">>>>>> local _s = $(>:G=$(SOURCE_GRIST)) ;",
+    ">>>>>> if $(_s) != \"\" && $(SUFOBJ) = .o",
+    ">>>>>> Depends prog{0} : file{0}.o",
+    ">>>>>> set LINKLIBS on prog{0} = -lm -lc",
+    ">>>>>> Objects file{0}.c",
+    ">>>>>>>> for _i in file{0}.c",
+    ">>>>>>>> Object file{0}.o : file{0}.c",
+    ">>>>>>>>>> MakeLocate file{0}.o : $(LOCATE_TARGET)",
+    ">>>>>>>>>>>> if $(>) && ! $(<:D)",
+    ">>>>>>>>>>>> set LOCATE on file{0}.o = obj/dir{1}",
+    ">>>>>>>>>>>> Depends file{0}.o : dir{1}",
+    ">>>>>>>>>> set HDRS on file{0}.o = include src/dir{1}",
+    ">>>>>>>>>> switch $(>:S)",
+    ">>>>>>>>>> Cc file{0}.o : file{0}.c",
+    ">>>>>>>>>>>> Depends file{0}.o : file{0}.c",
+    ">>>>>>>>>>>> set CCFLAGS on file{0}.o = -O2 -g -Wall",
+    ">>>>>>>>>> Includes file{0}.c : hdr{2}.h hdr{3}.h",
+    ">>>>>>>> return $(_t) ;",
+]
+_RULES = ("Main", "MainFromObjects", "Objects", "Object", "MakeLocate", "Cc")
+
+
+def write_log(f, num_lines):
+    """Write roughly num_lines of synthetic '-d+5' output to a file."""
+    for rule in _RULES:
+        f.write(">> rule {}\n".format(rule))
+    for i in range(num_lines // len(_TARGET_LINES)):
+        for line in _TARGET_LINES:
+            f.write(line.format(i, i % 97, i % 501, (i * 7) % 501))
+            f.write("\n")
+
+
+class _OriginalD5Parser(parsers.D5Parser):
+    """The '-d+5' parser with its original, line by line, handling."""
+    def parse_logfile(self, filename):
+        self.rule_stack = [dict()]
+        with open(filename, errors="ignore") as logfile:
+            for line in logfile:
+                self.parse_line(line)
+
+    def parse_line(self, line):
+        words = line.split()
+        if len(words) < 2:
+            return
+        if not words[0].startswith(">"):
+            return
+
+        while len(self.rule_stack) > self.get_rule_depth(words[0]):
+            self.rule_stack.pop()
+        self.rule_stack.append({"line": line})
+
+        for parse_fn in (self._parse_decl_line, self._parse_set_line,
+                         self._parse_dep_line, self._parse_inc_line,
+                         self._parse_call_line):
+            if parse_fn(words):
+                return
+
+    def _parse_decl_line(self, words):
+        if words[1] == "rule" and len(words) == 3:
+            self.db.declare_rule(words[2])
+            return True
+        return False
+
+    def _parse_set_line(self, words):
+        if (len(words) > 5
+                and words[1] == "set"
+                and words[3] == "on"
+                and "=" in words[5:]):
+            for target_name in words[4:words.index("=")]:
+                targ = self.db.get_target(target_name)
+                targ.set_var_value(words[2], words[words.index("=")+1:])
+            return True
+        return False
+
+    def _parse_dep_line(self, words):
+        if (len(words) > 3
+                and (words[1] == "Depends" or words[1] == "DEPENDS")
+                and ":" in words[3:]):
+            for x_string in words[2:words.index(":")]:
+                x_targ = self.db.get_target(x_string)
+                for y_string in words[words.index(":")+1:]:
+                    x_targ.add_dependency(self.db.get_target(y_string))
+            return True
+        return False
+
+    def _parse_inc_line(self, words):
+        if (len(words) > 3
+                and (words[1] == "Includes" or words[1] == "INCLUDES")
+                and ":" in words[3:]):
+            for x_string in words[2:words.index(":")]:
+                x_targ = self.db.get_target(x_string)
+                for y_string in words[words.index(":")+1:]:
+                    x_targ.add_inclusion(self.db.get_target(y_string))
+            return True
+        return False
+
+    def _parse_call_line(self, words):
+        if self.db.get_rule(words[1]) is not None:
+            # Calls are stored by ID, as in the current parser, so that only
+            # the handling of lines differs.
+            caller = None
+            if len(self.rule_stack) > 1:
+                if "rule_call" in self.rule_stack[-2]:
+                    caller = self.rule_stack[-2]["rule_call"]
+            call = self.db.add_call(self.db.get_rule(words[1]), words[2:],
+                                    caller)
+            self.rule_stack[-1]["rule_call"] = call
+            return True
+        return False
+
+
+class _PreviousD5Parser(parsers.D5Parser):
+    """
+    The '-d+5' parser with its previous handling: each line found by the log
+    scanner is split in full, and then each kind of line is tried in turn.
+    """
+    bulk_re = None
+
+    def parse_logfile(self, filename):
+        self.rule_stack = [dict()]
+        super(parsers.D5Parser, self).parse_logfile(filename)
+
+    def scan_line(self, line):
+        words = line.split()
+        if len(words) < 2:
+            return None
+        if not words[0].startswith(">"):
+            return None
+        depth = self.get_rule_depth(words[0])
+        return (self._scan_decl_line(words) or
+                self._scan_set_line(words) or
+                self._scan_dep_line(words, ("Depends", "DEPENDS"), "dep") or
+                self._scan_dep_line(words, ("Includes", "INCLUDES"), "inc") or
+                ("call", words[1], words[2:]),
+                depth)
+
+    def _scan_decl_line(self, words):
+        if words[1] == "rule" and len(words) == 3:
+            return ("decl", words[2])
+        return None
+
+    def _scan_set_line(self, words):
+        if (len(words) > 5
+                and words[1] == "set"
+                and words[3] == "on"
+                and "=" in words[5:]):
+            return ("set", words[2], words[4:words.index("=")],
+                    words[words.index("=")+1:])
+        return None
+
+    def _scan_dep_line(self, words, keywords, kind):
+        if (len(words) > 3
+                and words[1] in keywords
+                and ":" in words[3:]):
+            return (kind, words[2:words.index(":")],
+                    words[words.index(":")+1:])
+        return None
+
+    def apply_record(self, record):
+        (kind, *args), depth = record
+        while len(self.rule_stack) > depth:
+            self.rule_stack.pop()
+        self.rule_stack.append(dict())
+        if kind == "decl":
+            self.db.declare_rule(*args)
+        elif kind == "set":
+            variable_name, target_names, values = args
+            for target_name in target_names:
+                self.db.get_target(target_name).set_var_value(variable_name,
+                                                              values)
+        elif kind in ("dep", "inc"):
+            x_strings, y_strings = args
+            if not y_strings:
+                self.db.get_targets(x_strings)
+            self.db.load_edges((x_string, y_string, kind)
+                               for x_string in x_strings
+                               for y_string in y_strings)
+        else:
+            rule_name, call_args = args
+            rule_object = self.db.get_rule(rule_name)
+            if rule_object is not None:
+                caller = None
+                if (len(self.rule_stack) > 1 and
+                        "rule_call" in self.rule_stack[-2]):
+                    caller = self.rule_stack[-2]["rule_call"]
+                call = self.db.add_call(rule_object, call_args, caller)
+                self.rule_stack[-1]["rule_call"] = call
+
+
+def run(parser_cls, logfile):
+    """Return the time taken to parse a log file with a parser class."""
+    db = database.Database()
+    parser = parser_cls(db)
+    start = time.perf_counter()
+    parser.parse_logfile(logfile)
+    # Include packing the graph, as is done after parsing the log.
+    db.compact()
+    return time.perf_counter() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-lines", type=int, default=2000000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".log") as f:
+        write_log(f, args.num_lines)
+        f.flush()
+        num_lines = sum(1 for _ in open(f.name))
+
+        print("{} lines".format(num_lines))
+        times = {}
+        for label, parser_cls in (("original", _OriginalD5Parser),
+                                  ("previous", _PreviousD5Parser),
+                                  ("current", parsers.D5Parser)):
+            elapsed = []
+            for _ in range(args.repeat):
+                # Don't charge this run for freeing the last one's database.
+                gc.collect()
+                elapsed.append(run(parser_cls, f.name))
+            times[label] = min(elapsed)
+            print("{:<10} {:8.2f}s {:12.0f} lines/s".format(
+                label, times[label], num_lines / times[label]))
+        print("speedup over original: {:.2f}x, over previous: {:.2f}x".format(
+            times["original"] / times["current"],
+            times["previous"] / times["current"]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_dd_parser.py - '-dd' parser throughput benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the throughput of the '-dd' parser on a synthetic log, in edges per
+second.
+
+The log mimics real '-dd' output: objects depending on their sources, and
+sources including a shared pool of headers. For comparison, the parser is
+also run with the original line handling, which read the log in text mode
+and added each edge to the database separately.
+
+Run from the repository root:
+
+    $ python3 bench/bench_dd_parser.py [-n NUM_EDGES]
+
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import parsers
+
+
+# Number of headers each source includes.
+_INCLUDES_PER_SOURCE = 8
+
+
+def write_log(f, num_edges):
+    """Write roughly num_edges edges of synthetic '-dd' output to a file."""
+    edges_per_object = 2 + _INCLUDES_PER_SOURCE
+    for i in range(num_edges // edges_per_object):
+        obj = "<grist!dir{}>file{}.o".format(i % 97, i)
+        src = "<grist!dir{}>file{}.c".format(i % 97, i)
+        f.write('Depends "all" : "{}" ;\n'.format(obj))
+        f.write('Depends "{}" : "{}" ;\n'.format(obj, src))
+        for j in range(_INCLUDES_PER_SOURCE):
+            f.write('Includes "{}" : "<hdr>header{}.h" ;\n'.format(
+                src, (i * 7 + j * 13) % 5000))
+
+
+class _OriginalDDParser(parsers.DDParser):
+    """The '-dd' parser with its original, line by line, handling."""
+    def parse_logfile(self, filename):
+        with open(filename, errors="ignore") as logfile:
+            for line in logfile:
+                self.parse_line(line)
+
+    def apply_record(self, record):
+        first_word, x, y = record
+        x_target = self.db.get_target(x)
+        y_target = self.db.get_target(y)
+        if first_word == "Depends":
+            x_target.add_dependency(y_target)
+        elif first_word == "Includes":
+            x_target.add_inclusion(y_target)
+
+
+def run(parser_cls, logfile):
+    """Return the time taken to parse a log file with a parser class."""
+    db = database.Database()
+    parser = parser_cls(db)
+    start = time.perf_counter()
+    parser.parse_logfile(logfile)
+    # Include packing the graph, as is done after parsing the log.
+    db.compact()
+    return time.perf_counter() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-edges", type=int, default=2000000)
+    args = parser.parse_args(argv)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".log") as f:
+        write_log(f, args.num_edges)
+        f.flush()
+        num_edges = sum(1 for _ in open(f.name))
+
+        print("{} edges".format(num_edges))
+        for label, parser_cls in (("original", _OriginalDDParser),
+                                  ("current", parsers.DDParser)):
+            # Don't charge this run for freeing the last one's database.
+            gc.collect()
+            elapsed = run(parser_cls, f.name)
+            print("{:<10} {:8.2f}s {:12.0f} edges/s".format(
+                label, elapsed, num_edges / elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
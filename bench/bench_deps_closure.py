@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_deps_closure.py - Transitive dependency query benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the time and peak memory taken by all_deps() queries.
+
+Builds a layered graph shaped like a large jam build - each target depends on
+a few targets in the layer below - and runs a query on a leaf target, on a
+top-level target, and on a sample of targets from every layer. Each
+workload starts with an empty memo. For comparison, the
+same queries are run with a copy of the previous implementation, which
+memoized a bitmask of every component's closure over the whole graph.
+
+Run from the repository root:
+
+    $ python3 bench/bench_deps_closure.py [-n NUM_TARGETS]
+
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import query
+
+
+# Number of targets in each layer of the graph, and the number of targets in
+# the layer below that each depends on.
+_LAYER_WIDTH = 500
+_DEPS_PER_TARGET = 4
+
+
+class _MaskDepsClosure:
+    """Copy of the previous implementation, with a bitmask per component."""
+    def __init__(self, db):
+        self._targets = db._target_list
+        self._structure = query._graph_structure_of(db)
+        self._masks = {}
+
+    def all_deps(self, target):
+        mask = self._deps_mask(target)
+        bits = bin(mask)[:1:-1]
+        result = []
+        idx = bits.find("1")
+        while idx != -1:
+            result.append(self._targets[idx])
+            idx = bits.find("1", idx + 1)
+        return result
+
+    def _deps_mask(self, target):
+        structure = self._structure
+        component = structure.component_of(target._id)
+        if structure.is_cyclic(component):
+            return self._component_mask(component)
+        mask = 0
+        for succ in structure.successors(component):
+            mask |= self._component_mask(succ)
+        return mask
+
+    def _component_mask(self, root):
+        masks = self._masks
+        if root in masks:
+            return masks[root]
+        successors = self._structure.successors
+        work = [(root, iter(successors(root)))]
+        while work:
+            component, it = work[-1]
+            for succ in it:
+                if succ not in masks:
+                    work.append((succ, iter(successors(succ))))
+                    break
+            else:
+                work.pop()
+                mask = 0
+                for member in self._structure.members(component):
+                    mask |= 1 << member
+                for succ in successors(component):
+                    mask |= masks[succ]
+                masks[component] = mask
+        return masks[root]
+
+
+def build(num_targets):
+    """Return a database holding a layered graph of num_targets targets."""
+    rand = random.Random(0)
+    db = database.Database()
+    targets = db.get_targets("t{}".format(idx) for idx in range(num_targets))
+    edges = []
+    for idx in range(num_targets - _LAYER_WIDTH):
+        below = (idx // _LAYER_WIDTH + 1) * _LAYER_WIDTH
+        for dep in rand.sample(range(below, min(below + _LAYER_WIDTH,
+                                                num_targets)),
+                               _DEPS_PER_TARGET):
+            edges.append((idx, dep, "dep"))
+    db.load_edges(edges)
+    db.compact()
+    return db, targets
+
+
+def measure(db, targets, make_closure):
+    """
+    Return (seconds, peak bytes) to run each query in turn.
+
+    The queries are timed, then run again against a fresh memo under
+    tracemalloc, which would otherwise slow them down.
+
+    """
+    closure = make_closure(db)
+    gc.collect()
+    start = time.perf_counter()
+    for target in targets:
+        closure.all_deps(target)
+    elapsed = time.perf_counter() - start
+
+    closure = make_closure(db)
+    gc.collect()
+    tracemalloc.start()
+    for target in targets:
+        closure.all_deps(target)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-targets", type=int, default=60000)
+    args = parser.parse_args(argv)
+
+    db, targets = build(args.num_targets)
+    # Graph structure is shared with other queries, so build it up front
+    # rather than charging it to the previous implementation.
+    query._graph_structure_of(db)
+    sample = random.Random(1).sample(targets, 200)
+    workloads = [
+        ("leaf target", targets[-1:]),
+        ("top target", targets[:1]),
+        ("200 random targets", sample),
+    ]
+    print("{} targets".format(len(targets)))
+    print("{:<20} {:<10} {:>10} {:>12}".format("queries", "version",
+                                               "seconds", "peak MB"))
+    for label, queried in workloads:
+        for version, make_closure in (("previous", _MaskDepsClosure),
+                                      ("current", query._DepsClosure)):
+            elapsed, peak = measure(db, queried, make_closure)
+            print("{:<20} {:<10} {:>10.3f} {:>12.1f}".format(
+                label, version, elapsed, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_dm_parser.py - '-dm' parser throughput benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the throughput of the '-dm' parser on a synthetic log.
+
+The log mimics real '-dm' output: each target gets make/time/bind/made lines,
+and these are interspersed with (far more) lines of other build output that
+the parser has to skip. For comparison, the parser is also run with the
+original line handling, which tried all four regexes on every line.
+
+Run from the repository root:
+
+    $ python3 bench/bench_dm_parser.py [-n NUM_LINES]
+
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import parsers
+
+
+# Lines of other output per target.
+_NOISE_LINES = [
+    "gcc -c -O2 -Isrc -o obj/file{0}.o src/file{0}.c\n",
+    "src/file{0}.c: In function 'main':\n",
+    "src/file{0}.c:12: warning: unused variable 'x'\n",
+    "...patience...\n",
+    "Link bin/prog{0}\n",
+    "Updating obj/file{0}.o\n",
+]
+
+
+def write_log(f, num_lines):
+    """Write roughly num_lines of synthetic '-dm' output to a file."""
+    lines_per_target = 4 + len(_NOISE_LINES)
+    for i in range(num_lines // lines_per_target):
+        name = "<grist!dir{}>file{}.o".format(i % 97, i)
+        day = 1 + i % 28
+        f.write("make\t--\t  {}\n".format(name))
+        f.write("time\t--\t  {}: Mon Nov {:2} 10:{:02}:00 2015\n".format(
+            name, day, i % 60))
+        f.write("bind\t--\t  {}: /build/obj/file{}.o\n".format(name, i))
+        for noise in _NOISE_LINES:
+            f.write(noise.format(i))
+        f.write("made+\tupdate\t  {}\n".format(name))
+
+
+class _OriginalDMParser(parsers.DMParser):
+    """The '-dm' parser with its original, untargeted, line handling."""
+    def parse_logfile(self, filename):
+        with open(filename, errors="ignore") as logfile:
+            for line in logfile:
+                self.parse_line(line)
+
+    def parse_line(self, line):
+        logging.debug("Parsing line %s" % line)
+        for scan_fn in (self.scan_make_line, self.scan_time_line,
+                        self.scan_made_line, self.scan_bind_line):
+            record = scan_fn(line)
+            if record is not None:
+                self.apply_record(record)
+
+
+def run(parser_cls, logfile):
+    """Return the time taken to parse a log file with a parser class."""
+    parser = parser_cls(database.Database())
+    start = time.perf_counter()
+    parser.parse_logfile(logfile)
+    return time.perf_counter() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-lines", type=int, default=2000000)
+    args = parser.parse_args(argv)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".log") as f:
+        write_log(f, args.num_lines)
+        f.flush()
+        num_lines = sum(1 for _ in open(f.name))
+
+        print("{} lines".format(num_lines))
+        for label, parser_cls in (("original", _OriginalDMParser),
+                                  ("current", parsers.DMParser)):
+            elapsed = run(parser_cls, f.name)
+            print("{:<10} {:8.2f}s {:12.0f} lines/s".format(
+                label, elapsed, num_lines / elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_memory.py - Per-target memory overhead benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Report the memory used per target by the database.
+
+Builds a database shaped like a typical jam graph - a few targets with
+dependencies, rebuild info and variables, and many leaf headers with nothing
+but a name - and measures it with tracemalloc. For comparison, the same graph
+is also built from a copy of the original, eagerly-allocated target class.
+
+Run from the repository root:
+
+    $ python3 bench/bench_memory.py [-n NUM_TARGETS]
+
+"""
+
+import argparse
+import collections
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+
+
+class _EagerRebuildInfo:
+    def __init__(self):
+        self.reason = None
+        self.dep = None
+
+
+class _EagerTarget:
+    """Copy of the target layout before slots and lazy allocation."""
+    def __init__(self, name):
+        self.name = name
+        self.deps = []
+        self.deps_rev = set()
+        self.incs = []
+        self.incs_rev = set()
+        self.timestamp = None
+        self.binding = None
+        self.rebuilt = False
+        self.rebuild_info = _EagerRebuildInfo()
+        self.timestamp_chain = None
+        self.variables = collections.OrderedDict()
+        self.rule_calls = collections.OrderedDict()
+
+    def add_dependency(self, other):
+        if self not in other.deps_rev:
+            self.deps.append(other)
+            other.deps_rev.add(self)
+
+    def set_var_value(self, variable_name, values):
+        self.variables[variable_name] = values
+
+
+class _EagerDatabase:
+    def __init__(self):
+        self._targets = collections.OrderedDict()
+
+    def get_target(self, name):
+        try:
+            target = self._targets[name]
+        except KeyError:
+            target = _EagerTarget(name)
+            self._targets[name] = target
+        return target
+
+
+def build(db, num_targets):
+    """Populate a database with a graph of roughly num_targets targets."""
+    # One object file per ten headers, each depending on its ten headers.
+    names = ["<grist!dir{}>file{}.h".format(i % 97, i)
+             for i in range(num_targets)]
+    for obj_idx in range(num_targets // 10):
+        obj = db.get_target("<grist!obj>obj{}.o".format(obj_idx))
+        obj.set_var_value("CFLAGS", ["-O2", "-g"])
+        for name in names[obj_idx * 10:obj_idx * 10 + 10]:
+            obj.add_dependency(db.get_target(name))
+    return names
+
+
+def measure(make_db, num_targets, compact=False):
+    """Return (bytes per target, number of targets) for a database."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    db = make_db()
+    build(db, num_targets)
+    if compact:
+        db.compact()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    count = len(db._targets)
+    return (after - before) / count, count
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-targets", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    rows = [
+        ("eager (original layout)", _EagerDatabase, False),
+        ("slots + lazy containers", database.Database, False),
+        ("slots + lazy, compacted", database.Database, True),
+    ]
+    print("{:<28} {:>12} {:>16}".format("layout", "targets", "bytes/target"))
+    for label, make_db, compact in rows:
+        per_target, count = measure(make_db, args.num_targets, compact)
+        print("{:<28} {:>12} {:>16.1f}".format(label, count, per_target))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
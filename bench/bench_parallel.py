@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_parallel.py - Parallel parsing benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the time to parse synthetic '-dd' and '-d+5' logs with one process
+and with several.
+
+The logs are the ones from bench_dd_parser.py and bench_d5_parser.py. As
+well as the total time for each number of jobs, the time the main process
+spends merging the scanned chunks into the database is given separately:
+that's the part of parsing that isn't spread across the worker processes,
+so it limits how much quicker parsing can get with more jobs (and more
+CPUs).
+
+Run from the repository root:
+
+    $ python3 bench/bench_parallel.py [-n NUM_LINES] [-j JOBS] [-r REPEAT]
+
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import parsers
+from jamjar.parsers import _parallel
+from jamjar.parsers import _scan
+
+import bench_d5_parser
+import bench_dd_parser
+
+
+def run(logfile, parser_opts, jobs):
+    """Return the time taken to parse a log file with some number of jobs."""
+    db = database.Database()
+    gc.collect()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsers.parse(db, logfile, parser_opts, jobs=jobs)
+    # Include packing the graph, as is done after parsing the log.
+    db.compact()
+    return time.perf_counter() - start
+
+
+def run_merge(logfile, parser_opts, jobs):
+    """
+    Return the time the main process takes to merge the chunks of a log
+    parsed with some number of jobs: receiving the records scanned from each
+    chunk, and applying them.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser_clses = parsers._parser_classes(parser_opts)
+    chunks = [pickle.dumps(_parallel._scan_chunk(parser_clses, logfile,
+                                                 start, end))
+              for start, end in _parallel._chunk_ranges(
+                  logfile, jobs * _parallel._CHUNKS_PER_JOB)]
+    db = database.Database()
+    apply_fns = [parser_cls(db).apply_record for parser_cls in parser_clses]
+    gc.collect()
+    with _scan.paused_gc():
+        start = time.perf_counter()
+        for chunk in chunks:
+            _parallel._apply_records(apply_fns, pickle.loads(chunk))
+        return time.perf_counter() - start
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-lines", type=int, default=2000000)
+    parser.add_argument("-j", "--jobs", type=int, default=4)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print("{} CPUs".format(os.cpu_count()))
+    print("{:<6} {:>6} {:>10} {:>10}".format("log", "jobs", "seconds",
+                                             "merging"))
+    for label, write_log, parser_opts in (
+            ("-dd", bench_dd_parser.write_log, "d"),
+            ("-d+5", bench_d5_parser.write_log, "5")):
+        with tempfile.NamedTemporaryFile("w", suffix=".log") as f:
+            write_log(f, args.num_lines)
+            f.flush()
+            for jobs in (1, args.jobs):
+                # Take the best of a few runs, to reduce the noise.
+                elapsed = min(run(f.name, parser_opts, jobs)
+                              for _ in range(args.repeat))
+                merging = ("" if jobs == 1 else "{:10.2f}".format(
+                    min(run_merge(f.name, parser_opts, jobs)
+                        for _ in range(args.repeat))))
+                print("{:<6} {:>6} {:10.2f} {:>10}".format(
+                    label, jobs, elapsed, merging))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
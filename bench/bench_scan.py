@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------------------
+# bench_scan.py - Log scanning throughput benchmark
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+Measure the throughput of parsing a synthetic log, most of which is of no
+interest to the parsers.
+
+The log mimics '-d+5' output from a build: each target gets a few rule calls
+and dependencies, and the statements in the rules' bodies, among far more
+lines of other build output. For comparison,
+the log is also parsed by reading it in text mode and handing every line to
+every parser, as was originally done. Both include packing the graph, as is
+done after parsing a log.
+
+Run from the repository root:
+
+    $ python3 bench/bench_scan.py [-n NUM_LINES] [-d PARSERS]
+
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jamjar import database
+from jamjar import parsers
+
+
+# Lines of other output per target.
+_NOISE_LINES = [
+    "gcc -c -O2 -Isrc -o obj/file{0}.o src/file{0}.c\n",
+    "src/file{0}.c: In function 'main':\n",
+    "src/file{0}.c:12: warning: unused variable 'x'\n",
+    "    int x = {0};\n",
+    "        ^\n",
+    "...patience...\n",
+    "Link bin/prog{0}\n",
+    "Updating obj/file{0}.o\n",
+    "Chmod1 bin/prog{0}\n",
+    "...found {0} targets...\n",
+]
+
+# Statements in the body of each rule call.
+_STATEMENT_LINES = [
+    ">>>> local _s = src/file{0}.c ;\n",
+    ">>>> if $(_s) != \"\"\n",
+    ">>>> for _i in $(_s)\n",
+    ">>>> switch $(_i:S)\n",
+    ">>>> return $(_s) ;\n",
+]
+
+
+def write_log(f, num_lines):
+    """Write roughly num_lines of synthetic '-d+5' output to a file."""
+    f.write(">> rule Object\n")
+    lines_per_target = 4 + len(_STATEMENT_LINES) + len(_NOISE_LINES)
+    for i in range(num_lines // lines_per_target):
+        f.write(">> Object obj/file{0}.o : src/file{0}.c\n".format(i))
+        for statement in _STATEMENT_LINES:
+            f.write(statement.format(i))
+        f.write(">>>> set SOURCE on obj/file{0}.o = src/file{0}.c\n"
+                .format(i))
+        f.write(">>>> Depends obj/file{0}.o : src/file{0}.c\n".format(i))
+        for noise in _NOISE_LINES:
+            f.write(noise.format(i))
+        f.write(">> Includes src/file{0}.c : src/file{0}.h\n".format(i))
+
+
+def run_original(parser_clses, logfile):
+    """Parse a log, handing every line to every parser."""
+    db = database.Database()
+    parse_fns = [parser_cls(db).parse_line for parser_cls in parser_clses]
+    with open(logfile, errors="ignore") as f:
+        for line in f:
+            for parse_fn in parse_fns:
+                parse_fn(line)
+    db.compact()
+
+
+def run_current(parser_clses, logfile):
+    """Parse a log, scanning it for lines of interest."""
+    db = database.Database()
+    parsers._scan.parse_logfile([parser_cls(db)
+                                 for parser_cls in parser_clses], logfile)
+    db.compact()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-lines", type=int, default=2000000)
+    parser.add_argument("-d", "--parsers", default="5")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser_clses = parsers._parser_classes(args.parsers)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".log") as f:
+        write_log(f, args.num_lines)
+        f.flush()
+        num_lines = sum(1 for _ in open(f.name))
+
+        print("{} lines, {}".format(
+            num_lines, ", ".join(cls.__name__ for cls in parser_clses)))
+        for label, run in (("original", run_original),
+                           ("current", run_current)):
+            # Don't charge this run for freeing the last one's database.
+            gc.collect()
+            start = time.perf_counter()
+            run(parser_clses, f.name)
+            elapsed = time.perf_counter() - start
+            print("{:<10} {:8.2f}s {:12.0f} lines/s".format(
+                label, elapsed, num_lines / elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,41 +8,224 @@
 
 
 import argparse
+import contextlib
 import sys
 
+from . import batch
 from . import database
 from . import parsers
+from . import server
+from . import snapshot
 from . import ui
 
 
 def parse_args(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("-f", "--logfile",
-                        help="Path to the jam log file to parse",
-                        required=True)
+                        help="Path to the jam log file to parse, which may "
+                             "be compressed. May be given more than once "
+                             "with --serve",
+                        dest="logfiles",
+                        action="append",
+                        default=[])
     parser.add_argument("-d", "--parsers",
                         help="Jam debug options to run parsers for",
                         required=False,
                         default="dmc")
-    return parser.parse_args(argv)
+    parser.add_argument("-j", "--jobs",
+                        help="Number of processes to parse the log file with",
+                        type=int,
+                        default=1)
+    parser.add_argument("--follow",
+                        help="Keep parsing lines as they're appended to the "
+                             "log file, e.g. while jam is still running",
+                        action="store_true")
+    parser.add_argument("--no-cache",
+                        help="Always parse the log file, rather than loading "
+                             "a snapshot saved by a previous run",
+                        dest="cache",
+                        action="store_false")
+    parser.add_argument("--cache-dir",
+                        help="Directory to save parsed database snapshots in "
+                             "(default: ~/.cache/jamjar)",
+                        required=False)
+    parser.add_argument("-q", "--query",
+                        help="Run a query (e.g. 'deps TARGET') and print "
+                             "its result as JSON, rather than starting the "
+                             "interactive UI. May be given more than once",
+                        dest="queries",
+                        action="append",
+                        default=[])
+    parser.add_argument("--script",
+                        help="Run each query in a file ('-' for stdin), as "
+                             "for --query")
+    parser.add_argument("--serve",
+                        help="Load the log files, then serve queries on them "
+                             "at an address (HOST:PORT, or the path of a "
+                             "Unix socket) until interrupted",
+                        metavar="ADDRESS")
+    parser.add_argument("--connect",
+                        help="Query the logs served at an address, rather "
+                             "than loading a log file. -f picks the log, if "
+                             "more than one is being served",
+                        metavar="ADDRESS")
+    args = parser.parse_args(argv)
+    if args.follow and (args.queries or args.script):
+        parser.error("--follow can't be used with --query or --script")
+    if args.serve is not None and (args.follow or args.connect or
+                                   args.queries or args.script):
+        parser.error("--serve can't be used with --follow, --connect, "
+                     "--query or --script")
+    if args.connect is not None and (args.follow or args.queries or
+                                     args.script):
+        parser.error("--connect can't be used with --follow, --query or "
+                     "--script")
+    if not args.logfiles and args.connect is None:
+        parser.error("the following arguments are required: -f/--logfile")
+    if len(args.logfiles) > 1 and args.serve is None:
+        parser.error("Only one log file can be given, except with --serve")
+    args.logfile = args.logfiles[0] if args.logfiles else None
+    return args
+
+
+def load_database(args, logfile):
+    """Load the database for a log, from a snapshot if there's one cached."""
+    if args.follow:
+        # The log is still changing, so there's no point in caching it.
+        db = database.Database()
+        parsers.follow(db, logfile, args.parsers)
+        return db
+
+    if args.cache:
+        db = snapshot.load_cached(logfile, args.parsers,
+                                  cache_dir=args.cache_dir)
+        if db is not None:
+            return db
+
+    db = database.Database()
+    parsers.parse(db, logfile, args.parsers, jobs=args.jobs)
+    db.compact()
+
+    if args.cache:
+        try:
+            snapshot.save_cached(db, logfile, args.parsers,
+                                 cache_dir=args.cache_dir)
+        except OSError as e:
+            print("Unable to save database snapshot: {}".format(e))
+    return db
+
+
+def run_batch(db, args):
+    """
+    Run the queries given on the command line, printing JSON Lines.
+
+    :return:
+        Exit status: 1 if any query failed, otherwise 0.
+
+    """
+    queries = list(args.queries)
+    if args.script == "-":
+        queries.extend(sys.stdin)
+    elif args.script is not None:
+        with open(args.script) as f:
+            queries.extend(f)
+    num_failed = batch.run(db, queries, sys.stdout)
+    return 1 if num_failed else 0
+
+
+def serve(args):
+    """
+    Load each log file, then serve queries on them until interrupted.
+
+    :return:
+        Exit status.
+
+    """
+    dbs = {}
+    for logfile in args.logfiles:
+        try:
+            dbs[logfile] = load_database(args, logfile)
+        except (OSError, ValueError) as e:
+            print("Unable to read log file: {}".format(e))
+            return 1
+    try:
+        query_server = server.Server(dbs, args.serve)
+    except OSError as e:
+        print("Unable to serve at {}: {}".format(args.serve, e))
+        return 1
+    print("Serving {} on {}".format(", ".join(dbs), args.serve))
+    query_server.serve_forever()
+    return 0
+
+
+def connect(args):
+    """
+    Run the UI against the logs served at an address.
+
+    :return:
+        Exit status.
+
+    """
+    try:
+        client = server.Client(args.connect, log=args.logfile)
+    except OSError as e:
+        print("Unable to connect to {}: {}".format(args.connect, e))
+        return 1
+    with client:
+        try:
+            ui.RemoteUI(client).cmdloop()
+        except OSError as e:
+            print("Lost connection to {}: {}".format(args.connect, e))
+            return 1
+    return 0
 
 
 def main(argv):
+    """
+    Run jamjar.
+
+    :return:
+        Exit status.
+
+    """
     args = parse_args(argv)
-    db = database.Database()
-    parsers.parse(db, args.logfile, args.parsers)
+    if args.serve is not None:
+        return serve(args)
+    elif args.connect is not None:
+        return connect(args)
+
+    batch_mode = bool(args.queries) or args.script is not None
+    try:
+        # Only query results go to stdout in batch mode.
+        with contextlib.redirect_stdout(sys.stderr if batch_mode
+                                        else sys.stdout):
+            db = load_database(args, args.logfile)
+    except (OSError, ValueError) as e:
+        print("Unable to read log file: {}".format(e),
+              file=sys.stderr if batch_mode else sys.stdout)
+        return 1
+    if batch_mode:
+        try:
+            return run_batch(db, args)
+        except OSError as e:
+            print("Unable to read query script: {}".format(e),
+                  file=sys.stderr)
+            return 1
     cli_ui = ui.UI(db)
     cli_ui.cmdloop()
+    return 0
 
 
 if __name__ == "__main__":
     try:
-        main(sys.argv[1:])
-    except (KeyboardInterrupt, SystemExit):
-        # Exit gracefully.
-        pass
+        status = main(sys.argv[1:])
+    except KeyboardInterrupt:
+        # Exit gracefully, with the conventional status for SIGINT. Errors
+        # in the arguments raise SystemExit, which is left to set the status.
+        status = 130
     # Uncomment for debugging.
     #except Exception:
     #    import traceback; traceback.print_exc()
     #    import pdb; pdb.post_mortem()
+    sys.exit(status)
 
@@ -0,0 +1,138 @@
+#------------------------------------------------------------------------------
+# _index.py - Name index module
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Index for finding names that match a regex."""
+
+__all__ = (
+    "NameIndex",
+)
+
+
+import array
+import bisect
+import re
+
+try:
+    from re import _parser as _sre_parse
+except ImportError:
+    import sre_parse as _sre_parse
+
+
+# Shortest literal worth searching for. Shorter literals match too many names
+# to be worth it.
+_MIN_LITERAL_LEN = 3
+
+
+class NameIndex:
+    """
+    Index of names, supporting regex search.
+
+    Names are identified by their position, i.e. the order in which they were
+    added.
+
+    Rather than running the regex against every name, a literal substring
+    that any match must contain is extracted from the regex. All the names are
+    held in one string, which is searched for the literal, and only the names
+    containing it are checked against the regex.
+
+    """
+    def __init__(self):
+        self._names = []
+        # All indexed names, each followed by a newline, and the offsets in
+        # this string at which each name starts. Extended lazily, when
+        # searched.
+        self._blob = ""
+        self._starts = array.array("q")
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Add a name to the index."""
+        self._names.append(name)
+
+    def search(self, name_regex):
+        """
+        Iterator that yields the position of each name matching a regex.
+
+        Positions are yielded in ascending order.
+
+        :raises ValueError:
+            If the regex is invalid.
+
+        """
+        try:
+            pattern = re.compile(name_regex)
+        except re.error as e:
+            raise ValueError(str(e))
+
+        literal = _required_literal(name_regex)
+        if literal is None:
+            candidates = range(len(self._names))
+        else:
+            candidates = self._containing(literal)
+
+        names = self._names
+        for idx in candidates:
+            if pattern.search(names[idx]):
+                yield idx
+
+    def _containing(self, literal):
+        """Return the positions of names containing a substring."""
+        self._update_blob()
+        blob = self._blob
+        starts = self._starts
+        positions = []
+        offset = blob.find(literal)
+        while offset != -1:
+            idx = bisect.bisect_right(starts, offset) - 1
+            positions.append(idx)
+            # Skip any further occurrences in the same name.
+            if idx + 1 < len(starts):
+                offset = blob.find(literal, starts[idx + 1])
+            else:
+                break
+        return positions
+
+    def _update_blob(self):
+        """Add any names added since the last search to the blob."""
+        num_indexed = len(self._starts)
+        if num_indexed == len(self._names):
+            return
+        new_names = self._names[num_indexed:]
+        offset = len(self._blob)
+        for name in new_names:
+            self._starts.append(offset)
+            offset += len(name) + 1
+        self._blob += "\n".join(new_names) + "\n"
+
+
+def _required_literal(name_regex):
+    """
+    Return a literal string that all matches of a regex must contain.
+
+    Returns None if there isn't a literal long enough to be worth using.
+
+    """
+    try:
+        parsed = _sre_parse.parse(name_regex)
+    except re.error:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+
+    # Only look at the top level of the regex: any literal here must appear in
+    # every match, unlike literals within branches or repeats.
+    runs = [[]]
+    for op, arg in parsed:
+        if op == _sre_parse.LITERAL:
+            runs[-1].append(chr(arg))
+        elif runs[-1]:
+            runs.append([])
+    longest = max(("".join(run) for run in runs), key=len)
+    if len(longest) < _MIN_LITERAL_LEN or "\n" in longest:
+        return None
+    return longest
@@ -0,0 +1,293 @@
+#------------------------------------------------------------------------------
+# batch.py - Batch query module
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Non-interactive queries, with machine-readable output."""
+
+__all__ = (
+    "DEFAULT_CHAIN_LIMIT",
+    "QUERIES",
+    "changed_targets",
+    "parse_query",
+    "run_query",
+    "run_queries",
+    "run",
+)
+
+
+import json
+import shlex
+
+from . import query
+
+
+# Number of chains the dep_chains queries give, unless a limit is given.
+DEFAULT_CHAIN_LIMIT = 100
+
+
+def _names(targets):
+    return [target.name for target in targets]
+
+
+def _shortest_path(target, other):
+    path = query.shortest_path(target, other)
+    return None if path is None else _names(path)
+
+
+def _shortest_paths(target, other, *, k=1):
+    return [_names(path) for path in query.shortest_paths(target, other, k)]
+
+
+def _dep_chains(target, *, max_depth=0, limit=DEFAULT_CHAIN_LIMIT,
+                include_target=None):
+    return {
+        "count": query.count_dep_chains(target, max_depth=max_depth,
+                                        include_target=include_target),
+        "chains": [_names(chain) for chain in query.dep_chains(
+                       target, max_depth=max_depth,
+                       include_target=include_target, limit=limit)],
+    }
+
+
+def _dep_chains_rebuilt(target, *, limit=DEFAULT_CHAIN_LIMIT):
+    return _dep_chains(target, limit=limit,
+                       include_target=lambda target: target.rebuilt)
+
+
+def _rebuild_tree(target):
+    return [[depth, cause.name, repeated]
+            for depth, cause, repeated in query.rebuild_tree(target)]
+
+
+def _show(target):
+    timestamp = (target.timestamp_chain[-1].timestamp
+                 if target.timestamp_chain else target.timestamp)
+    return {
+        "name": target.name,
+        "deps": _names(target.deps),
+        "deps_rev": sorted(_names(target.deps_rev)),
+        "incs": _names(target.incs),
+        "incs_rev": sorted(_names(target.incs_rev)),
+        "variables": {name: list(values)
+                      for name, values in target.variables.items()},
+        "rule_calls": {target_type: [call.get_id() for call in calls]
+                       for target_type, calls in target.rule_calls.items()},
+        "timestamp": None if timestamp is None else str(timestamp),
+        "timestamp_chain": _names(target.timestamp_chain or ()),
+        "binding": target.binding,
+        "rebuilt": target.rebuilt,
+        "rebuild_reason": target.rebuild_info.reason,
+        "rebuild_dep": (None if target.rebuild_info.dep is None
+                        else target.rebuild_info.dep.name),
+    }
+
+
+# Queries that can be run, mapping each name to the number of targets it
+# takes, the names of any (integer) options it takes, and a function giving
+# its result (as something that can be converted to JSON) for those targets
+# and options. Results without a meaningful order are sorted, so that
+# they're reproducible.
+QUERIES = {
+    "deps": (1, (), lambda target: _names(query.deps(target))),
+    "deps_rebuilt": (1, (),
+                     lambda target: _names(query.deps_rebuilt(target))),
+    "rdeps": (1, (), lambda target: sorted(_names(query.rdeps(target)))),
+    "all_deps": (1, (), lambda target: _names(query.all_deps(target))),
+    "dep_count": (1, (), query.dep_count),
+    "dep_chain_count": (1, ("max_depth",), query.count_dep_chains),
+    "dep_chains": (1, ("max_depth", "limit"), _dep_chains),
+    "dep_chains_rebuilt": (1, ("limit",), _dep_chains_rebuilt),
+    "rebuilt": (1, (), lambda target: target.rebuilt),
+    "rebuild_causes": (1, (),
+                       lambda target: _names(query.rebuild_causes(target))),
+    "rebuild_tree": (1, (), _rebuild_tree),
+    "show": (1, (), _show),
+    "level": (1, (), query.level),
+    "cycle": (1, (), lambda target: _names(query.cycle(target))),
+    "depends_on": (2, (), query.depends_on),
+    "shortest_path": (2, (), _shortest_path),
+    "shortest_paths": (2, ("k",), _shortest_paths),
+}
+
+# Queries for the names of the targets matching a regex, mapping each name to
+# the database method that finds the targets.
+_REGEX_QUERIES = {
+    "targets": "find_targets",
+    "rebuilt_targets": "find_rebuilt_targets",
+}
+
+
+def changed_targets(db, names):
+    """
+    Find the targets for the names of changed targets or files.
+
+    Each name is looked up as a target name, or failing that as a file (see
+    :meth:`database.Database.targets_for_file`).
+
+    :return:
+        List of the targets, in the order they were created.
+
+    :raises ValueError:
+        If nothing is found for one of the names.
+
+    """
+    targets = {}
+    for name in names:
+        target = db.lookup_target(name)
+        found = [target] if target is not None else db.targets_for_file(name)
+        if not found:
+            raise ValueError("No such target or file: {}".format(name))
+        for target in found:
+            targets[target._id] = target
+    return [targets[target_id] for target_id in sorted(targets)]
+
+
+def _impact(db, names):
+    changed = changed_targets(db, names)
+    impacted = query.impact(changed)
+    return {
+        "changed": _names(changed),
+        "count": len(impacted),
+        "targets": _names(impacted),
+    }
+
+
+def parse_query(line):
+    """
+    Split a line of a query script into a query name and its arguments.
+
+    Arguments are separated by whitespace, and may be quoted as in a shell.
+    Anything after a # is a comment.
+
+    :return:
+        (name, args) tuple, or None if the line has no query on it.
+
+    :raises ValueError:
+        If the line can't be split (e.g. it has unbalanced quotes).
+
+    """
+    words = shlex.split(line, comments=True)
+    if not words:
+        return None
+    return words[0], words[1:]
+
+
+def run_query(db, name, args):
+    """
+    Run a single query.
+
+    Each query in :data:`QUERIES` takes target names, followed by any of its
+    options as name=value arguments (e.g. "dep_chains TARGET limit=10").
+    There are also "targets REGEX" and "rebuilt_targets REGEX", which give
+    the names of all (rebuilt) targets matching a regex, "impact NAME...",
+    which gives the targets affected by changes to the named targets or files
+    (see :func:`changed_targets` and :func:`query.impact`), and "cycles",
+    which gives all the dependency cycles.
+
+    :return:
+        The result of the query, as something that can be converted to JSON.
+
+    :raises ValueError:
+        If the query is unknown, is given the wrong arguments, or names a
+        target that doesn't exist.
+
+    """
+    if name in _REGEX_QUERIES:
+        _check_num_args(name, args, 1)
+        try:
+            return _names(getattr(db, _REGEX_QUERIES[name])(args[0]))
+        except ValueError as e:
+            raise ValueError("Invalid target regex: {}".format(e))
+
+    if name == "cycles":
+        _check_num_args(name, args, 0)
+        return [_names(cycle) for cycle in query.cycles(db)]
+
+    if name == "impact":
+        if not args:
+            raise ValueError("impact takes at least 1 argument")
+        return _impact(db, args)
+
+    try:
+        num_targets, option_names, query_fn = QUERIES[name]
+    except KeyError:
+        raise ValueError("Unknown query: {}".format(name))
+    _check_num_args(name, args[:num_targets], num_targets)
+    target_names = args[:num_targets]
+
+    options = {}
+    for arg in args[num_targets:]:
+        option_name, _, value = arg.partition("=")
+        if option_name not in option_names:
+            raise ValueError("Invalid option for {}: {}".format(name, arg))
+        try:
+            options[option_name] = int(value)
+        except ValueError:
+            raise ValueError("Invalid value for {}: {}".format(option_name,
+                                                              value))
+
+    targets = []
+    for target_name in target_names:
+        target = db.lookup_target(target_name)
+        if target is None:
+            raise ValueError("No such target: {}".format(target_name))
+        targets.append(target)
+    return query_fn(*targets, **options)
+
+
+def _check_num_args(name, args, num_args):
+    if len(args) != num_args:
+        raise ValueError("{} takes {} argument{}".format(
+            name, num_args, "" if num_args == 1 else "s"))
+
+
+def run_queries(db, lines):
+    """
+    Iterator that runs each query in a script.
+
+    :param lines:
+        Iterable of lines of the script, one query per line.
+
+    :return:
+        Iterator of a dictionary for each query, with the query's "query"
+        name and "args", and either its "result" or the "error" that stopped
+        it being run.
+
+    """
+    for line in lines:
+        try:
+            parsed = parse_query(line)
+        except ValueError as e:
+            yield {"query": line.strip(), "args": [], "error": str(e)}
+            continue
+        if parsed is None:
+            continue
+        name, args = parsed
+        output = {"query": name, "args": args}
+        try:
+            output["result"] = run_query(db, name, args)
+        except ValueError as e:
+            output["error"] = str(e)
+        yield output
+
+
+def run(db, lines, out):
+    """
+    Run each query in a script, writing the results to a file as JSON Lines.
+
+    Each result is written (and flushed) as soon as its query has run.
+
+    :return:
+        Number of queries that failed.
+
+    """
+    num_failed = 0
+    for output in run_queries(db, lines):
+        if "error" in output:
+            num_failed += 1
+        out.write(json.dumps(output))
+        out.write("\n")
+        out.flush()
+    return num_failed
@@ -14,8 +14,15 @@ __all__ = (
 )
 
 
+import array
+import bisect
 import collections
-import re
+import itertools
+import operator
+import sys
+import types
+
+from . import _index
 
 
 class Database:
@@ -23,11 +30,50 @@ class Database:
 
     # Mapping from target names to targets.
     _targets = None
+    # Targets indexed by ID, i.e. in the order they were created.
+    _target_list = None
+    # Index for finding targets by name, in the same order.
+    _target_index = None
+    # Mapping from filenames to the target (or list of targets, if there's
+    # more than one) with that filename.
+    _targets_by_filename = None
     _rules = None
+    _rule_list = None
+    _rule_index = None
+    # Every rule call, in the order they were made (see _CallTable).
+    _calls = None
+    # Mapping from each distinct value of a target specific variable to
+    # itself, so that equal values can be shared between targets.
+    _var_values = None
+    # Compact form of the dependency graph, if it has been built.
+    _graph = None
+    # Edges loaded by load_edges() that haven't been merged into the compact
+    # graph yet, as arrays of source and destination IDs for each kind of
+    # edge.
+    _pending_edges = None
+    # Incremented whenever the graph or rebuild info of any target changes.
+    _generation = 0
+    # Values derived from the database (see cached()), and the generation
+    # they were derived from.
+    _cache = None
+    _cache_generation = None
+    # Callables that apply pending updates to the database (see refresh()).
+    _refreshers = ()
 
     def __init__(self):
         self._targets = collections.OrderedDict()
+        self._target_list = []
+        self._target_index = _index.NameIndex()
+        self._targets_by_filename = {}
         self._rules = collections.OrderedDict()
+        self._rule_list = []
+        self._rule_index = _index.NameIndex()
+        self._calls = _CallTable()
+        self._var_values = {}
+        # Start with an empty compact graph, so edges can be bulk loaded
+        # straight into it.
+        self._install_graph(_Adjacency.from_rows(()),
+                            _Adjacency.from_rows(()))
 
     def __repr__(self):
         return "{}({} targets, {} rules)".format(type(self).__name__,
@@ -37,20 +83,325 @@ class Database:
     def get_target(self, name):
         """Get a target with a given name, creating it if necessary."""
         try:
-            target = self._targets[name]
+            return self._targets[name]
         except KeyError:
+            return self._create_targets((name,))[0]
+
+    def get_targets(self, names):
+        """
+        Get the targets with the given names, creating any that don't exist.
+
+        :return:
+            List of the targets, in the same order as the names.
+
+        """
+        names = list(names)
+        # Look up each distinct name once, then create the missing targets
+        # together, in the order they first appear.
+        distinct = list(dict.fromkeys(names))
+        found = dict(zip(distinct, map(self._targets.get, distinct)))
+        missing = [name for name, target in found.items() if target is None]
+        if missing:
+            found.update(zip(missing, self._create_targets(missing)))
+        return list(map(found.__getitem__, names))
+
+    def _create_targets(self, names):
+        """
+        Create targets with the given names, none of which exist yet.
+
+        :return:
+            List of the new targets.
+
+        """
+        targets = self._targets
+        target_list = self._target_list
+        first_id = len(target_list)
+        for name in names:
             target = Target(name)
-            self._targets[name] = target
-        return target
+            target._db = self
+            target._id = len(target_list)
+            targets[name] = target
+            target_list.append(target)
+            self._target_index.add(name)
+            self._add_filename(target)
+        # Values derived from the graph are sized by the number of targets,
+        # so need recomputing even though no edges have changed.
+        self._changed()
+        return target_list[first_id:]
+
+    def load_edges(self, edges):
+        """
+        Bulk load dependencies and inclusions.
+
+        This is equivalent to calling :meth:`Target.add_dependency` or
+        :meth:`Target.add_inclusion` for each edge in turn, but much quicker
+        for large numbers of edges. Rather than being checked for duplicates
+        and added to the graph one at a time, the edges are buffered, then
+        merged into the compact graph in one go when the graph is next used.
+
+        :param edges:
+            Iterable of (source, destination, kind) tuples, where kind is
+            "dep" (source depends on destination) or "inc" (source includes
+            destination). Sources and destinations are target names
+            (targets are created as necessary) or target IDs (indexes in the
+            order targets were created).
+
+        :raises ValueError:
+            If an edge's kind isn't valid.
+
+        """
+        edges = list(edges)
+        if not edges:
+            return
+        srcs, dsts, kinds = zip(*edges)
+        _check_edge_kinds(kinds)
+        pending_edges = self._start_loading_edges()
+
+        # Get the targets in the same order as adding the edges one at a time
+        # would.
+        ids = self._target_ids(itertools.chain.from_iterable(zip(srcs, dsts)))
+        src_ids = ids[::2]
+        dst_ids = ids[1::2]
+        for kind, (kind_srcs, kind_dsts) in pending_edges.items():
+            selectors = [edge_kind == kind for edge_kind in kinds]
+            kind_srcs.extend(itertools.compress(src_ids, selectors))
+            kind_dsts.extend(itertools.compress(dst_ids, selectors))
+
+    def load_indexed_edges(self, names, edges):
+        """
+        Bulk load dependencies and inclusions between a table of targets.
+
+        This is equivalent to :meth:`load_edges`, but the edges give their
+        sources and destinations as indexes in the table. Each target is only
+        looked up once, and the edges can be built (e.g. by a worker process
+        scanning a log) without access to the database.
+
+        :param names:
+            Table of target names or IDs, as for :meth:`load_edges`. Targets
+            that don't exist are created in the order of the table.
+        :param edges:
+            Mapping from kinds of edge ("dep" or "inc") to a pair of
+            sequences: the indexes in the table of the sources of the edges
+            of that kind, and of their destinations.
+
+        :raises ValueError:
+            If a kind of edge isn't valid.
+
+        """
+        _check_edge_kinds(edges)
+        ids = self._target_ids(names)
+        if not any(srcs for srcs, _ in edges.values()):
+            return
+        pending_edges = self._start_loading_edges()
+        for kind, (srcs, dsts) in edges.items():
+            kind_srcs, kind_dsts = pending_edges[kind]
+            kind_srcs.extend([ids[src] for src in srcs])
+            kind_dsts.extend([ids[dst] for dst in dsts])
+
+    def _start_loading_edges(self):
+        """
+        Get ready to bulk load edges.
+
+        :return:
+            The pending edges, to add the loaded edges to.
+
+        """
+        self._changed()
+        if self._graph is None:
+            # Edges have been added one at a time since the graph was last
+            # compacted, so compact it again.
+            self.compact()
+        if self._pending_edges is None:
+            self._pending_edges = {"dep": (array.array("I"), array.array("I")),
+                                   "inc": (array.array("I"), array.array("I"))}
+        return self._pending_edges
+
+    def _target_ids(self, names):
+        """
+        Get the IDs of targets, creating any that don't exist.
+
+        :param names:
+            Iterable of target names, or IDs (which are returned as is).
+
+        """
+        names = list(names)
+        # Look up each distinct name once, in the order they first appear.
+        distinct = dict.fromkeys(names)
+        target_names = [name for name in distinct
+                        if not isinstance(name, int)]
+        ids = dict(zip(target_names,
+                       map(_get_id, self.get_targets(target_names))))
+        return list(map(ids.get, names, names))
+
+    def _add_filename(self, target):
+        """Add a new target to the filename mapping."""
+        filename = target.filename()
+        existing = self._targets_by_filename.get(filename)
+        if existing is None:
+            self._targets_by_filename[filename] = target
+        elif isinstance(existing, list):
+            existing.append(target)
+        else:
+            self._targets_by_filename[filename] = [existing, target]
+
+    def targets_with_filename(self, filename):
+        """
+        Return all targets with a given filename (i.e. name without grist), in
+        the order they were created.
+        """
+        targets = self._targets_by_filename.get(filename, [])
+        if isinstance(targets, Target):
+            targets = [targets]
+        return list(targets)
+
+    def find_grists(self, filename):
+        """Return the grists of all targets with a given filename."""
+        return [target.grist()
+                for target in self.targets_with_filename(filename)]
+
+    def targets_for_file(self, path):
+        """
+        Return all targets for a file, in the order they were created.
+
+        These are the targets bound to the path (or to a path ending with
+        it, so a path relative to the top of the tree matches targets bound
+        to an absolute path), along with the targets whose filename is the
+        path.
+
+        """
+        basename = path.rpartition("/")[2]
+        suffix = "/" + path.lstrip("/")
+        targets = {target._id: target
+                   for target in self._targets_by_binding().get(basename, ())
+                   if target.binding == path
+                   or target.binding.endswith(suffix)}
+        for target in self.targets_with_filename(path):
+            targets.setdefault(target._id, target)
+        return [targets[target_id] for target_id in sorted(targets)]
+
+    def _targets_by_binding(self):
+        """Return a mapping from basenames of bindings to bound targets."""
+        def build():
+            by_basename = collections.defaultdict(list)
+            for target in self._target_list:
+                if target.binding:
+                    basename = target.binding.rpartition("/")[2]
+                    by_basename[basename].append(target)
+            return by_basename
+        return self.cached("targets_by_binding", build)
+
+    def cached(self, key, factory):
+        """
+        Get a value derived from the contents of the database.
+
+        The value is computed by calling factory() the first time it's
+        requested, and again if the database has been modified since.
+
+        """
+        if self._cache_generation != self._generation:
+            self._cache = {}
+            self._cache_generation = self._generation
+        try:
+            value = self._cache[key]
+        except KeyError:
+            value = factory()
+            self._cache[key] = value
+        return value
+
+    def _changed(self):
+        """Note that the database has been modified."""
+        self._generation += 1
+
+    def add_refresher(self, refresher):
+        """Register a callable to be called by refresh()."""
+        self._refreshers = self._refreshers + (refresher,)
+
+    def refresh(self):
+        """
+        Apply any pending updates to the database.
+
+        Updates are pending if the database is being populated from a log
+        that's still being written (see :class:`jamjar.parsers.Follower`).
+
+        """
+        for refresher in self._refreshers:
+            refresher()
+
+    def lookup_target(self, name):
+        """Get the target with a given name, returns None if not existant"""
+        return self._targets.get(name)
+
+    def compact(self):
+        """
+        Pack the dependency graph into arrays of target IDs.
+
+        This drops the per-target containers holding dependencies and
+        inclusions (and their reverse mappings), greatly reducing the memory
+        used by large graphs. Targets' attributes are unchanged, other than
+        that the sequences they return are immutable.
+
+        This is intended to be called once parsing is complete: if the graph
+        is subsequently modified, the per-target containers are rebuilt.
+
+        """
+        if self._current_graph() is None:
+            self._install_graph(*self._adjacency())
+
+    def _current_graph(self):
+        """Return the compact graph, with any bulk loaded edges merged in."""
+        if self._pending_edges is not None:
+            pending = self._pending_edges
+            self._pending_edges = None
+            deps, incs = self._graph.adjacency()
+            num_nodes = len(self._target_list)
+            self._install_graph(deps.merged(*pending["dep"], num_nodes),
+                                incs.merged(*pending["inc"], num_nodes))
+        return self._graph
+
+    def _adjacency(self):
+        """Return the (deps, incs) adjacency lists of the dependency graph."""
+        if self._current_graph() is not None:
+            return self._graph.adjacency()
+        return (_Adjacency.from_rows([dep._id for dep in target.deps]
+                                     for target in self._target_list),
+                _Adjacency.from_rows([inc._id for inc in target.incs]
+                                     for target in self._target_list))
+
+    def _reverse_adjacency(self):
+        """
+        Return the reversed (deps, incs) adjacency lists of the graph.
+
+        These map each target ID to the IDs of the targets that depend on it,
+        and that include it, respectively.
+
+        """
+        if self._current_graph() is not None:
+            return self._graph.reverse_adjacency()
+        return tuple(adjacency.reversed() for adjacency in self._adjacency())
+
+    def _install_graph(self, deps, incs):
+        """Use the given adjacency lists as the dependency graph."""
+        self._graph = _CompactGraph(self._target_list, deps, incs)
+        for target in self._target_list:
+            target._deps = None
+            target._deps_rev = None
+            target._incs = None
+            target._incs_rev = None
+
+    def _thaw(self):
+        """Undo compact(), restoring per-target dependency containers."""
+        graph = self._current_graph()
+        self._graph = None
+        for target in self._target_list:
+            target._deps = list(graph.deps(target._id)) or None
+            target._deps_rev = set(graph.deps_rev(target._id)) or None
+            target._incs = list(graph.incs(target._id)) or None
+            target._incs_rev = set(graph.incs_rev(target._id)) or None
 
     def find_targets(self, name_regex):
         """Iterator that yields all targets whose name matches a regex."""
-        for name, target in self._targets.items():
-            try:
-                if re.search(name_regex, name):
-                    yield target
-            except re.error as e:
-                raise ValueError(str(e))
+        for target_id in self._target_index.search(name_regex):
+            yield self._target_list[target_id]
 
     def find_rebuilt_targets(self, name_regex):
         """Iterator that yields all targets whose name matches a regex and
@@ -61,10 +412,7 @@ class Database:
 
     def get_rule(self, name):
         """Get a rule with a given name, returns None if not existant"""
-        rule = None
-        if name in self._rules:
-            rule = self._rules[name]
-        return rule
+        return self._rules.get(name)
 
     def declare_rule(self, name):
         """
@@ -76,17 +424,151 @@ class Database:
             rule = self._rules[name]
         else:
             rule = Rule(name)
+            rule._db = self
+            rule._id = len(self._rule_list)
             self._rules[name] = rule
+            self._rule_list.append(rule)
+            self._rule_index.add(name)
         return rule
 
+    def add_call(self, rule, arg_list, caller=None):
+        """
+        Record a call of a rule.
+
+        This is what :meth:`Rule.add_call` does, but gives the ID of the call
+        rather than a :class:`RuleCall`, so that calls can be recorded in
+        bulk without creating an object for each.
+
+        :param rule:
+            Rule that was called, declared in this database.
+        :param arg_list:
+            The call's arguments, as a list of target names, with ":"
+            between arguments (as in jam). Targets are created as necessary.
+        :param caller:
+            ID of the call this call was made from, if any (or -1, as for
+            :meth:`load_calls`).
+
+        :return:
+            ID of the new call (see :meth:`get_call`).
+
+        """
+        targets = self._targets
+        get_target = self.get_target
+        if ":" not in arg_list:
+            # Most calls only have a single argument.
+            ids = [(targets.get(name) or get_target(name))._id
+                   for name in arg_list]
+        else:
+            ids = [_ARG_SEPARATOR if name == ":" else
+                   (targets.get(name) or get_target(name))._id
+                   for name in arg_list]
+        return self._calls.add(rule._id, ids,
+                               -1 if caller is None else caller)
+
+    def load_calls(self, names, rules, callers, args, arg_ends):
+        """
+        Bulk record calls of rules, with arguments from a table of targets.
+
+        This is equivalent to calling :meth:`add_call` for each call in turn,
+        but much quicker for large numbers of calls.
+
+        :param names:
+            Table of target names or IDs, as for :meth:`load_indexed_edges`.
+        :param rules:
+            Sequence of the rules called.
+        :param callers:
+            Sequence of the ID of the call each call was made from, or -1 if
+            none. Calls are numbered from zero in the order they're made, so
+            these calls are numbered on from :meth:`num_calls`, and can be
+            made from each other.
+        :param args:
+            The arguments of all the calls, one after another, as indexes in
+            the table, with -1 between each argument and the next.
+        :param arg_ends:
+            Sequence of the offset in args of the end of each call's
+            arguments.
+
+        """
+        ids = self._target_ids(names)
+        # Put the separator last, so that -1 indexes it.
+        ids.append(_ARG_SEPARATOR)
+        self._calls.extend(map(_get_id, rules), callers,
+                           map(ids.__getitem__, args), arg_ends)
+
+    def num_calls(self):
+        """Get the number of rule calls made so far."""
+        return len(self._calls.rules)
+
+    def get_call(self, call_id):
+        """Get the rule call with a given ID."""
+        return self._calls.view(self, call_id)
+
+    def _rule_calls_of(self, target):
+        """Get the rule calls for a target, as for Target.rule_calls."""
+        entries = self._calls.calls_by_target(target._id,
+                                              len(self._target_list))
+        if not entries:
+            return _EMPTY_MAPPING
+        get_call = self.get_call
+        rule_calls = collections.OrderedDict()
+        for entry in entries:
+            rule_calls.setdefault(_ARG_TYPES[entry & 3], []).append(
+                get_call(entry >> 2))
+        return rule_calls
+
+    def intern_var_value(self, values):
+        """
+        Get the shared copy of a value of a target specific variable.
+
+        :param values:
+            Sequence of strings making up the value.
+
+        :return:
+            Tuple of the strings. The same tuple is returned for every equal
+            value.
+
+        """
+        values = tuple(values)
+        return self._var_values.setdefault(values, values)
+
+    def targets_with_var_value(self, values, variable_name=None):
+        """
+        Return all targets that have a target specific variable with a given
+        value, in the order they were created.
+
+        :param values:
+            Sequence of strings making up the value.
+        :param variable_name:
+            Name of the variable to check. By default, targets with the value
+            in any variable are returned.
+
+        """
+        values = self._var_values.get(tuple(values))
+        if values is None:
+            return []
+        # Values are shared, so compare them by identity.
+        if variable_name is None:
+            return [target for target in self._target_list
+                    if target._variables is not None
+                    and any(target_values is values for target_values
+                            in target._variables.values())]
+        else:
+            return [target for target in self._target_list
+                    if target._variables is not None
+                    and target._variables.get(variable_name) is values]
+
     def find_rules(self, name_regex):
         """Iterator that yields all rules whose name matches a regex."""
-        for name, rule in self._rules.items():
-            try:
-                if re.search(name_regex, name):
-                    yield rule
-            except re.error as e:
-                raise ValueError(str(e))
+        for rule_id in self._rule_index.search(name_regex):
+            yield self._rule_list[rule_id]
+
+
+def _check_edge_kinds(kinds):
+    """Check that some kinds of edge are valid, raising ValueError if not."""
+    invalid_kinds = set(kinds).difference(("dep", "inc"))
+    if invalid_kinds:
+        raise ValueError("Invalid edge kind: {!r}".format(
+            invalid_kinds.pop()))
 
 
 class Target:
@@ -121,7 +603,9 @@ class Target:
 
     .. attribute:: variables
 
-        OrderedDict of the target specific variables and their values
+        Mapping of the target specific variables, in the order they were
+        first set, to their values. Each value is a tuple of strings, shared
+        with any other targets that have an equal value.
 
     .. attribute:: rule_calls
 
@@ -129,19 +613,42 @@ class Target:
 
     """
 
+    # Most targets (e.g. leaf headers) never have any dependencies, rebuild
+    # info, variables or rule calls, so the containers for these are only
+    # created when something is first stored in them. Until then, the
+    # corresponding attributes are shared empty (read-only) values.
+    __slots__ = (
+        "name",
+        "timestamp",
+        "binding",
+        "rebuilt",
+        "timestamp_chain",
+        # Database that owns this target (if any), and this target's ID
+        # within it.
+        "_db",
+        "_id",
+        "_deps",
+        "_deps_rev",
+        "_incs",
+        "_incs_rev",
+        "_rebuild_info",
+        "_variables",
+    )
+
     def __init__(self, name):
         self.name = name
-        self.deps = []
-        self.deps_rev = set()
-        self.incs = []
-        self.incs_rev = set()
+        self._db = None
+        self._id = None
+        self._deps = None
+        self._deps_rev = None
+        self._incs = None
+        self._incs_rev = None
         self.timestamp = None
         self.binding = None
         self.rebuilt = False
-        self.rebuild_info = RebuildInfo()
+        self._rebuild_info = None
         self.timestamp_chain = None
-        self.variables = collections.OrderedDict()
-        self.rule_calls = collections.OrderedDict()
+        self._variables = None
 
     def __repr__(self):
         return "{}({})".format(type(self).__name__, self.name)
@@ -155,19 +662,100 @@ class Target:
     def __hash__(self):
         return hash(self.name)
 
+    # The dependency graph is either held in per-target containers, or (once
+    # the database has been compacted) in the database's compact graph.
+
+    def _compact_graph(self):
+        """Return the compact graph holding this target's edges, if any."""
+        if self._db is not None:
+            return self._db._current_graph()
+        return None
+
+    @property
+    def deps(self):
+        if self._deps is not None:
+            return self._deps
+        graph = self._compact_graph()
+        return () if graph is None else graph.deps(self._id)
+
+    @property
+    def deps_rev(self):
+        if self._deps_rev is not None:
+            return self._deps_rev
+        graph = self._compact_graph()
+        return frozenset() if graph is None else graph.deps_rev(self._id)
+
+    @property
+    def incs(self):
+        if self._incs is not None:
+            return self._incs
+        graph = self._compact_graph()
+        return () if graph is None else graph.incs(self._id)
+
+    @property
+    def incs_rev(self):
+        if self._incs_rev is not None:
+            return self._incs_rev
+        graph = self._compact_graph()
+        return frozenset() if graph is None else graph.incs_rev(self._id)
+
+    @property
+    def rebuild_info(self):
+        if self._rebuild_info is None:
+            return _NO_REBUILD_INFO
+        return self._rebuild_info
+
+    @property
+    def variables(self):
+        if self._variables is None:
+            return _EMPTY_MAPPING
+        return self._variables
+
+    @property
+    def rule_calls(self):
+        # Found from the database's rule calls when asked for, rather than
+        # being stored with each target.
+        if self._db is None:
+            return _EMPTY_MAPPING
+        return self._db._rule_calls_of(self)
+
     def add_dependency(self, other):
         """Record the target 'other' as depended on by this target."""
+        self._changed()
+        self._thaw_graph()
+        other._thaw_graph()
+        if other._deps_rev is None:
+            other._deps_rev = set()
         # Dependencies may be parsed more than once, but only one copy allowed
-        if self not in other.deps_rev:
-            self.deps.append(other)
-            other.deps_rev.add(self)
+        if self not in other._deps_rev:
+            if self._deps is None:
+                self._deps = []
+            self._deps.append(other)
+            other._deps_rev.add(self)
 
     def add_inclusion(self, other):
         """Record the target 'other' as included by this target."""
+        self._changed()
+        self._thaw_graph()
+        other._thaw_graph()
+        if other._incs_rev is None:
+            other._incs_rev = set()
         # Inclusions may be parsed more than once, but only one copy allowed
-        if self not in other.incs_rev:
-            self.incs.append(other)
-            other.incs_rev.add(self)
+        if self not in other._incs_rev:
+            if self._incs is None:
+                self._incs = []
+            self._incs.append(other)
+            other._incs_rev.add(self)
+
+    def _changed(self):
+        """Note that the database owning this target has been modified."""
+        if self._db is not None:
+            self._db._changed()
+
+    def _thaw_graph(self):
+        """Make sure this target's dependency containers can be modified."""
+        if self._compact_graph() is not None:
+            self._db._thaw()
 
     def brief_name(self):
         """Return a summarised version of this target's name."""
@@ -202,39 +790,166 @@ class Target:
 
     def set_binding(self, binding):
         """Set the file binding for this target"""
+        self._changed()
         self.binding = binding
 
     def set_rebuilt(self):
         """Mark this target as having been rebuilt"""
+        self._changed()
         self.rebuilt = True
 
     def set_rebuilt_reason(self, reason):
         """Set the rebuild reason of this target"""
-        self.rebuild_info.reason = reason
+        self._changed()
+        self._writable_rebuild_info().reason = reason
 
     def set_rebuilt_dep(self, dep):
         """ Mark this target as having been rebuilt due to dependency
             being updated """
+        self._changed()
         self.rebuilt = True
-        self.rebuild_info.reason = "Dependency updated"
-        self.rebuild_info.dep = dep
+        rebuild_info = self._writable_rebuild_info()
+        rebuild_info.reason = "Dependency updated"
+        rebuild_info.dep = dep
+
+    def _writable_rebuild_info(self):
+        """Return this target's own rebuild info, creating it if necessary."""
+        if self._rebuild_info is None:
+            self._rebuild_info = RebuildInfo()
+        return self._rebuild_info
 
     def set_var_value(self, variable_name, values):
         """ Set the target specific variable 'variable_name' on this target to
             'values[]' """
-        self.variables[variable_name] = values
+        if self._db is not None:
+            values = self._db.intern_var_value(values)
+        else:
+            values = tuple(values)
+        if self._variables is None:
+            self._variables = {}
+        self._variables[sys.intern(variable_name)] = values
+
+
+class _Adjacency:
+    """
+    Adjacency lists packed into compressed sparse row form.
+
+    The neighbours of node N are ids[offsets[N]:offsets[N + 1]].
+
+    """
+    def __init__(self, offsets, ids):
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Pack an iterable of neighbour ID sequences, one per node."""
+        offsets = array.array("q", [0])
+        ids = array.array("I")
+        for row in rows:
+            ids.extend(row)
+            offsets.append(len(ids))
+        return cls(offsets, ids)
+
+    def row(self, node):
+        """Return the neighbour IDs of a node."""
+        if node + 1 >= len(self.offsets):
+            # Node added since the lists were packed.
+            return ()
+        return self.ids[self.offsets[node]:self.offsets[node + 1]]
+
+    def reversed(self):
+        """Return the adjacency lists with every edge reversed."""
+        # Sort the reversed edges, encoded as (dst << 32 | src), so that they
+        # are grouped by destination, and ordered by source within each
+        # group.
+        keys = sorted([dst << 32 | src
+                       for src, dst in zip(self._sources(), self.ids)])
+        return self._from_keys(keys, len(self.offsets) - 1)
+
+    def merged(self, srcs, dsts, num_nodes):
+        """
+        Return the adjacency lists with extra edges added.
+
+        Duplicate edges are dropped. Each node's neighbours are kept in the
+        order they were first added.
+
+        :param srcs:
+            Sequence of the source node IDs of the new edges.
+        :param dsts:
+            Sequence of the corresponding destination node IDs.
+        :param num_nodes:
+            Total number of nodes, which may be more than there were before.
+
+        """
+        # Encode each edge as (src << 32 | dst), so that a dict can drop
+        # duplicates (keeping the first of each), and a stable sort on the
+        # source can group them by node.
+        keys = dict.fromkeys([src << 32 | dst
+                              for src, dst in zip(self._sources(), self.ids)])
+        keys.update(dict.fromkeys([src << 32 | dst
+                                   for src, dst in zip(srcs, dsts)]))
+        keys = list(keys)
+        keys.sort(key=lambda key: key >> 32)
+        return self._from_keys(keys, num_nodes)
+
+    def _sources(self):
+        """Return a list of the source node ID of each edge, in order."""
+        offsets = self.offsets
+        sources = []
+        for node in range(len(offsets) - 1):
+            sources.extend([node] * (offsets[node + 1] - offsets[node]))
+        return sources
+
+    @classmethod
+    def _from_keys(cls, keys, num_nodes):
+        """
+        Pack edges encoded as (src << 32 | dst), already grouped by source.
+        """
+        row_lens = collections.Counter([key >> 32 for key in keys])
+        offsets = array.array("q", itertools.accumulate(
+            [row_lens[node] for node in range(num_nodes)], initial=0))
+        ids = array.array("I", [key & 0xffffffff for key in keys])
+        return cls(offsets, ids)
+
+
+class _CompactGraph:
+    """Dependency graph of a database's targets, held as adjacency lists."""
+    def __init__(self, targets, deps, incs):
+        self._targets = targets
+        self._deps = deps
+        self._deps_rev = deps.reversed()
+        self._incs = incs
+        self._incs_rev = incs.reversed()
 
-    def add_rule_call(self, target_type, rule_call):
-        """ Add the rule call to the relevant list for this target """
-        if target_type not in self.rule_calls:
-            self.rule_calls[target_type] = list()
-        self.rule_calls[target_type].append(rule_call)
+    def adjacency(self):
+        return self._deps, self._incs
+
+    def reverse_adjacency(self):
+        return self._deps_rev, self._incs_rev
+
+    def _lookup(self, ids):
+        return tuple(map(self._targets.__getitem__, ids))
+
+    def deps(self, node):
+        return self._lookup(self._deps.row(node))
+
+    def deps_rev(self, node):
+        return frozenset(self._lookup(self._deps_rev.row(node)))
+
+    def incs(self, node):
+        return self._lookup(self._incs.row(node))
+
+    def incs_rev(self, node):
+        return frozenset(self._lookup(self._incs_rev.row(node)))
 
 
 class RebuildInfo:
     """
     Class containing information related to rebuilds
     """
+    __slots__ = ("reason", "dep")
+
     def __init__(self):
         self.reason = None
         self.dep = None
@@ -244,6 +959,12 @@ class RebuildInfo:
             type(self).__name__, self.reason, self.dep)
 
 
+# Shared, empty values for target attributes that haven't been set. These
+# must never be modified!
+_NO_REBUILD_INFO = RebuildInfo()
+_EMPTY_MAPPING = types.MappingProxyType({})
+
+
 class Rule:
     """
     Class containing information related to Jam rules
@@ -257,27 +978,49 @@ class Rule:
         List of RuleCalls for this rule
 
     """
+    __slots__ = (
+        "name",
+        # Database that owns this rule (if any), and the rule's ID within it.
+        "_db",
+        "_id",
+    )
+
     def __init__(self, name):
         self.name = name
-        self.calls = list()
+        self._db = None
+        self._id = None
 
     def __repr__(self):
         return "{}(name={})".format(type(self).__name__, self.name)
 
+    @property
+    def calls(self):
+        if self._db is None:
+            return []
+        get_call = self._db.get_call
+        return [get_call(call_id) for call_id in self._call_ids()]
+
+    def _call_ids(self):
+        """Get the IDs of the calls of this rule, in order."""
+        return self._db._calls.calls_of_rule(self._id,
+                                             len(self._db._rule_list))
+
     def add_call(self, db, arg_list):
         """
         Add information about the call of a rule with a list of string
         containing the argument list (colon seperated as in jam)
         """
-        new_rule = RuleCall(self, db, arg_list, len(self.calls))
-        self.calls.append(new_rule)
-        return new_rule
+        return db.get_call(db.add_call(self, arg_list))
 
 
 class RuleCall:
     """
     Class containing information related to the call of a Jam rule
 
+    Calls are held in their database's call table, and a RuleCall is a view
+    of one of them, created when it's first asked for. There's only ever one
+    RuleCall for each call.
+
     .. attribute:: rule
 
         Rule object that this is a call of
@@ -301,31 +1044,45 @@ class RuleCall:
         Used to distinguish between calls to the same rule.
 
     """
-    def __init__(self, rule, db, arg_list, number):
-        self.rule = rule
-        self.caller = None
-        self.sub_calls = list()
-        self.args = list()
-        self.args.append(list())
-        self.id_number = number
-        arg_index = 0
-        for element in arg_list:
-            if element == ":":
-                self.args.append(list())
-                arg_index += 1
-            else:
-                target = db.get_target(element)
-                self.args[arg_index].append(target)
-                if arg_index == 0:
-                    target.add_rule_call("target", self)
-                elif arg_index == 1:
-                    target.add_rule_call("source", self)
-                else:
-                    target.add_rule_call("other", self)
+    __slots__ = ("_db", "_id")
+
+    def __init__(self, db, call_id):
+        self._db = db
+        self._id = call_id
 
     def __repr__(self):
         return self.get_as_string()
 
+    @property
+    def rule(self):
+        return self._db._rule_list[self._db._calls.rules[self._id]]
+
+    @property
+    def caller(self):
+        caller_id = self._db._calls.callers[self._id]
+        return None if caller_id == -1 else self._db.get_call(caller_id)
+
+    @property
+    def sub_calls(self):
+        get_call = self._db.get_call
+        return [get_call(call_id)
+                for call_id in self._db._calls.sub_calls(self._id)]
+
+    @property
+    def args(self):
+        targets = self._db._target_list
+        args = [[]]
+        for target_id in self._db._calls.call_args(self._id):
+            if target_id == _ARG_SEPARATOR:
+                args.append([])
+            else:
+                args[-1].append(targets[target_id])
+        return args
+
+    @property
+    def id_number(self):
+        return bisect.bisect_left(self.rule._call_ids(), self._id)
+
     def get_id(self):
         """ Get the ID string for this rule call """
         return "{}#{}".format(self.rule.name, self.id_number)
@@ -348,13 +1105,16 @@ class RuleCall:
         Set the rule call that in turn called this instance of the rule
         """
         assert self.caller is None
-        self.caller = caller
+        self._db._calls.set_caller(self._id, caller._id)
 
     def add_sub_call(self, call):
         """
         Add a rule call to the list of rules this instance of the rule calls
         """
-        self.sub_calls.append(call)
+        # Sub-calls are found from the calls' callers.
+        if call.caller is None:
+            call.set_caller(self)
+        assert call.caller is self
 
     def get_targets(self):
         """
@@ -380,3 +1140,133 @@ class RuleCall:
         """
         return self.args[2:]
 
+
+# Target ID separating the arguments of a rule call in the call table.
+_ARG_SEPARATOR = 0xffffffff
+# Kind of target for the targets in each argument of a rule call (see
+# Target.rule_calls): the targets of the call, its sources, and any others.
+_ARG_TYPES = ("target", "source", "other")
+_get_id = operator.attrgetter("_id")
+
+
+class _CallTable:
+    """
+    The rule calls in a database, held in arrays indexed by call ID.
+
+    Calls are numbered in the order they were made. For call N, rules[N] is
+    the ID of the rule called and callers[N] the ID of the call it was made
+    from (or -1). Its arguments are args[arg_offsets[N]:arg_offsets[N + 1]]:
+    target IDs, with _ARG_SEPARATOR between arguments.
+
+    """
+    def __init__(self):
+        self.rules = array.array("I")
+        self.callers = array.array("q")
+        self.arg_offsets = array.array("q", [0])
+        self.args = array.array("I")
+        # RuleCalls created so far, by call ID.
+        self._views = {}
+        # Adjacency lists from each rule to its calls, from each call to the
+        # calls made from it, and from each target to entries for the calls
+        # with it as an argument, once they've been built, with the number of
+        # calls they were built from.
+        self._calls_by_rule = (0, None)
+        self._sub_calls = (0, None)
+        self._calls_by_target = (0, None)
+
+    def add(self, rule_id, ids, caller_id):
+        """
+        Add a call of a rule, with its arguments given as target IDs.
+
+        :return:
+            The ID of the new call.
+
+        """
+        call_id = len(self.rules)
+        self.rules.append(rule_id)
+        self.callers.append(caller_id)
+        args = self.args
+        args.extend(ids)
+        self.arg_offsets.append(len(args))
+        return call_id
+
+    def extend(self, rule_ids, caller_ids, ids, arg_ends):
+        """
+        Add calls of rules, with their arguments given as target IDs, one
+        after another, and the offset in them of the end of each call's.
+        """
+        self.rules.extend(rule_ids)
+        self.callers.extend(caller_ids)
+        self.arg_offsets.extend(map(len(self.args).__add__, arg_ends))
+        self.args.extend(ids)
+
+    def set_caller(self, call_id, caller_id):
+        self.callers[call_id] = caller_id
+        self._sub_calls = (0, None)
+
+    def calls_of_rule(self, rule_id, num_rules):
+        """Get the IDs of the calls of a rule."""
+        num_calls, calls_by_rule = self._calls_by_rule
+        if calls_by_rule is None or num_calls != len(self.rules):
+            keys = sorted([rule_id << 32 | call_id
+                           for call_id, rule_id in enumerate(self.rules)])
+            # Rules declared later have no calls yet.
+            calls_by_rule = _Adjacency._from_keys(keys, num_rules)
+            self._calls_by_rule = (len(self.rules), calls_by_rule)
+        return calls_by_rule.row(rule_id)
+
+    def view(self, db, call_id):
+        """Get the RuleCall for a call."""
+        view = self._views.get(call_id)
+        if view is None:
+            # Queries may be run from several threads, which mustn't end up
+            # with different views of the same call.
+            view = self._views.setdefault(call_id, RuleCall(db, call_id))
+        return view
+
+    def call_args(self, call_id):
+        """Get the target IDs and separators for a call's arguments."""
+        return self.args[self.arg_offsets[call_id]:
+                         self.arg_offsets[call_id + 1]]
+
+    def sub_calls(self, call_id):
+        """Get the IDs of the calls made from a call."""
+        num_calls, sub_calls = self._sub_calls
+        if sub_calls is None or num_calls != len(self.rules):
+            # As for reversing the dependency graph, but from each call's
+            # caller to the call.
+            keys = sorted([caller_id << 32 | call_id
+                           for call_id, caller_id in enumerate(self.callers)
+                           if caller_id != -1])
+            sub_calls = _Adjacency._from_keys(keys, len(self.rules))
+            self._sub_calls = (len(self.rules), sub_calls)
+        return sub_calls.row(call_id)
+
+    def calls_by_target(self, target_id, num_targets):
+        """
+        Get the calls with a target as an argument.
+
+        :return:
+            An entry for each time the target appears in the arguments of a
+            call, in the order of the calls: the call's ID shifted left by
+            two, ORed with the index in _ARG_TYPES of the argument's kind.
+
+        """
+        num_calls, calls_by_target = self._calls_by_target
+        if calls_by_target is None or num_calls != len(self.rules):
+            args = self.args
+            arg_offsets = self.arg_offsets
+            keys = []
+            for call_id in range(len(self.rules)):
+                arg_type = 0
+                for arg_id in args[arg_offsets[call_id]:
+                                   arg_offsets[call_id + 1]]:
+                    if arg_id == _ARG_SEPARATOR:
+                        arg_type = min(arg_type + 1, 2)
+                    else:
+                        keys.append(arg_id << 32 | call_id << 2 | arg_type)
+            keys.sort()
+            # Targets created later can't be arguments of these calls.
+            calls_by_target = _Adjacency._from_keys(keys, num_targets)
+            self._calls_by_target = (len(self.rules), calls_by_target)
+        return calls_by_target.row(target_id)
@@ -8,6 +8,8 @@
 
 __all__ = (
     "parse",
+    "follow",
+    "Follower",
 )
 
 
@@ -15,16 +17,88 @@ from ._dd import DDParser
 from ._dm import DMParser
 from ._dc import DCParser
 from ._d5 import D5Parser
+from ._follow import Follower
+from . import _parallel
+from . import _scan
 
 
-def parse(db, logfile, parsers):
+def parse(db, logfile, parsers, jobs=1):
     """
     Parse as much information as possible from the given log file into a DB.
 
+    The log file is read once, with each line handed to every selected parser
+    in turn. Logs compressed with gzip, bzip2, xz or zstd (the latter if the
+    zstandard package is installed) are decompressed as they're read.
+
+    :param db:
+        Target database to populate.
+    :param logfile:
+        Source jam log file containing debug output.
+    :param parsers:
+        Jam debug options (e.g. "dmc") to run parsers for.
+    :param jobs:
+        Number of processes to parse the log with. If more than one, the log
+        is split into chunks that are parsed in parallel. Compressed logs are
+        always parsed by a single process.
+
+    :raises ValueError:
+        If the log is compressed in a format that can't be read.
+
+    """
+    parsers_to_run = [parser_cls(db)
+                      for parser_cls in _parser_classes(parsers)]
+    print("Running {}".format(
+        ", ".join(type(parser).__name__ for parser in parsers_to_run)))
+    if jobs > 1 and _scan.compression(logfile) is not None:
+        print("Compressed logs can't be split, parsing with one process")
+        jobs = 1
+    if jobs > 1:
+        _parallel.parse_logfile(parsers_to_run, logfile, jobs)
+    else:
+        _scan.parse_logfile(parsers_to_run, logfile)
+
+
+def follow(db, logfile, parsers):
+    """
+    Parse a log file that's still being written into a DB.
+
+    Everything written to the log so far is parsed before returning. Lines
+    written after that are parsed in the background, and applied to the DB
+    whenever it's refreshed (see :meth:`~jamjar.database.Database.refresh`).
+
     :param db:
         Target database to populate.
     :param logfile:
         Source jam log file containing debug output.
+    :param parsers:
+        Jam debug options (e.g. "dmc") to run parsers for.
+
+    :return:
+        The :class:`Follower` reading the log.
+
+    :raises ValueError:
+        If the log is compressed.
+
+    """
+    if _scan.compression(logfile) is not None:
+        raise ValueError("Compressed logs can't be followed")
+    parsers_to_run = [parser_cls(db)
+                      for parser_cls in _parser_classes(parsers)]
+    print("Running {}".format(
+        ", ".join(type(parser).__name__ for parser in parsers_to_run)))
+    follower = Follower(db, logfile, parsers_to_run)
+    follower.start()
+    follower.catch_up()
+    db.add_refresher(follower.apply_updates)
+    return follower
+
+
+def _parser_classes(parsers):
+    """
+    Return the parser classes to run for some jam debug options.
+
+    Classes are returned in a fixed order, regardless of the order of the
+    options.
 
     """
     parser_clses = {
@@ -66,8 +140,6 @@ def parse(db, logfile, parsers):
             elif parsers[i] != "+":
                 print("No parser exists for option {}".format(parsers[i]))
 
-
-    for parser_cls in parsers_to_run:
-        print("Running {}".format(parser_cls.__name__))
-        parser_cls(db).parse_logfile(logfile)
+    return [parser_cls for parser_cls in parser_clses.values()
+            if parser_cls in parsers_to_run]
 
@@ -12,19 +12,87 @@ __all__ = (
     "BaseParser",
 )
 
+
+from . import _scan
+
+
 class BaseParser:
     """
     Base class for a parser of jam debug output.
 
+    Parsers consume the log one line at a time via :meth:`parse_line`, so that
+    a single pass over a log file can feed several parsers at once.
+
+    Parsing a line is split into two steps, so that the first can be run on
+    chunks of a log in parallel:
+
+    - :meth:`scan_line` extracts the information in a line into a record,
+      without touching the database. It may only depend on earlier lines in
+      the same chunk.
+    - :meth:`apply_record` updates the database with a record. Records are
+      applied in log order, so any state carried between lines (and across
+      chunk boundaries) belongs here.
+
+    When parsing a log file, lines are only decoded and scanned if they start
+    with :attr:`line_prefix`. Alternatively, parsers that only want lines of
+    a fixed form can set :attr:`bulk_re`, to have every matching line found in
+    one go and scanned in batches by :meth:`scan_bulk`.
+
     .. attribute:: db
 
         Database to be updated with parsed debug information.
 
+    .. attribute:: line_prefix
+
+        Regex (as bytes) matching the start of every line the parser could
+        get a record from, or None to scan every line.
+
+    .. attribute:: bulk_re
+
+        Compiled regex (for bytes) matching each line of interest to the
+        parser, starting from the newline before the line. If set, the
+        parser's lines are found with this, rather than being passed to
+        :meth:`scan_line`. The regex must have more than one group.
+
     """
+    line_prefix = None
+    bulk_re = None
+
     def __init__(self, db):
         self.db = db
 
     def parse_logfile(self, filename):
         """Parse the supplied Jam log file, updating the contents of db with
            the parsed information"""
+        _scan.parse_logfile([self], filename)
+
+    def parse_line(self, line):
+        """Parse a single line of a Jam log file, updating the contents of db
+           with any information it contains"""
+        record = self.scan_line(line)
+        if record is not None:
+            self.apply_record(record)
+
+    def start_chunk(self):
+        """Reset any scanning state, ready to scan a new chunk of a log."""
+
+    def scan_skipped(self):
+        """Scan a run of lines that don't start with any line prefix (of this
+           or any other parser being fed the log), returning a record as
+           scan_line does"""
+        return None
+
+    def scan_line(self, line):
+        """Scan a single line of a Jam log file, returning a record of the
+           information it contains (or None if there isn't any)"""
+        raise NotImplementedError
+
+    def scan_bulk(self, matches):
+        """Scan a run of matches of bulk_re in a Jam log file, given as tuples
+           of the matched groups, returning a record of the information they
+           contain (or None if there isn't any)"""
+        raise NotImplementedError
 
+    def apply_record(self, record):
+        """Update the contents of db with a record returned by scan_line"""
+        raise NotImplementedError
@@ -9,12 +9,40 @@
 
 '''jam -d+5 output parser'''
 
+import array
+import functools
+import itertools
+import locale
+import operator
+import re
+
 from ._base import BaseParser
 
 __all__ = (
     "D5Parser",
 )
 
+# Jam language keywords. Rules can't be named after them, so lines starting
+# with them (e.g. "if" and "local" statements) are never rule calls.
+_KEYWORDS = frozenset((
+    "actions", "bind", "case", "default", "else", "existing", "for", "if",
+    "ignore", "in", "include", "local", "maxline", "on", "piecemeal",
+    "quietly", "return", "rule", "set", "switch", "together", "updated",
+    "while",
+))
+
+# Keywords starting the statements that never give a record: all but rule
+# declarations and set statements. Jam prints each statement at the depth of
+# the rule call it's in, without nesting anything below it, so skipping them
+# leaves the rule stack unchanged for the lines that follow.
+_SKIPPED_KEYWORDS = _KEYWORDS.difference(("rule", "set"))
+
+# Regex (as bytes) that fails at the start of a skipped statement.
+_NOT_SKIPPED = (rb"(?!(?:" +
+                b"|".join(keyword.encode()
+                          for keyword in sorted(_SKIPPED_KEYWORDS)) +
+                rb")(?:\s|$))")
+
 class D5Parser(BaseParser):
     '''
     Parser the jam '+5' debug flag output from a logfile into the DB supplied
@@ -32,135 +60,334 @@ class D5Parser(BaseParser):
     >>.. Depends/DEPENDS ... : ...
     >>.. Includes/INCLUDES ... : ...
     '''
+    # Lines with the >| symbols, apart from skipped statements (e.g. "if" and
+    # "local"), which are a large part of a typical log.
+    line_prefix = rb"[^\S\n]*>\S*[^\S\n]+" + _NOT_SKIPPED
+    # The >| symbols, the first word after them and the rest of the line.
+    bulk_re = re.compile(rb"\n[^\S\n]*(>\S*)[^\S\n]+" + _NOT_SKIPPED +
+                         rb"(\S+)([^\n]*)")
+
     def __init__(self, db):
         BaseParser.__init__(self, db)
         self.name = "jam -d+5 parser"
-        self.rule_stack = [dict()]
+        # ID of the rule call made at each depth of the rule stack, or -1 for
+        # lines that aren't rule calls.
+        self.rule_stack = [-1]
+        # Scanners for lines starting with each keyword. Any other line may
+        # be a rule call.
+        self._keyword_scanners = {
+            "rule": self.scan_decl_line,
+            "set": self.scan_set_line,
+            "Depends": self.scan_dep_line,
+            "DEPENDS": self.scan_dep_line,
+            "Includes": self.scan_inc_line,
+            "INCLUDES": self.scan_inc_line,
+        }
+        # First words of the lines that aren't rule calls, or might not be.
+        self._keywords = _KEYWORDS.union(self._keyword_scanners)
 
     def parse_logfile(self, filename):
         '''
         Function to parse log files with '-d+5' debug output.
         '''
-        self.rule_stack = [dict()]
-
-        with open(filename, errors="ignore") as logfile:
-            for line in logfile:
-                self.parse_line(line)
+        self.rule_stack = [-1]
+        super().parse_logfile(filename)
         return None
 
-    def parse_line(self, line):
-        """Read the supplied line from a jam debug log file and parse it"""
-        words = line.split()
+    def scan_line(self, line):
+        """Read the supplied line from a jam debug log file and scan it"""
+        # Only split off the first two words until it's known that the rest
+        # is needed: most lines are calls of builtin rules, which are ignored.
+        words = line.split(None, 2)
         if len(words) < 2:
             # No interest in single word lines
-            return
+            return None
 
         if not words[0].startswith(">"):
             # Not a d5 output line
-            return
-
-        # Handle the rule stack
-        while len(self.rule_stack) > self.get_rule_depth(words[0]):
-            self.rule_stack.pop()
-        self.rule_stack.append({"line":line})
-
-        # Run the parsers
-        if self.parse_decl_line(words):
-            return
-        if self.parse_set_line(words):
-            return
-        if self.parse_dep_line(words):
-            return
-        if self.parse_inc_line(words):
-            return
-        if self.parse_call_line(words):
-            return
-
-    def parse_decl_line(self, words):
-        ''' parsing ">>.. rule RuleName" '''
-        if words[1] == "rule" and len(words) == 3:
-            rule_name = words[2]
-            self.db.declare_rule(rule_name)
-            return True
+            return None
+
+        if words[1] in _SKIPPED_KEYWORDS:
+            # As when scanning a log file, skip statements that never give a
+            # record.
+            return None
+
+        return self._scan_lines([_rule_depth(len(words[0]))], [words[1]],
+                                [words[2] if len(words) == 3 else ""])
+
+    def scan_bulk(self, matches):
+        """Scan a run of d+5 output lines."""
+        depths = map(_rule_depth, map(len, map(operator.itemgetter(0),
+                                               matches)))
+        # Decode all the words at once, rather than a line at a time. They
+        # can't contain newlines, so can be split apart again afterwards.
+        words = b"\n".join(map(b"\n".join,
+                               map(operator.itemgetter(1, 2), matches)))
+        words = words.decode(locale.getpreferredencoding(False),
+                             errors="ignore").split("\n")
+
+        return self._scan_lines(depths, words[::2], words[1::2])
+
+    def _scan_lines(self, depths, first_words, rests):
+        """
+        Scan some lines, given as the stack depth, the first word after the
+        >| symbols and the rest of each line.
+
+        :return:
+            ("bulk", names, targets, line records, edges) record. The targets
+            named by each line are given in turn, as indexes in the names,
+            with -1 for the ":"s between the arguments of rule calls. Each
+            line record is the kind of line and its depth, followed by the
+            line's details, which give its targets as a start and end offset
+            in the targets. The edges are given as for
+            :meth:`Database.load_indexed_edges`.
+
+        """
+        # Names of the targets named by each line in turn, and the edges, as
+        # offsets in them.
+        line_names = []
+        extend_names = line_names.extend
+        edge_offsets = {"dep": ([], []), "inc": ([], [])}
+        # The same few rule names start most lines, so share a single copy
+        # of each. That makes the record quicker to send from a worker
+        # process, and the rule names quicker to look up once it's applied.
+        rule_names = {}
+        intern_rule = rule_names.setdefault
+        # Most lines are calls of rules, so only look for keywords in the
+        # lines starting with one.
+        keywords = self._keywords
+        scan_words = self._scan_words
+        line_records = []
+        append = line_records.append
+        for depth, first_word, rest in zip(depths, first_words, rests):
+            start = len(line_names)
+            record = (None if first_word not in keywords else
+                      scan_words(depth, first_word, rest))
+            if record is None:
+                # Whether the line is a rule call depends on the rules
+                # declared so far, so that's only known when it's applied.
+                extend_names(rest.split())
+                append(("call", depth, intern_rule(first_word, first_word),
+                        start, len(line_names)))
+                continue
+            kind = record[0]
+            if kind == "set":
+                _, _, variable_name, target_names, values = record
+                _extend_literal_names(extend_names, target_names)
+                append(("set", depth, variable_name, start, len(line_names),
+                        values))
+            elif kind == "dep" or kind == "inc":
+                _, _, names, srcs, dsts = record
+                _extend_literal_names(extend_names, names)
+                kind_srcs, kind_dsts = edge_offsets[kind]
+                kind_srcs.extend(map(start.__add__, srcs))
+                kind_dsts.extend(map(start.__add__, dsts))
+                append((kind, depth))
+            else:
+                append(record)
+
+        # Number each distinct target name, as for -dd output. This is done
+        # here, rather than when the record is applied, so that it's spread
+        # across the processes scanning a log in parallel.
+        numbers = dict.fromkeys(line_names)
+        numbers.pop(":", None)
+        names = [":" if name is _COLON_TARGET else name for name in numbers]
+        numbers = dict(zip(numbers, itertools.count()))
+        numbers[":"] = -1
+        targets = array.array("i", map(numbers.__getitem__, line_names))
+        edges = {kind: (array.array("I", map(targets.__getitem__, srcs)),
+                        array.array("I", map(targets.__getitem__, dsts)))
+                 for kind, (srcs, dsts) in edge_offsets.items()}
+        return ("bulk", names, targets, line_records, edges)
+
+    def _scan_words(self, depth, first_word, rest):
+        """
+        Scan a line starting with a keyword, given as its stack depth, the
+        keyword and the rest of the line.
+
+        :return:
+            The record for the line, or None if it may be a rule call after
+            all.
+
+        """
+        scanner = self._keyword_scanners.get(first_word)
+        if scanner is not None:
+            record = scanner(depth, rest.split())
+            if record is not None:
+                return record
+        if first_word in _KEYWORDS:
+            # A rule declaration or set statement that couldn't be read.
+            # Leave out the rest of the line, as it's not needed.
+            return ("other", depth)
+        return None
+
+    def apply_record(self, record):
+        _, names, targets, line_records, edges = record
+        db = self.db
+        stack = self.rule_stack
+        get_rule = db.get_rule
+        # Everything but rule declarations is added to the database in bulk
+        # once all the lines have been applied. Calls are numbered in the
+        # order they're made, so their IDs are known now.
+        next_call = db.num_calls()
+        call_rules = []
+        call_callers = []
+        call_records = []
+        set_records = []
+        skipped_records = []
+        for line_record in line_records:
+            kind = line_record[0]
+
+            # Handle the rule stack
+            del stack[line_record[1]:]
+
+            if kind == "call":
+                # Calls of builtin rules, and any other undeclared ones, are
+                # ignored.
+                rule_object = get_rule(line_record[2])
+                if rule_object is None:
+                    stack.append(-1)
+                    skipped_records.append(line_record)
+                    continue
+                call_rules.append(rule_object)
+                call_callers.append(stack[-1])
+                call_records.append(line_record)
+                stack.append(next_call)
+                next_call += 1
+                continue
+            stack.append(-1)
+            if kind == "set":
+                set_records.append(line_record)
+            elif kind == "decl":
+                db.declare_rule(line_record[2])
+
+        # Create the targets in the order the lines name them, leaving out
+        # those of ignored calls, as if each line were added to the database
+        # in turn. Then number them afresh, leaving out any only named by
+        # ignored calls.
+        used = targets
+        if skipped_records:
+            mask = bytearray(b"\x01") * len(targets)
+            for _, _, _, start, end in skipped_records:
+                mask[start:end] = bytes(end - start)
+            used = itertools.compress(targets, mask)
+        used = dict.fromkeys(used)
+        used.pop(-1, None)
+        names = list(map(names.__getitem__, used))
+        renumbered = dict(zip(used, itertools.count()))
+        targets = list(map(renumbered.get, targets, targets))
+
+        # Loading the edges creates the targets, in the order of the table.
+        db.load_indexed_edges(
+            names, {kind: (list(map(renumbered.__getitem__, srcs)),
+                           list(map(renumbered.__getitem__, dsts)))
+                    for kind, (srcs, dsts) in edges.items()})
+        if call_rules:
+            call_args = list(map(targets.__getitem__, map(
+                slice, map(operator.itemgetter(3), call_records),
+                map(operator.itemgetter(4), call_records))))
+            db.load_calls(names, call_rules, call_callers,
+                          list(itertools.chain.from_iterable(call_args)),
+                          list(itertools.accumulate(map(len, call_args))))
+        if set_records:
+            set_targets = iter(db.get_targets(
+                names[idx] for _, _, _, start, end, _ in set_records
+                for idx in targets[start:end]))
+            for _, _, variable_name, start, end, values in set_records:
+                for target in itertools.islice(set_targets, end - start):
+                    target.set_var_value(variable_name, values)
+
+    def scan_decl_line(self, depth, args):
+        ''' scanning ">>.. rule RuleName" '''
+        if len(args) == 1:
+            return ("decl", depth, args[0])
         else:
-            return False
+            return None
 
-    def parse_set_line(self, words):
+    def scan_set_line(self, depth, args):
         '''
-        parsing:
+        scanning:
         ">>.. set VARIABLE on Target1 Target2 ... = {Values...}"
         '''
-        if (len(words) > 5
-                and words[1] == "set"
-                and words[3] == "on"
-                and "=" in words[5:]):
-            variable_name = words[2]
-            target_names = words[4:words.index("=")]
-            for target_name in target_names:
-                targ = self.db.get_target(target_name)
-                targ.set_var_value(variable_name, words[words.index("=")+1:])
-            return True
+        if len(args) > 3 and args[1] == "on" and "=" in args[3:]:
+            equals = args.index("=")
+            return ("set", depth, args[0], args[2:equals], args[equals+1:])
         else:
-            return False
+            return None
 
-    def parse_dep_line(self, words):
+    def scan_dep_line(self, depth, args):
         '''
-        parsing:
+        scanning:
         ">>.. Depends x ... : y ..."
         '''
-        if (len(words) > 3
-                and (words[1] == "Depends" or words[1] == "DEPENDS")
-                and ":" in words[3:]):
-            for x_string in words[2:words.index(":")]:
-                x_targ = self.db.get_target(x_string)
-                for y_string in words[words.index(":")+1:]:
-                    y_targ = self.db.get_target(y_string)
-                    x_targ.add_dependency(y_targ)
-            return True
+        if ":" in args[1:]:
+            colon = args.index(":")
+            return ("dep", depth, *_edge_table(args[:colon], args[colon+1:]))
         else:
-            return False
+            return None
 
-    def parse_inc_line(self, words):
+    def scan_inc_line(self, depth, args):
         '''
-        parsing:
+        scanning:
         ">>.. Includes x ... : y ..."
         '''
-        if (len(words) > 3
-                and (words[1] == "Includes" or words[1] == "INCLUDES")
-                and ":" in words[3:]):
-            for x_string in words[2:words.index(":")]:
-                x_targ = self.db.get_target(x_string)
-                for y_string in words[words.index(":")+1:]:
-                    y_targ = self.db.get_target(y_string)
-                    x_targ.add_inclusion(y_targ)
-            return True
-        else:
-            return False
-
-    def parse_call_line(self, words):
-        ''' parsing ">>.. RuleName {args...}" '''
-        if self.db.get_rule(words[1]) is not None:
-            rule_object = self.db.get_rule(words[1])
-            call = rule_object.add_call(self.db, words[2:])
-            # Handle rule stack
-            self.rule_stack[-1]["rule_call"] = call
-            if len(self.rule_stack) > 1:
-                if "rule_call" in self.rule_stack[-2]:
-                    # Set values for caller
-                    call.set_caller(self.rule_stack[-2]["rule_call"])
-                    self.rule_stack[-2]["rule_call"].add_sub_call(call)
-            return True
+        if ":" in args[1:]:
+            colon = args.index(":")
+            return ("inc", depth, *_edge_table(args[:colon], args[colon+1:]))
         else:
-            return False
+            return None
 
     def get_rule_depth(self, word):
         """
         Get the rule stack depth from the >| symbols in the first word of the
         d+5 output line.
         """
-        # Maximum depth the stack will go with an even number of symbols
-        even_stack_depth_max = 35
-        if len(word) % 2 == 0:
-            return int(len(word)/2)
-        else:
-            return int((even_stack_depth_max + len(word))/2)
+        return _rule_depth(len(word))
+
+
+# Stands for a target named ":" while scanning, so that it isn't mistaken for
+# the ":" between the arguments of a rule call.
+_COLON_TARGET = object()
+
+
+def _extend_literal_names(extend_names, names):
+    """Add the names of some targets to the names from a record's lines."""
+    if ":" in names:
+        names = [_COLON_TARGET if name == ":" else name for name in names]
+    extend_names(names)
+
+
+def _edge_table(x_strings, y_strings):
+    """
+    Build the edges from each of x_strings to each of y_strings.
+
+    This is done when scanning, rather than when the edges are added to the
+    database, so that it's spread across the processes scanning a log in
+    parallel.
+
+    :return:
+        (names, srcs, dsts) tuple. The names of the targets, in the order
+        that adding the edges one at a time would create them in, and the
+        indexes in the names of the source and destination of each edge.
+
+    """
+    names = x_strings[:1] + y_strings + x_strings[1:]
+    if len(x_strings) == 1:
+        # The usual case: a single target with edges to the others.
+        return (names, [0] * len(y_strings), list(range(1, len(names))))
+    x_indexes = [0, *range(len(y_strings) + 1, len(names))]
+    y_indexes = list(range(1, len(y_strings) + 1))
+    return (names,
+            [x_index for x_index in x_indexes for _ in y_indexes],
+            y_indexes * len(x_indexes))
+
+
+@functools.lru_cache(maxsize=None)
+def _rule_depth(num_symbols):
+    """Get the rule stack depth from the number of >| symbols."""
+    # Maximum depth the stack will go with an even number of symbols
+    even_stack_depth_max = 35
+    if num_symbols % 2 == 0:
+        return num_symbols // 2
+    else:
+        return (even_stack_depth_max + num_symbols) // 2
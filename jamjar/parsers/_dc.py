@@ -20,15 +20,17 @@ from ._base import BaseParser
 class DCParser(BaseParser):
     """Parser for '-dc' debug output."""
 
+    line_prefix = (rb"[^\S\n]*(?:Rebuilding|"
+                   rb"\S+[^\S\n]+inherits timestamp from)")
+
     # Are a series of 'inherits timestamp' lines expected next?
     _timestamp_chain_follows = False
     # Target that owns the following timestamp chain.
     _timestamp_chain_owner = None
-
-    def parse_logfile(self, filename):
-        """Parse '-dc' debug output from the file at the given path."""
-        with open(filename, errors="ignore") as f:
-            self._parse(f)
+    # Might the next line be part of a timestamp chain? Set from the lines
+    # scanned so far, which is all that's known when scanning. Whether a chain
+    # really follows is decided when records are applied.
+    _chain_may_follow = True
 
     def _parse(self, lines):
         """
@@ -37,25 +39,48 @@ class DCParser(BaseParser):
         This is separated out from parse_logfile for testing purposes.
 
         """
-        # Make sure we have an iterator so it can be advanced manually when
-        # required.
-        lines = iter(lines)
         for line in lines:
-            # Are there a series of timestamp lines to parse?
-            if self._timestamp_chain_follows:
-                while line.split(maxsplit=1)[1].startswith(
+            self.parse_line(line)
+
+    def start_chunk(self):
+        # The previous chunk may have ended part way through a chain.
+        self._chain_may_follow = True
+
+    def scan_skipped(self):
+        # Any other line ends a timestamp chain.
+        if self._chain_may_follow:
+            self._chain_may_follow = False
+            return ("end_chain",)
+        return None
+
+    def scan_line(self, line):
+        """Scan a single line of '-dc' debug output."""
+        # Is this part of a series of timestamp lines?
+        if self._chain_may_follow:
+            words = line.split(maxsplit=1)
+            if len(words) > 1 and words[1].startswith(
                                                 "inherits timestamp from"):
-                    self._parse_timestamp_line(line)
-                    try:
-                        line = next(lines)
-                    except StopIteration:
-                        break
-                self._timestamp_chain_follows = False
-                self._timestamp_chain_owner = None
-
-            line = line.strip()
-            if line.startswith("Rebuilding"):
-                self._parse_rebuilding_line(line)
+                return ("inherits", line.split())
+
+        line = line.strip()
+        if line.startswith("Rebuilding"):
+            self._chain_may_follow = True
+            return ("rebuilding", line.split())
+        elif self._chain_may_follow:
+            self._chain_may_follow = False
+            return ("end_chain",)
+        return None
+
+    def apply_record(self, record):
+        if record[0] == "inherits":
+            if self._timestamp_chain_follows:
+                self._parse_timestamp_line(record[1])
+            return
+
+        self._timestamp_chain_follows = False
+        self._timestamp_chain_owner = None
+        if record[0] == "rebuilding":
+            self._parse_rebuilding_line(record[1])
 
     def _strip_quoted_target(self, word):
         """Strip quotes from a target name."""
@@ -77,9 +102,8 @@ class DCParser(BaseParser):
             self._timestamp_chain_follows = True
             self._timestamp_chain_owner = target
 
-    def _parse_rebuilding_line(self, line):
-        """Parse a 'Rebuilding "<target>" ...' line."""
-        words = line.split()
+    def _parse_rebuilding_line(self, words):
+        """Parse the words of a 'Rebuilding "<target>" ...' line."""
         assert words[0] == "Rebuilding"
 
         rebuilt_target = self._target_from_quoted_name(words[1])
@@ -112,9 +136,8 @@ class DCParser(BaseParser):
             rebuilt_target.set_rebuilt_dep(reason_target)
             self._expect_timestamp_chain(reason_target)
 
-    def _parse_timestamp_line(self, line):
-        """Parse a '<target> inherits timestamp from ...' line."""
-        words = line.split()
+    def _parse_timestamp_line(self, words):
+        """Parse the words of a '<target> inherits timestamp from ...' line."""
         assert words[1:4] == ["inherits", "timestamp", "from"]
 
         chain = self._timestamp_chain_owner.timestamp_chain
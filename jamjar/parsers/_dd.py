@@ -14,49 +14,113 @@ __all__ = (
 )
 
 
+import array
+import itertools
+import locale
+import re
+
 from ._base import BaseParser
 
 
 class DDParser(BaseParser):
+    """
+    Parser for '-dd' debug output.
+
+    Currently can read:
+
+    Depends x:y
+    Includes x:y
+
+    .. attribute:: debug_flag
+
+        Print each dependency and inclusion as it is parsed.
+
+    """
+    line_prefix = rb"Depends |Includes "
+    bulk_re = re.compile(rb'\n(Depends|Includes) "([^"\n]*)" : "([^"\n]*)" ;')
+    debug_flag = False
+
     def parse_logfile(self, filename, debug_flag=False):
-        """
-        Function to parse log files with '-dd' debug output.
-
-        Currently can read:
-
-        Depends x:y
-        Includes x:y """
-
-        with open(filename, errors="ignore") as f:
-            for line in f:
-                # Depending on the first word, add the relevant information to the database
-                #
-                # x depends on y
-                # x includes y
-
-                first_word = line.split(' ', 1)[0]
-
-                if first_word == "Depends" or first_word == "Includes":
-                    x_y = line.split(' ', 1) [1]
-                    x_garbage = x_y.split('\" : "', 1)[0]   # includes the prefix '\"' which needs to be removed
-                    y_garbage = x_y.split('\" : "', 1)[1]   # includes an ending '\" ;' which needs to be removed
-
-                    x = x_garbage.replace("\"", "")
-                    y = y_garbage.replace("\" ;", "").replace("\n", "")
-
-                    # Debug
-                    if debug_flag == True:
-                        if first_word == "Depends":
-                            print (x, "depends on", y)
-                        elif first_word == "Includes":
-                            print (x, "includes", y)
-
-                    # Add to the database
-                    x_target = self.db.get_target(x)
-                    y_target = self.db.get_target(y)
-
-                    if first_word == "Depends":
-                        x_target.add_dependency(y_target)
-                    elif first_word == "Includes":
-                        x_target.add_inclusion(y_target)
+        """Function to parse log files with '-dd' debug output."""
+        self.debug_flag = debug_flag
+        super().parse_logfile(filename)
         return None
+
+    def scan_line(self, line):
+        """Scan a single line of '-dd' debug output."""
+        # Depending on the first word, add the relevant information to the database
+        #
+        # x depends on y
+        # x includes y
+
+        first_word = line.split(' ', 1)[0]
+
+        if first_word == "Depends" or first_word == "Includes":
+            x_y = line.split(' ', 1) [1]
+            x_garbage = x_y.split('\" : "', 1)[0]   # includes the prefix '\"' which needs to be removed
+            y_garbage = x_y.split('\" : "', 1)[1]   # includes an ending '\" ;' which needs to be removed
+
+            x = x_garbage.replace("\"", "")
+            y = y_garbage.replace("\" ;", "").replace("\n", "")
+
+            return (first_word, x, y)
+        return None
+
+    def scan_bulk(self, matches):
+        """Scan a run of '-dd' debug output lines."""
+        # Decode all the names at once, rather than one at a time. Names
+        # can't contain newlines, so can be split apart again afterwards.
+        names = b"\n".join([b"\n".join((x, y)) for _, x, y in matches])
+        names = names.decode(locale.getpreferredencoding(False),
+                             errors="ignore").split("\n")
+
+        # Debug. The flag is only set when parsing serially, so this is in
+        # step with applying the records.
+        if self.debug_flag == True:
+            for (first_word, _, _), x, y in zip(matches, names[::2],
+                                                 names[1::2]):
+                print (x, "depends on" if first_word == b"Depends"
+                       else "includes", y)
+
+        # Number each distinct name in the order they first appear, which is
+        # the order the targets are created in, and build the edges from the
+        # numbers. This is done here, rather than when the record is applied,
+        # so that it's spread across the processes scanning a log in
+        # parallel.
+        table = {}
+        indexes = [table.setdefault(name, len(table)) for name in names]
+        is_dep = [first_word == b"Depends" for first_word, _, _ in matches]
+        is_inc = [not dep for dep in is_dep]
+        srcs = indexes[::2]
+        dsts = indexes[1::2]
+        edges = {
+            "dep": (array.array("I", itertools.compress(srcs, is_dep)),
+                    array.array("I", itertools.compress(dsts, is_dep))),
+            "inc": (array.array("I", itertools.compress(srcs, is_inc)),
+                    array.array("I", itertools.compress(dsts, is_inc))),
+        }
+        return ("bulk", list(table), edges)
+
+    def apply_record(self, record):
+        if record[0] == "bulk":
+            self._apply_bulk(*record[1:])
+            return
+
+        first_word, x, y = record
+
+        # Debug
+        if self.debug_flag == True:
+            if first_word == "Depends":
+                print (x, "depends on", y)
+            elif first_word == "Includes":
+                print (x, "includes", y)
+
+        # Add to the database
+        if first_word == "Depends":
+            self.db.load_edges([(x, y, "dep")])
+        elif first_word == "Includes":
+            self.db.load_edges([(x, y, "inc")])
+
+    def _apply_bulk(self, names, edges):
+        # Add to the database
+        self.db.load_indexed_edges(names, edges)
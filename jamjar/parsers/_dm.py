@@ -14,6 +14,7 @@ __all__ = (
     "DMParser",
 )
 
+import functools
 import re
 import logging
 import time
@@ -32,6 +33,8 @@ class DMParser(BaseParser):
         Name of this parser.
 
     """
+    line_prefix = rb"make|time|made|bind"
+
     def __init__(self, db):
         self.db = db
         self.name = "jam -dm parser"
@@ -42,25 +45,26 @@ class DMParser(BaseParser):
         self.bind_re = re.compile("^bind\s+--\s+(.+):\s+(.+)")
         self.logger = logging.getLogger()
         self.logger.setLevel(logging.INFO)
-
-    def parse_logfile(self, filename):
-        """Open the supplied logfile and parse any '-dm' debug output into
-           the DB"""
-        # Open the file
-        try:
-            f = open(filename, errors="ignore")
-        except:
-            # The file cannot be opened.
-            print("Unable to open file %s" % filename)
-            raise
-        else:
-             # Read each line in from the logfile
-             for line in f:
-                 self.parse_line(line)
-             f.close()
-
-    def parse_line(self, line):
-        """Read the supplied line from a jam debug log file and parse it
+        # Checking this once up front avoids formatting debug messages for
+        # every line when they'd be thrown away.
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
+        # Scan functions for each type of line, keyed by the line's first
+        # four characters.
+        self._line_scanners = {
+            "make": self.scan_make_line,
+            "time": self.scan_time_line,
+            "made": self.scan_made_line,
+            "bind": self.scan_bind_line,
+        }
+        self._appliers = {
+            "make": self._apply_make,
+            "time": self._apply_time,
+            "made": self._apply_made,
+            "bind": self._apply_bind,
+        }
+
+    def scan_line(self, line):
+        """Read the supplied line from a jam debug log file and scan it
            for -dm debug to update the DB with."""
 
         # The output we are interested in takes one of the following forms:
@@ -68,61 +72,99 @@ class DMParser(BaseParser):
         # time -- <target>:timestamp
         # made [stable|update] <target>
         # bind -- <target>:filename
-        # Call the parse functions for each of these in turn
-        logging.debug("Parsing line %s" % line)
-        self.parse_make_line(line)
-        self.parse_time_line(line)
-        self.parse_made_line(line)
-        self.parse_bind_line(line)
-
-    def parse_make_line(self, line):
+        # Most lines aren't any of these, so pick the one scan function that
+        # might apply from the first word, before running any regexes.
+        if self._debug:
+            logging.debug("Parsing line %s" % line)
+        scan_fn = self._line_scanners.get(line[:4])
+        if scan_fn is not None:
+            return scan_fn(line)
+        return None
+
+    def apply_record(self, record):
+        self._appliers[record[0]](*record[1:])
+
+    def scan_make_line(self, line):
         # Get the target name
         m = self.make_re.match(line);
         if m:
             target_name = m.group(1);
-            logging.debug("Parsing a make line for target %s" % target_name)
-            target = self.db.get_target(target_name);
+            if self._debug:
+                logging.debug("Parsing a make line for target %s" %
+                              target_name)
+            return ("make", target_name)
+        return None
+
+    def _apply_make(self, target_name):
+        target = self.db.get_target(target_name);
 
-           # Set the 'made' flag on the target
+       # Set the 'made' flag on the target
 
-    def parse_time_line(self, line):
+    def scan_time_line(self, line):
         # Get the target name and the timestamp
         m = self.time_re.match(line);
         if m:
             target_name = m.group(1)
             timestamp = m.group(2)
 
-            target = self.db.get_target(target_name)
-
-            timestamp.replace("  ", " 0", 1)
-            logging.debug("Timestamp parsed for target is %s" % timestamp)
-            try:
-                dt = datetime.strptime(timestamp, "%a %b %d %H:%M:%S %Y")
-                # Set the timestamp
-                target.set_timestamp(dt)
-            except ValueError:
+            if self._debug:
+                logging.debug("Timestamp parsed for target is %s" % timestamp)
+            dt = _parse_timestamp(timestamp)
+            if dt is None:
                 logging.debug("Not a datetime")
+            return ("time", target_name, dt)
+        return None
+
+    def _apply_time(self, target_name, dt):
+        target = self.db.get_target(target_name)
+        if dt is not None:
+            # Set the timestamp
+            target.set_timestamp(dt)
 
-    def parse_bind_line(self, line):
+    def scan_bind_line(self, line):
         m = self.bind_re.match(line)
         if m:
             target_name = m.group(1)
             bind_target = m.group(2)
+            return ("bind", target_name, bind_target)
+        return None
 
-            target = self.db.get_target(target_name)
-            # Set the bind target (the file in the file system)
-            target.set_binding(bind_target)
+    def _apply_bind(self, target_name, bind_target):
+        target = self.db.get_target(target_name)
+        # Set the bind target (the file in the file system)
+        target.set_binding(bind_target)
 
-    def parse_made_line(self, line):
+    def scan_made_line(self, line):
         m = self.made_re.match(line)
         if m:
             update = m.group(1)
             target_name = m.group(2)
+            return ("made", update, target_name)
+        return None
 
-            target = self.db.get_target(target_name)
+    def _apply_made(self, update, target_name):
+        target = self.db.get_target(target_name)
 
-            # Set the rebuilt flag
-            if update == "update" or update == "missing" or update == "old" or update == "newer":
-                target.set_rebuilt()
-                target.set_rebuilt_reason(update)
+        # Set the rebuilt flag
+        if update == "update" or update == "missing" or update == "old" or update == "newer":
+            target.set_rebuilt()
+            target.set_rebuilt_reason(update)
 
+
+# Jam logs repeat the same timestamps across many targets, so remember the
+# most recently seen ones rather than parsing them afresh each time. The
+# datetimes are immutable, so can be shared between targets.
+@functools.lru_cache(maxsize=65536)
+def _parse_timestamp(timestamp):
+    """
+    Parse a timestamp from '-dm' output, e.g. "Mon Nov  2 10:15:42 2015".
+
+    Returns None if the timestamp isn't valid (e.g. "unbound").
+
+    """
+    # Jam pads single-digit days with a space, rather than a zero.
+    timestamp = timestamp.replace("  ", " 0", 1)
+    try:
+        return datetime.strptime(timestamp, "%a %b %d %H:%M:%S %Y")
+    except ValueError:
+        return None
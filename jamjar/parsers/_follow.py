@@ -0,0 +1,160 @@
+#------------------------------------------------------------------------------
+# _follow.py
+#
+# Parsing of a log file that is still being written.
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Incremental parsing of a live jam log."""
+
+__all__ = (
+    "Follower",
+)
+
+
+import queue
+import threading
+
+
+class Follower:
+    """
+    Follows a jam log file as it's written, parsing lines as they appear.
+
+    Lines are read and scanned on a background thread, and the resulting
+    records queued in batches. The database is only updated when the records
+    are applied, by :meth:`apply_updates`, so it only ever changes on the
+    thread that calls that (e.g. between UI commands).
+
+    .. attribute:: db
+
+        Database to be updated with parsed debug information.
+
+    .. attribute:: logfile
+
+        Path of the log file being followed.
+
+    .. attribute:: lines_applied
+
+        Number of lines of the log that have been applied to the database.
+
+    """
+    def __init__(self, db, logfile, parsers, *,
+                 poll_interval=0.5, batch_size=10000):
+        """
+        :param parsers:
+            Parsers to feed the log to.
+        :param poll_interval:
+            Time in seconds to wait for more to be written, on reaching the
+            end of the log.
+        :param batch_size:
+            Maximum number of lines in each batch of records.
+
+        """
+        self.db = db
+        self.logfile = logfile
+        self.lines_applied = 0
+        self._poll_interval = poll_interval
+        self._batch_size = batch_size
+        self._scan_fns = [parser.scan_line for parser in parsers]
+        self._apply_fns = [parser.apply_record for parser in parsers]
+        # Batches of records, as (number of lines, [(parser index, record)]),
+        # or the exception that stopped the reader.
+        self._batches = queue.Queue()
+        self._stopping = threading.Event()
+        # Set once the reader has reached the end of the log for the first
+        # time.
+        self._caught_up = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start reading the log, in the background."""
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reading the log."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def apply_updates(self, *, timeout=None):
+        """
+        Apply the records scanned so far to the database.
+
+        :param timeout:
+            Time in seconds to wait for a batch, if there isn't one already.
+            By default, return immediately.
+
+        :return:
+            Number of lines applied.
+
+        :raises Exception:
+            Whatever stopped the log being read, the first time the updates
+            are applied after it happened.
+
+        """
+        num_lines = 0
+        try:
+            if timeout is not None:
+                num_lines += self._apply_batch(self._batches.get(
+                                                          timeout=timeout))
+            while True:
+                num_lines += self._apply_batch(self._batches.get_nowait())
+        except queue.Empty:
+            pass
+        return num_lines
+
+    def catch_up(self):
+        """Apply records until everything written so far has been applied."""
+        while not self._caught_up.is_set() or not self._batches.empty():
+            self.apply_updates(timeout=self._poll_interval)
+
+    def _apply_batch(self, batch):
+        if isinstance(batch, Exception):
+            raise batch
+        num_lines, records = batch
+        apply_fns = self._apply_fns
+        for parser_idx, record in records:
+            apply_fns[parser_idx](record)
+        self.lines_applied += num_lines
+        return num_lines
+
+    def _read(self):
+        """Read and scan the log, until stopped. Runs on the reader thread."""
+        try:
+            self._read_lines()
+        except Exception as e:
+            self._batches.put(e)
+        finally:
+            self._caught_up.set()
+
+    def _read_lines(self):
+        scan_fns = self._scan_fns
+        # Incomplete line at the end of the log, still being written.
+        partial = ""
+        with open(self.logfile, errors="ignore") as f:
+            while not self._stopping.is_set():
+                num_lines = 0
+                records = []
+                for line in iter(f.readline, ""):
+                    if partial:
+                        line = partial + line
+                        partial = ""
+                    if not line.endswith("\n"):
+                        partial = line
+                        break
+                    num_lines += 1
+                    for parser_idx, scan_fn in enumerate(scan_fns):
+                        record = scan_fn(line)
+                        if record is not None:
+                            records.append((parser_idx, record))
+                    if num_lines == self._batch_size:
+                        break
+
+                if num_lines:
+                    self._batches.put((num_lines, records))
+                if num_lines < self._batch_size:
+                    # Reached the end of what's been written so far.
+                    self._caught_up.set()
+                    self._stopping.wait(self._poll_interval)
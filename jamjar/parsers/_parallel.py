@@ -0,0 +1,108 @@
+#------------------------------------------------------------------------------
+# _parallel.py
+#
+# Parsing of a log file in chunks, across several processes.
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Parallel jam log parsing."""
+
+__all__ = (
+    "parse_logfile",
+)
+
+
+import collections
+import concurrent.futures
+import os
+
+from . import _scan
+
+
+# Number of chunks to split a log into per worker process. More chunks than
+# workers keeps all the workers busy, even if some chunks are slower to scan
+# than others.
+_CHUNKS_PER_JOB = 4
+
+
+def parse_logfile(parsers, logfile, jobs):
+    """
+    Feed each line of a log file to all of the given parsers, in parallel.
+
+    The log is split into chunks, at line boundaries. Each chunk is scanned
+    into records by a worker process, then the records are applied to the
+    parsers' database in log order, giving exactly the same result as parsing
+    the log serially.
+
+    :param parsers:
+        Parsers to feed the log to.
+    :param jobs:
+        Number of worker processes to use.
+
+    """
+    parser_clses = [type(parser) for parser in parsers]
+    apply_fns = [parser.apply_record for parser in parsers]
+    chunks = _chunk_ranges(logfile, jobs * _CHUNKS_PER_JOB)
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor, \
+            _scan.paused_gc():
+        # Only have a few chunks in flight at once, to bound the number of
+        # scanned records held in memory.
+        pending = collections.deque()
+        for start, end in chunks:
+            pending.append(executor.submit(
+                _scan_chunk, parser_clses, logfile, start, end))
+            if len(pending) >= jobs * 2:
+                _apply_records(apply_fns, pending.popleft().result())
+        while pending:
+            _apply_records(apply_fns, pending.popleft().result())
+
+
+def _apply_records(apply_fns, records):
+    for parser_idx, record in records:
+        apply_fns[parser_idx](record)
+
+
+def _chunk_ranges(logfile, num_chunks):
+    """
+    Split a log file into chunks of whole lines.
+
+    :return:
+        List of (start, end) byte offsets of each chunk.
+
+    """
+    size = os.path.getsize(logfile)
+    chunk_size = max(size // num_chunks, 1)
+    boundaries = [0]
+    with open(logfile, "rb") as f:
+        for offset in range(chunk_size, size, chunk_size):
+            if offset <= boundaries[-1]:
+                continue
+            # Each chunk ends just after the first newline at or after the
+            # nominal boundary.
+            f.seek(offset - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _scan_chunk(parser_clses, logfile, start, end):
+    """
+    Scan the lines in a chunk of a log file.
+
+    Runs in a worker process.
+
+    :return:
+        List of (parser index, record) for the chunk, in log order.
+
+    """
+    parsers = [parser_cls(None) for parser_cls in parser_clses]
+    for parser in parsers:
+        parser.start_chunk()
+    with _scan.open_log(logfile) as data:
+        return list(_scan.scan(parsers, data, start, end))
@@ -0,0 +1,341 @@
+#------------------------------------------------------------------------------
+# _scan.py
+#
+# Scanning of jam log files for the lines that parsers are interested in.
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Bytes-level jam log scanning."""
+
+__all__ = (
+    "parse_logfile",
+    "paused_gc",
+    "compression",
+    "open_log",
+    "read_blocks",
+    "scan",
+)
+
+
+import bz2
+import contextlib
+import gc
+import gzip
+import locale
+import lzma
+import mmap
+import os
+import queue
+import re
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Magic numbers at the start of compressed logs, and the format each means.
+_COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+# Amount of a compressed log to decompress at once.
+_BLOCK_SIZE = 4 * 1024 * 1024
+# Maximum number of decompressed blocks waiting to be scanned.
+_MAX_QUEUED_BLOCKS = 4
+# Amount of a log to search with a bulk regex at once.
+_BULK_SPAN = 4 * 1024 * 1024
+
+
+def parse_logfile(parsers, logfile):
+    """Feed the lines of a log file to all of the given parsers."""
+    apply_fns = [parser.apply_record for parser in parsers]
+    with paused_gc():
+        for block in read_blocks(logfile):
+            for parser_idx, record in scan(parsers, block, 0, len(block)):
+                apply_fns[parser_idx](record)
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Context manager that disables the cyclic garbage collector.
+
+    Parsing creates lots of objects that live as long as the database, and
+    few reference cycles. Collections while parsing would repeatedly scan the
+    growing database for garbage that isn't there.
+
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def compression(logfile):
+    """
+    Get the compression format of a log file.
+
+    :return:
+        One of "gzip", "bzip2", "xz" or "zstd", or None if the log isn't
+        compressed.
+
+    """
+    with open(logfile, "rb") as f:
+        start = f.read(max(len(magic) for magic, _ in _COMPRESSION_MAGIC))
+    for magic, fmt in _COMPRESSION_MAGIC:
+        if start.startswith(magic):
+            return fmt
+    return None
+
+
+def read_blocks(logfile):
+    """
+    Iterator over the contents of a log file, as blocks of whole lines.
+
+    Compressed logs are decompressed as they're read, on a background thread.
+    Uncompressed logs are memory-mapped and given as a single block.
+
+    :raises ValueError:
+        If the log is compressed in a format that can't be read.
+
+    """
+    fmt = compression(logfile)
+    if fmt is None:
+        with open_log(logfile) as data:
+            yield data
+    else:
+        yield from _decompressed_blocks(logfile, fmt)
+
+
+@contextlib.contextmanager
+def open_log(logfile):
+    """Context manager giving the contents of a log file, as bytes."""
+    with open(logfile, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped.
+            yield b""
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+
+def _open_compressed(logfile, fmt):
+    """Open a compressed log file, for reading its decompressed contents."""
+    if fmt == "gzip":
+        return gzip.open(logfile, "rb")
+    elif fmt == "bzip2":
+        return bz2.open(logfile, "rb")
+    elif fmt == "xz":
+        return lzma.open(logfile, "rb")
+    elif zstandard is None:
+        raise ValueError("Reading {}-compressed logs requires the zstandard "
+                         "package".format(fmt))
+    else:
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(logfile, "rb"), read_across_frames=True, closefd=True)
+
+
+def _decompressed_blocks(logfile, fmt):
+    """
+    Iterator over the decompressed contents of a log, as blocks of lines.
+
+    Decompression runs on a background thread, a few blocks ahead of the
+    consumer. It runs in parallel with scanning, since the decompressors
+    release the GIL.
+
+    """
+    f = _open_compressed(logfile, fmt)
+    # Blocks of lines, then None at the end of the log. Or the exception that
+    # stopped decompression.
+    blocks = queue.Queue(_MAX_QUEUED_BLOCKS)
+    stopping = threading.Event()
+
+    def put(item):
+        # Give up if the consumer has gone away.
+        while not stopping.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return
+
+    def decompress():
+        try:
+            with f:
+                # Incomplete line at the end of the last block.
+                tail = b""
+                while not stopping.is_set():
+                    data = f.read(_BLOCK_SIZE)
+                    if not data:
+                        break
+                    data = tail + data
+                    block_end = data.rfind(b"\n") + 1
+                    if block_end:
+                        put(data[:block_end])
+                    tail = data[block_end:]
+                if tail:
+                    put(tail)
+                put(None)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    try:
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            elif isinstance(block, Exception):
+                raise block
+            yield block
+    finally:
+        stopping.set()
+        thread.join()
+
+
+def scan(parsers, data, start, end):
+    """
+    Scan some lines of a log with the given parsers.
+
+    Only lines matching one of the parsers' line prefixes are decoded and
+    passed to the parsers' scan_line. Each run of other lines in between is
+    reported to the parsers' scan_skipped instead.
+
+    A parser with a bulk regex instead has all of its matches found in one
+    go. Each run of matches, with no records from other parsers in between,
+    is passed to the parser's scan_bulk. Only one parser's bulk regex is
+    used: any others are scanned line by line.
+
+    :param data:
+        Contents of the log, as bytes.
+    :param start:
+        Offset of the first line to scan.
+    :param end:
+        Offset just after the last line to scan.
+
+    :return:
+        Iterator of (parser index, record) for the records returned by the
+        parsers, in log order.
+
+    """
+    bulk_idx = next((parser_idx for parser_idx, parser in enumerate(parsers)
+                     if parser.bulk_re is not None), None)
+    line_parsers = [(parser_idx, parser)
+                    for parser_idx, parser in enumerate(parsers)
+                    if parser_idx != bulk_idx]
+    records = _scan_lines(line_parsers, data, start, end)
+    if bulk_idx is None:
+        for _, parser_idx, record in records:
+            yield parser_idx, record
+        return
+
+    # Scan the bulk parser's lines between each of the other records.
+    bulk_parser = parsers[bulk_idx]
+    bulk_start = start
+    for line_start, parser_idx, record in records:
+        if line_start > bulk_start:
+            yield from _scan_bulk(bulk_idx, bulk_parser,
+                                  data, bulk_start, line_start)
+            bulk_start = line_start
+        yield parser_idx, record
+    yield from _scan_bulk(bulk_idx, bulk_parser, data, bulk_start, end)
+
+
+def _scan_lines(line_parsers, data, start, end):
+    """
+    Scan some lines of a log with parsers that work line by line.
+
+    :return:
+        Iterator of (offset, parser index, record) for each record.
+
+    """
+    if not line_parsers:
+        return
+    candidate_re = _candidate_regex(parser for _, parser in line_parsers)
+    search = candidate_re.search
+    find = data.find
+    # Decode the same way as the log would be opened in text mode.
+    encoding = locale.getpreferredencoding(False)
+    scan_fns = [(parser_idx, parser.scan_line)
+                for parser_idx, parser in line_parsers]
+    skip_fns = [(parser_idx, parser.scan_skipped)
+                for parser_idx, parser in line_parsers]
+
+    # The regex matches the newline before each candidate line, so check the
+    # first line separately.
+    pos = start
+    first_line = data[start:find(b"\n", start, end) + 1 or end]
+    m = candidate_re.match(b"\n" + first_line)
+    line_start = start if m is not None else None
+    while pos < end:
+        if line_start is None:
+            m = search(data, pos - 1, end)
+            line_start = end if m is None else m.start() + 1
+        if line_start > pos:
+            for parser_idx, skip_fn in skip_fns:
+                record = skip_fn()
+                if record is not None:
+                    yield pos, parser_idx, record
+        if line_start >= end:
+            break
+
+        line_end = find(b"\n", line_start, end) + 1 or end
+        line = data[line_start:line_end].decode(encoding, "ignore")
+        if line.endswith("\r\n"):
+            line = line[:-2] + "\n"
+        for parser_idx, scan_fn in scan_fns:
+            record = scan_fn(line)
+            if record is not None:
+                yield line_start, parser_idx, record
+        pos = line_end
+        line_start = None
+
+
+def _scan_bulk(parser_idx, parser, data, start, end):
+    """
+    Scan some lines of a log with a parser's bulk regex.
+
+    :return:
+        Iterator of (parser index, record) for the records returned by the
+        parser.
+
+    """
+    bulk_re = parser.bulk_re
+    find = data.find
+    while start < end:
+        # Don't scan too much at once, to bound the size of each record.
+        span_end = find(b"\n", start + _BULK_SPAN, end) + 1 or end
+        # As for candidate lines, matches start at the newline before each
+        # line, so check the first line separately.
+        first_line = data[start:find(b"\n", start, span_end) + 1 or span_end]
+        m = bulk_re.match(b"\n" + first_line)
+        matches = [] if m is None else [m.groups()]
+        matches += bulk_re.findall(data, start, span_end)
+        if matches:
+            record = parser.scan_bulk(matches)
+            if record is not None:
+                yield parser_idx, record
+        start = span_end
+
+
+def _candidate_regex(parsers):
+    """
+    Compile a regex matching the start of lines any parser could use.
+
+    Matches start at the newline before the line.
+
+    """
+    prefixes = [type(parser).line_prefix for parser in parsers]
+    if None in prefixes:
+        # Every line is a candidate.
+        prefixes = [b""]
+    return re.compile(b"\n(?:" + b"|".join(prefixes) + b")")
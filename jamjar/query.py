@@ -8,13 +8,32 @@
 
 __all__ = (
     "deps",
+    "rdeps",
     "dep_chains",
+    "count_dep_chains",
+    "all_deps",
     "all_deps_bf",
     "all_deps_df",
+    "depends_on",
+    "dep_count",
+    "impact",
+    "level",
+    "cycle",
+    "cycles",
+    "shortest_path",
+    "shortest_paths",
+    "rebuild_chains",
+    "rebuild_causes",
+    "rebuild_tree",
 )
 
 
+import array
+import bisect
 import collections
+import heapq
+import itertools
+import threading
 
 
 def deps(target):
@@ -40,6 +59,25 @@ def deps(target):
             yield dep
 
 
+def rdeps(target):
+    """
+    Iterator that yields the targets that have a target as an immediate
+    dependency, i.e. the reverse of deps().
+
+    Won't yield the same target more than once.
+
+    """
+    yield from target.deps_rev
+    # Anything that includes a target depending on this target also depends
+    # on this target.
+    seen = set(target.deps_rev)
+    for dependent in target.deps_rev:
+        for includer in dependent.incs_rev:
+            if includer not in seen:
+                seen.add(includer)
+                yield includer
+
+
 def deps_rebuilt(target):
     """
     Iterator that yields immediate rebuilt dependencies of a target.
@@ -49,7 +87,7 @@ def deps_rebuilt(target):
             yield dep
 
 
-def dep_chains(target, *, max_depth=0, include_target=None):
+def dep_chains(target, *, max_depth=0, include_target=None, limit=None):
     """
     Iterator that yields dependency chains for a target.
 
@@ -59,7 +97,14 @@ def dep_chains(target, *, max_depth=0, include_target=None):
     - The target at index N depends on the target at index N + 1.
     - The final target doesn't depend on anything.
 
-    The order that chains are produced in is arbitrary.
+    Chains are produced depth-first, following dependencies in the order that
+    Jam reported them. Only one chain is held in memory at a time, so this is
+    safe to use even when there are vast numbers of chains (see
+    :func:`count_dep_chains`).
+
+    If there are dependency cycles, chains don't go round them: within each
+    cycle, only dependencies from targets found earlier (in a depth-first
+    search from the given target) to targets found later are followed.
 
     :param max_depth:
         Terminate all chains at this depth, rather than going as deep as
@@ -75,21 +120,108 @@ def dep_chains(target, *, max_depth=0, include_target=None):
         - False indicates that chains involving the target *must not* be
           returned.
 
+    :param limit:
+        Maximum number of chains to produce.
+
     """
-    chains = []
-    chains.append([target])
-    while chains:
-        extended_chains = []
-        for chain in chains:
-            next_deps = list(deps(chain[-1]))
-            if not next_deps or (max_depth and len(chain) == max_depth):
-                yield chain
+    chains = _ChainGraph(target, max_depth, include_target).chains()
+    if limit is not None:
+        chains = itertools.islice(chains, limit)
+    yield from chains
+
+
+def count_dep_chains(target, *, max_depth=0, include_target=None):
+    """
+    Return the number of chains that dep_chains() would produce.
+
+    This takes time proportional to the size of the graph below the target,
+    rather than the number of chains.
+
+    """
+    return _ChainGraph(target, max_depth, include_target).count()
+
+
+class _ChainGraph:
+    """
+    The graph of dependencies below a target, as followed by dep_chains().
+
+    Cycles are broken (see dep_chains()), leaving a DAG. The number of chains
+    starting at each target is counted by dynamic programming over the DAG,
+    in topological order, so that chains can be counted without enumerating
+    them and enumeration can skip dependencies that lead to no chains.
+
+    """
+    def __init__(self, root, max_depth, include_target):
+        self._root = root
+        self._max_depth = max_depth
+        # Mapping from each target to the dependencies followed from it (i.e.
+        # excluding those that would go round a cycle), and to those of these
+        # allowed by include_target.
+        self._followed, rank = _followed_deps(root)
+        self._included = {
+            target: [dep for dep in followed
+                     if include_target is None or include_target(dep)]
+            for target, followed in self._followed.items()}
+
+        # Order the targets children first: dependencies outside a target's
+        # cycle have a lower topological level, and those followed within it
+        # were discovered later.
+        structure = _graph_structure(root)
+        order = sorted(self._followed,
+                       key=lambda target: (structure.level(target),
+                                           -rank[target]))
+
+        # Number of chains starting at each target, indexed by the depth
+        # available for the chain (or just [None] if depth is unlimited).
+        self._counts = {}
+        depths = range(1, max_depth + 1) if max_depth else [None]
+        for depth in depths:
+            self._counts[depth] = counts = {}
+            for target in order:
+                if not self._followed[target] or depth == 1:
+                    counts[target] = 1
+                else:
+                    sub_counts = self._counts[depth and depth - 1]
+                    counts[target] = sum(sub_counts[dep]
+                                         for dep in self._included[target])
+
+    def _remaining(self, chain_len):
+        """Depth available for a chain after it reaches chain_len targets."""
+        if self._max_depth:
+            return self._max_depth - chain_len + 1
+        return None
+
+    def count(self):
+        return self._counts[self._remaining(1)][self._root]
+
+    def chains(self):
+        """Iterator over the chains from the root, depth-first."""
+        if not self.count():
+            return
+        chain = [self._root]
+        if self._is_end(chain):
+            yield list(chain)
+            return
+        stack = [iter(self._included[self._root])]
+        while stack:
+            counts = self._counts[self._remaining(len(chain) + 1)]
+            for dep in stack[-1]:
+                if counts[dep]:
+                    chain.append(dep)
+                    if self._is_end(chain):
+                        yield list(chain)
+                        chain.pop()
+                    else:
+                        stack.append(iter(self._included[dep]))
+                        break
             else:
-                extended_chains.extend(
-                    chain + [dep]
-                    for dep in deps(chain[-1])
-                    if include_target is None or include_target(dep))
-        chains = extended_chains
+                stack.pop()
+                chain.pop()
+
+    def _is_end(self, chain):
+        """Is this chain complete?"""
+        return (not self._followed[chain[-1]] or
+                len(chain) == self._max_depth)
 
 
 def dep_chains_rebuilt(target):
@@ -97,66 +229,740 @@ def dep_chains_rebuilt(target):
     yield from dep_chains(target, include_target=lambda target: target.rebuilt)
 
 
-def rebuild_chains(target):
+def rebuild_chains(target, *, limit=None):
     """
     Return the chains of targets that caused a given target to be rebuilt.
+
+    Each chain starts with the given target. Each target in a chain was
+    rebuilt because of the next one: either Jam reported it as the reason
+    (see rebuild_causes()), or it's a rebuilt dependency.
+
+    The number of chains can grow combinatorially with the size of the
+    graph: :func:`rebuild_tree` gives the same information in bounded space.
+
+    :param limit:
+        Maximum number of chains to return.
+
     """
-    chains = [_basic_rebuild_chain(target)]
-    while True:
-        extended_chains = []
-        for chain in chains:
-            for dep in deps_rebuilt(chain[-1]):
-                extended_chains.append(chain + _basic_rebuild_chain(dep))
-        if extended_chains:
-            chains = extended_chains
+    if not rebuild_causes(target):
+        return [[target]]
+    chains = []
+    chain = [target]
+    on_chain = {target}
+    stack = [iter(rebuild_causes(target))]
+    while stack and (limit is None or len(chains) < limit):
+        for cause in stack[-1]:
+            if cause in on_chain:
+                continue
+            chain.append(cause)
+            on_chain.add(cause)
+            # Don't go round cycles.
+            next_causes = [next_cause
+                           for next_cause in rebuild_causes(cause)
+                           if next_cause not in on_chain]
+            if next_causes:
+                stack.append(iter(next_causes))
+                break
+            chains.append(list(chain))
+            chain.pop()
+            on_chain.discard(cause)
         else:
-            break
+            stack.pop()
+            on_chain.discard(chain.pop())
     return chains
 
 
-def _basic_rebuild_chain(target):
+def rebuild_causes(target):
     """
-    Get a rebuild chain based purely on 'rebuild info' from Jam.
+    Return the targets that directly caused a target to be rebuilt.
+
+    This is the dependency that Jam reported as the reason for the rebuild,
+    if there is one. Otherwise it's any dependencies that were themselves
+    rebuilt.
+
+    Results are memoized until the database is next modified.
+
     """
-    chain = [target]
-    current = target
-    while True:
-        current = current.rebuild_info.dep
-        if current is None:
-            break
+    if target._db is None:
+        return _rebuild_causes(target)
+    causes = target._db.cached("rebuild_causes", dict)
+    try:
+        return causes[target]
+    except KeyError:
+        result = _rebuild_causes(target)
+        causes[target] = result
+        return result
+
+
+def _rebuild_causes(target):
+    if target.rebuild_info.dep is not None:
+        return (target.rebuild_info.dep,)
+    else:
+        return tuple(deps_rebuilt(target))
+
+
+def rebuild_tree(target):
+    """
+    Iterator that yields the rebuild chains for a target, as a tree.
+
+    Yields (depth, target, repeated) tuples, depth-first: the given target is
+    at depth 0, and the causes of the target at depth N (see rebuild_causes())
+    follow it at depth N + 1.
+
+    Targets are only expanded the first time they're seen: when one appears
+    again, it is yielded with repeated set to True and its causes are
+    skipped. So the whole tree is produced in time proportional to the
+    number of rebuilt targets and dependencies involved, however many chains
+    pass through them.
+
+    """
+    expanded = {target}
+    yield 0, target, False
+    stack = [iter(rebuild_causes(target))]
+    while stack:
+        for cause in stack[-1]:
+            repeated = cause in expanded
+            yield len(stack), cause, repeated
+            if not repeated:
+                expanded.add(cause)
+                stack.append(iter(rebuild_causes(cause)))
+                break
         else:
-            chain.append(current)
-    return chain
+            stack.pop()
 
 
 def all_deps_bf(target):
     """
     Iterator that yields all dependencies of a target, breadth-first.
 
-    This function may yield the same target more than once.
+    This function may yield the same target more than once. Dependency cycles
+    are broken in the same way as by dep_chains(), so it always terminates.
 
     """
+    followed, _ = _followed_deps(target)
     queue = collections.deque()
-    queue.extend(deps(target))
+    queue.extend(followed[target])
     while queue:
         current = queue.popleft()
         yield current
-        queue.extend(deps(current))
+        queue.extend(followed[current])
 
 
 def all_deps_df(target):
     """
     Iterator that yields all dependencies of a target, depth-first.
 
-    This function may yield the same target more than once.
+    This function may yield the same target more than once. Dependency cycles
+    are broken in the same way as by dep_chains(), so it always terminates.
 
     """
+    followed, _ = _followed_deps(target)
     stack = []
     # Make sure we'll yield dependencies in Jam definition order!
-    rev_deps = lambda target: reversed(list(deps(target)))
+    rev_deps = lambda target: reversed(followed[target])
     stack.extend(rev_deps(target))
     while stack:
         current = stack.pop()
         yield current
         stack.extend(rev_deps(current))
 
+
+def all_deps(target):
+    """
+    Return all dependencies of a target, direct or indirect.
+
+    Each dependency is returned once, in the order that Jam first reported the
+    targets. Include cycles are handled: a target in a cycle is a dependency
+    of itself.
+
+    The result is memoized (within a bounded amount of memory) until the
+    database is next modified.
+
+    """
+    return _deps_closure(target).all_deps(target)
+
+
+def depends_on(target, other):
+    """Return whether a target depends, directly or indirectly, on another."""
+    return _deps_closure(target).depends_on(target, other)
+
+
+def dep_count(target):
+    """Return the number of targets returned by all_deps(target)."""
+    return _deps_closure(target).dep_count(target)
+
+
+def level(target):
+    """
+    Return the topological level of a target.
+
+    This is 0 for targets that don't depend on anything, and otherwise one more
+    than the highest level of the target's dependencies, where the targets in
+    a cycle (see cycle()) share a level.
+
+    """
+    return _graph_structure(target).level(target)
+
+
+def cycle(target):
+    """
+    Return the dependency cycle containing a target.
+
+    The result is the targets that both depend on and are depended on by the
+    target, including the target itself, in the order they were created. It's
+    empty if the target isn't in a cycle.
+
+    """
+    structure = _graph_structure(target)
+    component = structure.component_of(target._id)
+    if not structure.is_cyclic(component):
+        return []
+    return [target._db._target_list[member]
+            for member in sorted(structure.members(component))]
+
+
+def cycles(db):
+    """
+    Return all the dependency cycles in a database.
+
+    Each cycle is a list of targets that all depend on each other, as for
+    cycle(). Cycles are returned largest first.
+
+    """
+    structure = _graph_structure_of(db)
+    targets = db._target_list
+    result = [[targets[member] for member in sorted(structure.members(
+                   component))]
+              for component in structure.cyclic_components()]
+    result.sort(key=lambda cycle: (-len(cycle), cycle[0]._id))
+    return result
+
+
+def impact(targets):
+    """
+    Return all targets affected by changes to any of the given targets.
+
+    These are the targets that depend on a changed target, directly or
+    indirectly (see rdeps()), along with those that include one, and so on:
+    e.g. a change to a header affects the sources that include it, and so
+    everything that depends on those sources.
+
+    Each target is returned once, in the order the targets were created. The
+    changed targets themselves are only returned if they're affected by
+    another change (or themselves, via a cycle).
+
+    Results are memoized until the database is next modified.
+
+    """
+    targets = list(targets)
+    if not targets:
+        return []
+    db = targets[0]._db
+    if db is None:
+        raise ValueError("{!r} doesn't belong to a database".format(
+            targets[0]))
+    return db.cached("impact", lambda: _Impact(db)).affected(targets)
+
+
+def shortest_path(target, other):
+    """
+    Return a shortest dependency chain from one target to another.
+
+    The result is a list of targets starting with target and ending with
+    other, where each target depends on the next (as for dep_chains()), or
+    None if target doesn't depend on other.
+
+    """
+    return _shortest_path(target, other, frozenset(), frozenset())
+
+
+def shortest_paths(target, other, k):
+    """
+    Return up to k of the shortest dependency chains from one target to
+    another, shortest first.
+
+    Chains never visit a target more than once. This uses Yen's algorithm,
+    with shortest_path() run for each candidate deviation from the chains
+    already found.
+
+    """
+    first = shortest_path(target, other)
+    if first is None or k < 1:
+        return []
+    paths = [first]
+    seen = {tuple(first)}
+    # Heap of (length, tie-breaker, path) for candidate paths.
+    candidates = []
+    tie_breaker = itertools.count()
+    while len(paths) < k:
+        prev = paths[-1]
+        for idx in range(len(prev) - 1):
+            root = prev[:idx + 1]
+            spur = prev[idx]
+            # Don't allow any of the paths found so far to be repeated, or the
+            # root to be revisited.
+            banned_edges = {(path[idx], path[idx + 1])
+                            for path in paths
+                            if len(path) > idx + 1 and path[:idx + 1] == root}
+            banned_targets = set(root[:-1])
+            spur_path = _shortest_path(spur, other,
+                                       banned_targets, banned_edges)
+            if spur_path is not None:
+                path = root[:-1] + spur_path
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heapq.heappush(candidates,
+                                   (len(path), next(tie_breaker), path))
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates)[2])
+    return paths
+
+
+def _shortest_path(source, dest, banned_targets, banned_edges):
+    """
+    Find a shortest path with a bidirectional breadth-first search.
+
+    The search alternates between levels forward from the source (via deps())
+    and backward from the destination (via rdeps()), always expanding the
+    smaller frontier, until the two meet.
+
+    :param banned_targets:
+        Targets that the path must not pass through.
+
+    :param banned_edges:
+        (target, dependency) pairs that the path must not use.
+
+    """
+    if source == dest:
+        return [source]
+    # Mappings from each target reached to (previous target, distance).
+    fwd = {source: (None, 0)}
+    bwd = {dest: (None, 0)}
+    fwd_frontier = [source]
+    bwd_frontier = [dest]
+
+    while fwd_frontier and bwd_frontier:
+        forward = len(fwd_frontier) <= len(bwd_frontier)
+        if forward:
+            frontier, reached, other_reached = fwd_frontier, fwd, bwd
+            neighbours = deps
+        else:
+            frontier, reached, other_reached = bwd_frontier, bwd, fwd
+            neighbours = rdeps
+
+        # Expand the whole level, then pick the best meeting point found.
+        next_frontier = []
+        best = None
+        for current in frontier:
+            distance = reached[current][1] + 1
+            for neighbour in neighbours(current):
+                edge = (current, neighbour) if forward else (neighbour,
+                                                             current)
+                if neighbour in banned_targets or edge in banned_edges:
+                    continue
+                if neighbour not in reached:
+                    reached[neighbour] = (current, distance)
+                    next_frontier.append(neighbour)
+                if neighbour in other_reached:
+                    length = distance + other_reached[neighbour][1]
+                    if best is None or length < best[0]:
+                        best = (length, current, neighbour)
+        if best is not None:
+            _, current, meeting = best
+            if forward:
+                return _join_path(fwd, current, bwd, meeting)
+            else:
+                return _join_path(fwd, meeting, bwd, current)
+
+        if forward:
+            fwd_frontier = next_frontier
+        else:
+            bwd_frontier = next_frontier
+    return None
+
+
+def _join_path(fwd, fwd_end, bwd, bwd_start):
+    """Join the paths found by the two halves of a bidirectional search."""
+    path = []
+    current = fwd_end
+    while current is not None:
+        path.append(current)
+        current = fwd[current][0]
+    path.reverse()
+    current = bwd_start
+    while current is not None:
+        path.append(current)
+        current = bwd[current][0]
+    return path
+
+
+def _deps_closure(target):
+    """Get the dependency closure engine for a target's database."""
+    db = target._db
+    if db is None:
+        raise ValueError("{!r} doesn't belong to a database".format(target))
+    return db.cached("deps_closure", lambda: _DepsClosure(db))
+
+
+class _DepsClosure:
+    """
+    Memoized transitive closure of the deps() relation.
+
+    Each query traverses the graph below its target, breadth-first over the
+    adjacency lists of target IDs (see :meth:`database.Database._adjacency`),
+    so only the part of the graph the target reaches is visited. Closures are
+    memoized as sorted arrays of target IDs, and a traversal doesn't go below
+    a target whose closure is already known.
+
+    The memo holds at most :data:`_DEPS_MEMO_SIZE` IDs in total, dropping the
+    least recently used closures first, so memory use stays bounded however
+    many targets are queried.
+
+    """
+    def __init__(self, db):
+        self._targets = db._target_list
+        self._deps, self._incs = db._adjacency()
+        # Mapping from target ID to the sorted IDs of its dependencies, least
+        # recently used first, and the total number of IDs held.
+        self._closures = collections.OrderedDict()
+        self._size = 0
+        # Queries may be run from several threads (see server.Server).
+        self._lock = threading.Lock()
+
+    def all_deps(self, target):
+        targets = self._targets
+        return [targets[idx] for idx in self._closure(target._id)]
+
+    def depends_on(self, target, other):
+        closure = self._closure(target._id)
+        idx = bisect.bisect_left(closure, other._id)
+        return idx < len(closure) and closure[idx] == other._id
+
+    def dep_count(self, target):
+        return len(self._closure(target._id))
+
+    def _closure(self, root):
+        """Return the sorted IDs of all dependencies of a target ID."""
+        closures = self._closures
+        with self._lock:
+            closure = closures.get(root)
+            if closure is not None:
+                closures.move_to_end(root)
+                return closure
+
+        # Breadth-first, a level at a time, so that whole rows of the
+        # adjacency lists are merged into sets at once.
+        deps_row = self._deps.row
+        incs_row = self._incs.row
+        reached = set()
+        frontier = [root]
+        while frontier:
+            level = set()
+            for node in frontier:
+                level.update(deps_row(node))
+                # As for deps(): dependencies of included targets are
+                # dependencies too.
+                for inc in incs_row(node):
+                    level.update(deps_row(inc))
+            level -= reached
+            reached |= level
+            frontier = []
+            for node in level:
+                # Everything below a target with a known closure is in it.
+                known = closures.get(node)
+                if known is None:
+                    frontier.append(node)
+                else:
+                    reached.update(known)
+
+        closure = array.array("I", sorted(reached))
+        with self._lock:
+            if root not in closures and len(closure) <= _DEPS_MEMO_SIZE:
+                closures[root] = closure
+                self._size += len(closure)
+                while self._size > _DEPS_MEMO_SIZE:
+                    _, dropped = closures.popitem(last=False)
+                    self._size -= len(dropped)
+        return closure
+
+
+# Maximum number of target IDs held by the memo of dependency closures.
+_DEPS_MEMO_SIZE = 1 << 22
+
+
+class _Impact:
+    """
+    Memoized impact of changes to targets.
+
+    Impact is found by a single traversal of the reversed dependency and
+    inclusion graph, from all the changed targets at once, so each affected
+    target is visited once however many changes it's affected by. The
+    traversal works on the adjacency lists of target IDs (see
+    :meth:`database.Database._reverse_adjacency`), rather than on the targets
+    themselves, so stays fast when most of a large graph is affected.
+
+    Results are memoized as arrays of target IDs. As for
+    :class:`_DepsClosure`, the memo holds at most :data:`_IMPACT_MEMO_SIZE`
+    IDs in total (counting both the changed and the affected targets),
+    dropping the least recently used results first.
+
+    """
+    def __init__(self, db):
+        self._targets = db._target_list
+        self._deps_rev, self._incs_rev = db._reverse_adjacency()
+        # Mapping from a frozenset of changed target IDs to the IDs of the
+        # affected targets, least recently used first, and the total number
+        # of IDs held.
+        self._results = collections.OrderedDict()
+        self._size = 0
+        # Queries may be run from several threads (see server.Server).
+        self._lock = threading.Lock()
+
+    def affected(self, targets):
+        targets_by_id = self._targets
+        return [targets_by_id[idx] for idx in self._affected_ids(targets)]
+
+    def _affected_ids(self, targets):
+        """Return the IDs of the targets affected by changes to targets."""
+        key = frozenset(target._id for target in targets)
+        results = self._results
+        with self._lock:
+            result = results.get(key)
+            if result is not None:
+                results.move_to_end(key)
+                return result
+
+        result = array.array("I", itertools.compress(
+            range(len(self._targets)), self._traverse(key)))
+        size = len(key) + len(result)
+        with self._lock:
+            if key not in results and size <= _IMPACT_MEMO_SIZE:
+                results[key] = result
+                self._size += size
+                while self._size > _IMPACT_MEMO_SIZE:
+                    dropped_key, dropped = results.popitem(last=False)
+                    self._size -= len(dropped_key) + len(dropped)
+        return result
+
+    def _traverse(self, roots):
+        """Return a bytearray flagging the IDs of the affected targets."""
+        deps_rev_row = self._deps_rev.row
+        incs_rev_row = self._incs_rev.row
+        affected = bytearray(len(self._targets))
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            # Anything that includes a dependent is itself a dependent (see
+            # rdeps()), so following both kinds of edge covers everything.
+            for rows in (deps_rev_row(node), incs_rev_row(node)):
+                for other in rows:
+                    if not affected[other]:
+                        affected[other] = 1
+                        stack.append(other)
+        return affected
+
+
+# Maximum number of target IDs held by the memo of impact results.
+_IMPACT_MEMO_SIZE = 1 << 22
+
+
+def _graph_structure(target):
+    """Get the structure of the dependency graph of a target's database."""
+    db = target._db
+    if db is None:
+        raise ValueError("{!r} doesn't belong to a database".format(target))
+    return _graph_structure_of(db)
+
+
+def _graph_structure_of(db):
+    return db.cached("graph_structure", lambda: _GraphStructure(db))
+
+
+class _GraphStructure:
+    """
+    The strongly connected components of the deps() relation over a whole
+    database, and their condensation into a DAG.
+
+    Components are numbered in reverse topological order: each depends only
+    on itself and components with lower IDs. A component is cyclic if its
+    targets depend on themselves, i.e. if it has more than one member or a
+    member that is its own dependency.
+
+    Everything is held in arrays of IDs, so this is compact even for graphs
+    of millions of targets.
+
+    """
+    def __init__(self, db):
+        num_nodes = len(db._target_list)
+        deps, incs = db._adjacency()
+        deps_row, incs_row = deps.row, incs.row
+
+        # Successors of the nodes in components that haven't been completed
+        # yet (these are all that's needed to find the edges between
+        # components).
+        succs = {}
+        def successors(node):
+            # As for deps(): dependencies of included targets are
+            # dependencies too.
+            node_succs = list(deps_row(node))
+            for inc in incs_row(node):
+                node_succs.extend(deps_row(inc))
+            succs[node] = node_succs
+            return node_succs
+
+        self._component_of = component_of = array.array("I",
+                                                        bytes(4 * num_nodes))
+        # Members of each component, in reverse order of their discovery,
+        # and the components each depends on, packed as in
+        # database._Adjacency.
+        self._members = array.array("I")
+        self._member_offsets = array.array("q", [0])
+        self._succs = array.array("I")
+        self._succ_offsets = array.array("q", [0])
+        self._cyclic = bytearray()
+        self._levels = array.array("I")
+        for component, members in enumerate(
+                _strongly_connected(num_nodes, successors)):
+            for member in members:
+                component_of[member] = component
+            component_succs = set()
+            cyclic = len(members) > 1
+            for member in members:
+                for succ in succs.pop(member):
+                    if succ == member:
+                        cyclic = True
+                    component_succs.add(component_of[succ])
+            component_succs.discard(component)
+            component_succs = sorted(component_succs)
+            self._members.extend(members)
+            self._member_offsets.append(len(self._members))
+            self._succs.extend(component_succs)
+            self._succ_offsets.append(len(self._succs))
+            self._cyclic.append(cyclic)
+            self._levels.append(1 + max(map(self._levels.__getitem__,
+                                            component_succs))
+                                if component_succs else 0)
+
+    def component_of(self, node):
+        """Return the ID of the component containing a target ID."""
+        return self._component_of[node]
+
+    def members(self, component):
+        """Return the target IDs in a component."""
+        offsets = self._member_offsets
+        return self._members[offsets[component]:offsets[component + 1]]
+
+    def successors(self, component):
+        """Return the IDs of the components a component depends on."""
+        offsets = self._succ_offsets
+        return self._succs[offsets[component]:offsets[component + 1]]
+
+    def is_cyclic(self, component):
+        return bool(self._cyclic[component])
+
+    def cyclic_components(self):
+        """Iterator over the IDs of the cyclic components."""
+        return (component for component, cyclic in enumerate(self._cyclic)
+                if cyclic)
+
+    def level(self, target):
+        """Return the topological level of a target (see level())."""
+        return self._levels[self._component_of[target._id]]
+
+
+def _followed_deps(root):
+    """
+    Find the dependencies followed from each target below a target, by
+    traversals that don't go round cycles (see dep_chains()).
+
+    :return:
+        (followed, rank) tuple. followed maps the root and each target below
+        it to the list of its dependencies that are followed, and rank maps
+        them to their order of discovery in a depth-first search from the
+        root.
+
+    """
+    structure = _graph_structure(root)
+    component_of = structure.component_of
+    all_deps = {root: list(deps(root))}
+    rank = {root: 0}
+    work = [iter(all_deps[root])]
+    while work:
+        for dep in work[-1]:
+            if dep not in rank:
+                rank[dep] = len(rank)
+                all_deps[dep] = list(deps(dep))
+                work.append(iter(all_deps[dep]))
+                break
+        else:
+            work.pop()
+
+    # Within a cycle, only follow dependencies on targets discovered later.
+    followed = {}
+    for target, target_deps in all_deps.items():
+        component = component_of(target._id)
+        if structure.is_cyclic(component):
+            target_deps = [dep for dep in target_deps
+                           if component_of(dep._id) != component or
+                               rank[dep] > rank[target]]
+        followed[target] = target_deps
+    return followed, rank
+
+
+def _strongly_connected(num_nodes, successors):
+    """
+    Iterator over the strongly connected components of a graph, whose nodes
+    are the ints from 0 to num_nodes - 1.
+
+    This is an iterative version of Tarjan's algorithm, so is safe to use on
+    deep graphs. Components are yielded in reverse topological order, i.e.
+    each component is yielded after all the components it has edges to.
+    Each is a list of its members, in reverse order of their discovery.
+
+    :param successors:
+        Function that returns a list of the successors of a node. This is
+        called exactly once for each node.
+
+    """
+    index = array.array("l", [-1]) * num_nodes
+    lowlink = array.array("l", [0]) * num_nodes
+    on_stack = bytearray(num_nodes)
+    scc_stack = []
+    counter = 0
+
+    for root in range(num_nodes):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        scc_stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, it = work[-1]
+            for succ in it:
+                if index[succ] == -1:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    scc_stack.append(succ)
+                    on_stack[succ] = 1
+                    work.append((succ, iter(successors(succ))))
+                    break
+                elif on_stack[succ] and index[succ] < lowlink[node]:
+                    lowlink[node] = index[succ]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    members = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack[member] = 0
+                        members.append(member)
+                        if member == node:
+                            break
+                    yield members
@@ -0,0 +1,229 @@
+#------------------------------------------------------------------------------
+# server.py - Query server module
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Serving queries on loaded databases to other processes."""
+
+__all__ = (
+    "Server",
+    "Client",
+    "parse_address",
+)
+
+
+import concurrent.futures
+import json
+import os
+import socket
+import threading
+
+from . import batch
+
+
+# Time in seconds between checks for the server being shut down.
+_POLL_INTERVAL = 0.5
+
+
+def parse_address(address):
+    """
+    Parse the address of a server: HOST:PORT for TCP, or otherwise the path
+    of a Unix socket.
+
+    :return:
+        (socket family, address) tuple.
+
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "localhost", int(port))
+    return socket.AF_UNIX, address
+
+
+class Server:
+    """
+    Serves queries on one or more databases over a socket, so that several
+    clients can share them without each loading their own.
+
+    Clients send one request per line, each a JSON object with the "query"
+    to run and its "args" (see :func:`batch.run_query`), and the "log" whose
+    database to query. The log can be left out if only one is being served.
+    The query "logs" gives the list of logs being served.
+
+    Each request gets a response line, in the same order: a JSON object with
+    either the "result" or the "error" that stopped the query being run.
+
+    Each connection is handled on its own thread, and the queries are run on
+    a pool of worker threads. The databases mustn't be modified while they're
+    being served: queries only update memoized results, which is safe to do
+    from several threads at once.
+
+    There's no authentication, so TCP servers should only listen on
+    localhost.
+
+    """
+    def __init__(self, dbs, address, *, num_workers=8):
+        """
+        :param dbs:
+            Mapping from log names to the database for each log.
+        :param address:
+            Address to listen on (see :func:`parse_address`).
+        :param num_workers:
+            Maximum number of queries to run at once.
+
+        """
+        self._dbs = dict(dbs)
+        family, address = parse_address(address)
+        self._unix_path = address if family == socket.AF_UNIX else None
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            if family != socket.AF_UNIX:
+                self._socket.setsockopt(socket.SOL_SOCKET,
+                                        socket.SO_REUSEADDR, 1)
+            self._socket.bind(address)
+            self._socket.listen()
+        except OSError:
+            self._socket.close()
+            raise
+        self._socket.settimeout(_POLL_INTERVAL)
+        self._executor = concurrent.futures.ThreadPoolExecutor(num_workers)
+        self._stopping = threading.Event()
+
+    @property
+    def address(self):
+        """Address the server is listening on."""
+        return self._socket.getsockname()
+
+    def serve_forever(self):
+        """Handle connections until :meth:`shutdown` is called."""
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn, _ = self._socket.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=self._handle, args=(conn,),
+                                 daemon=True).start()
+        finally:
+            self._socket.close()
+            if self._unix_path is not None:
+                os.unlink(self._unix_path)
+            self._executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop accepting connections, from another thread."""
+        self._stopping.set()
+
+    def _handle(self, conn):
+        """Answer the requests on a connection. Runs on its own thread."""
+        try:
+            with conn, conn.makefile("rb") as reader, \
+                    conn.makefile("wb") as writer:
+                for line in reader:
+                    response = self._executor.submit(self._respond,
+                                                     line).result()
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    writer.flush()
+        except (OSError, RuntimeError):
+            # The client went away, or the server is shutting down.
+            pass
+
+    def _respond(self, line):
+        """Get the response to a request. Runs on a worker thread."""
+        try:
+            request = json.loads(line.decode())
+            if not isinstance(request, dict) or "query" not in request:
+                raise ValueError("Request must be an object with a query")
+            name = str(request["query"])
+            args = [str(arg) for arg in request.get("args", ())]
+            if name == "logs":
+                return {"result": list(self._dbs)}
+            return {"result": batch.run_query(self._get_db(request), name,
+                                              args)}
+        except (ValueError, TypeError) as e:
+            return {"error": str(e)}
+        except Exception as e:
+            # Keep serving other requests.
+            return {"error": "Query failed: {!r}".format(e)}
+
+    def _get_db(self, request):
+        log = request.get("log")
+        if log is None:
+            if len(self._dbs) != 1:
+                raise ValueError("Several logs are being served, so the "
+                                 "request must give one")
+            return next(iter(self._dbs.values()))
+        try:
+            return self._dbs[log]
+        except KeyError:
+            raise ValueError("Log isn't being served: {}".format(log))
+
+
+class Client:
+    """
+    Connection to a :class:`Server`.
+
+    .. attribute:: log
+
+        Log to query the database for, or None if the server only serves
+        one.
+
+    """
+    def __init__(self, address, *, log=None):
+        family, address = parse_address(address)
+        self.log = log
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(address)
+        except OSError:
+            self._socket.close()
+            raise
+        self._reader = self._socket.makefile("rb")
+        self._writer = self._socket.makefile("wb")
+        # Only one request can be in flight at once.
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the connection."""
+        self._reader.close()
+        try:
+            self._writer.close()
+        except OSError:
+            # The connection was lost, along with any unsent request.
+            pass
+        self._socket.close()
+
+    def query(self, name, *args):
+        """
+        Run a query on the server.
+
+        :return:
+            The result of the query.
+
+        :raises ValueError:
+            If the server couldn't run the query.
+        :raises OSError:
+            If the connection to the server was lost.
+
+        """
+        request = {"query": name, "args": list(args)}
+        if self.log is not None:
+            request["log"] = self.log
+        with self._lock:
+            self._writer.write(json.dumps(request).encode() + b"\n")
+            self._writer.flush()
+            line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        response = json.loads(line.decode())
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["result"]
@@ -0,0 +1,214 @@
+#------------------------------------------------------------------------------
+# snapshot.py - Database snapshot module
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""
+On-disk snapshots of a parsed target database.
+
+A snapshot flattens a :class:`~jamjar.database.Database` into integer IDs and
+plain lists, so it can be written and read back far quicker than the log it
+came from can be parsed.
+
+Snapshots of a log are cached, keyed by the log's path, size and modification
+time (plus the parsers that were run), so a stale snapshot is never loaded.
+
+"""
+
+__all__ = (
+    "save",
+    "load",
+    "save_cached",
+    "load_cached",
+)
+
+
+import hashlib
+import os
+import pickle
+
+from . import database
+
+
+# Identifies a snapshot file, and the version of the format within it. Bump
+# the version whenever the layout of the body changes.
+_MAGIC = b"JAMJAR-SNAPSHOT\n"
+_FORMAT_VERSION = 3
+
+
+def save(db, path, key=None):
+    """
+    Write a snapshot of a database to a file.
+
+    The file is written atomically: readers see either the old file or the
+    complete new one.
+
+    :param key:
+        Value identifying the source of the database, checked by :func:`load`.
+
+    """
+    header = {"version": _FORMAT_VERSION, "key": key}
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(_flatten(db), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load(path, key=None):
+    """
+    Read a database from a snapshot file.
+
+    :param key:
+        Value that must match the key the snapshot was saved with.
+
+    :return:
+        The loaded database, or None if the file isn't a snapshot in the
+        current format, its key doesn't match, or it's damaged.
+
+    :raises OSError:
+        If the file can't be opened.
+
+    """
+    with open(path, "rb") as f:
+        try:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            header = pickle.load(f)
+            if (header.get("version") != _FORMAT_VERSION or
+                    header.get("key") != key):
+                return None
+            return _unflatten(pickle.load(f))
+        except Exception:
+            # A damaged snapshot could fail in any number of ways, while
+            # unpickling it or rebuilding the database from it. Whatever the
+            # failure, the snapshot can't be used, so the log is parsed
+            # instead.
+            return None
+
+
+def save_cached(db, logfile, parsers, *, cache_dir=None):
+    """Cache a snapshot of the database parsed from a log file."""
+    path = _cache_path(logfile, parsers, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save(db, path, _log_key(logfile, parsers))
+
+
+def load_cached(logfile, parsers, *, cache_dir=None):
+    """
+    Load the cached database for a log file.
+
+    :return:
+        The database, or None if there is no up to date snapshot of the log.
+
+    """
+    try:
+        return load(_cache_path(logfile, parsers, cache_dir),
+                    _log_key(logfile, parsers))
+    except FileNotFoundError:
+        return None
+
+
+def _cache_path(logfile, parsers, cache_dir):
+    """Path of the cached snapshot for a log file."""
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or
+                os.path.join(os.path.expanduser("~"), ".cache"),
+            "jamjar")
+    digest = hashlib.sha1("{}\0{}".format(
+        os.path.abspath(logfile), parsers).encode()).hexdigest()
+    return os.path.join(cache_dir, digest + ".snapshot")
+
+
+def _log_key(logfile, parsers):
+    """Key that changes whenever the log file (or parsing of it) does."""
+    st = os.stat(logfile)
+    return (os.path.abspath(logfile), st.st_size, st.st_mtime_ns, parsers)
+
+
+#------------------------------------------------------------------------------
+# Flattening
+#
+
+def _flatten(db):
+    """Convert a database to plain data, with objects replaced by IDs."""
+    targets = list(db.find_targets(""))
+    target_ids = {target: idx for idx, target in enumerate(targets)}
+    rules = list(db.find_rules(""))
+    calls = db._calls
+
+    def ids(seq):
+        return [target_ids[target] for target in seq]
+
+    def sparse(attr):
+        return {idx: getattr(target, attr)
+                for idx, target in enumerate(targets)
+                if getattr(target, attr) is not None}
+
+    return {
+        "targets": [target.name for target in targets],
+        "graph": tuple((adjacency.offsets, adjacency.ids)
+                       for adjacency in db._adjacency()),
+        "timestamps": sparse("timestamp"),
+        "bindings": sparse("binding"),
+        "rebuilt": [idx for idx, target in enumerate(targets)
+                    if target.rebuilt],
+        "rebuild_reasons": {idx: target.rebuild_info.reason
+                            for idx, target in enumerate(targets)
+                            if target.rebuild_info.reason is not None},
+        "rebuild_deps": {idx: target_ids[target.rebuild_info.dep]
+                         for idx, target in enumerate(targets)
+                         if target.rebuild_info.dep is not None},
+        "timestamp_chains": {idx: ids(target.timestamp_chain)
+                             for idx, target in enumerate(targets)
+                             if target.timestamp_chain is not None},
+        "variables": {idx: list(target.variables.items())
+                      for idx, target in enumerate(targets)
+                      if target.variables},
+        "rules": [rule.name for rule in rules],
+        # Targets and rules are listed in ID order, so the call table can be
+        # stored as it is.
+        "calls": (calls.rules, calls.callers, calls.arg_offsets,
+                  calls.args),
+    }
+
+
+def _unflatten(flat):
+    """Rebuild a database from the output of _flatten."""
+    db = database.Database()
+    targets = [db.get_target(name) for name in flat["targets"]]
+
+    db._install_graph(*(database._Adjacency(offsets, ids)
+                        for offsets, ids in flat["graph"]))
+
+    for idx, timestamp in flat["timestamps"].items():
+        targets[idx].timestamp = timestamp
+    for idx, binding in flat["bindings"].items():
+        targets[idx].binding = binding
+    for idx in flat["rebuilt"]:
+        targets[idx].rebuilt = True
+    for idx, reason in flat["rebuild_reasons"].items():
+        targets[idx]._writable_rebuild_info().reason = reason
+    for idx, dep_id in flat["rebuild_deps"].items():
+        targets[idx]._writable_rebuild_info().dep = targets[dep_id]
+    for idx, chain in flat["timestamp_chains"].items():
+        targets[idx].timestamp_chain = [targets[i] for i in chain]
+    for idx, variables in flat["variables"].items():
+        for variable_name, values in variables:
+            targets[idx].set_var_value(variable_name, values)
+
+    for name in flat["rules"]:
+        db.declare_rule(name)
+    calls = db._calls
+    calls.rules, calls.callers, calls.arg_offsets, calls.args = flat["calls"]
+
+    return db
+
@@ -0,0 +1,97 @@
+#------------------------------------------------------------------------------
+# test_batch.py - Batch query module tests
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Batch query tests."""
+
+__all__ = ()
+
+
+import io
+import json
+import unittest
+
+from .. import batch
+from .. import database
+
+
+class BatchTest(unittest.TestCase):
+    """Tests for running queries in batch mode."""
+
+    def setUp(self):
+        self._db = database.Database()
+        self._db.load_edges([("a", "b", "dep"), ("a", "c", "dep"),
+                             ("b", "d", "dep"), ("c", "d", "dep")])
+        for name in "abd":
+            self._db.get_target(name).set_rebuilt()
+        self._db.get_target("b").set_rebuilt_dep(self._db.get_target("d"))
+
+    def tearDown(self):
+        self._db = None
+
+    def _run(self, script):
+        out = io.StringIO()
+        num_failed = batch.run(self._db, script.splitlines(True), out)
+        return num_failed, [json.loads(line)
+                            for line in out.getvalue().splitlines()]
+
+    def test_run(self):
+        """Test running a script of queries."""
+        num_failed, outputs = self._run(
+            "deps a\n"
+            "# Comment\n"
+            "\n"
+            "rdeps d  # Comment\n"
+            "all_deps a\n"
+            "dep_count a\n"
+            "dep_chain_count a\n"
+            "rebuilt c\n"
+            "rebuild_causes a\n"
+            "depends_on 'a' d\n"
+            "shortest_path d a\n"
+            "targets ^[ab]\n"
+            "impact d\n"
+            "level a\n"
+            "cycles\n")
+        self.assertEqual(num_failed, 0)
+        self.assertEqual([(output["query"], output["args"], output["result"])
+                          for output in outputs], [
+            ("deps", ["a"], ["b", "c"]),
+            ("rdeps", ["d"], ["b", "c"]),
+            ("all_deps", ["a"], ["b", "c", "d"]),
+            ("dep_count", ["a"], 3),
+            ("dep_chain_count", ["a"], 2),
+            ("rebuilt", ["c"], False),
+            ("rebuild_causes", ["a"], ["b"]),
+            ("depends_on", ["a", "d"], True),
+            ("shortest_path", ["d", "a"], None),
+            ("targets", ["^[ab]"], ["a", "b"]),
+            ("impact", ["d"], {"changed": ["d"], "count": 3,
+                               "targets": ["a", "b", "c"]}),
+            ("level", ["a"], 2),
+            ("cycles", [], []),
+        ])
+
+    def test_errors(self):
+        """Test that failed queries are reported, without stopping."""
+        num_failed, outputs = self._run(
+            "deps x\n"
+            "frobnicate a\n"
+            "depends_on a\n"
+            "targets (\n"
+            "deps 'a\n"
+            "impact x\n"
+            "deps a\n")
+        self.assertEqual(num_failed, 6)
+        self.assertEqual([output["error"] for output in outputs[:3]], [
+            "No such target: x",
+            "Unknown query: frobnicate",
+            "depends_on takes 2 arguments",
+        ])
+        self.assertTrue(outputs[3]["error"].startswith("Invalid target regex"))
+        self.assertEqual(outputs[4]["query"], "deps 'a")
+        self.assertIn("error", outputs[4])
+        self.assertEqual(outputs[5]["error"], "No such target or file: x")
+        self.assertEqual(outputs[6]["result"], ["b", "c"])
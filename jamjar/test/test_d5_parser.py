@@ -0,0 +1,126 @@
+#------------------------------------------------------------------------------
+# test_d5_parser.py - Test for the -d+5 parser module
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""d+5 parser tests."""
+
+__all__ = ()
+
+
+import unittest
+
+from .. import database
+from .. import parsers
+
+
+class D5ParserTest(unittest.TestCase):
+    """Tests for the jam d+5 parser"""
+
+    def setUp(self):
+        self._db = database.Database()
+        self._d5_parser = parsers.D5Parser(self._db)
+
+    def tearDown(self):
+        self._db = None
+
+    def _parse(self, lines):
+        for line in lines:
+            self._d5_parser.parse_line(line + "\n")
+
+    def test_parse_lines(self):
+        """Test parsing of each type of line."""
+        self._parse([
+            ">> rule Main",
+            ">> rule Object",
+            ">> Main prog : a.o b.o",
+            ">>>> Object a.o : a.c",
+            ">>>>>> set CCFLAGS on a.o = -O2 -g",
+            ">>>>>> Depends a.o : a.c",
+            ">>>>>> Includes a.c : a.h",
+            ">>>>>> if $(x) = y",
+            ">>>> Object b.o : b.c : extra",
+            ">>>>>> DEPENDS b.o :",
+            "cc -c a.c -o a.o",
+            ">>",
+        ])
+
+        main, obj = self._db.get_rule("Main"), self._db.get_rule("Object")
+        self.assertIsNone(self._db.get_rule("if"))
+        self.assertEqual(len(main.calls), 1)
+        self.assertEqual(len(obj.calls), 2)
+
+        # Calls nested in the Main call
+        main_call = main.calls[0]
+        self.assertIsNone(main_call.caller)
+        self.assertEqual(list(main_call.sub_calls), obj.calls)
+        for call in obj.calls:
+            self.assertIs(call.caller, main_call)
+        self.assertEqual([[target.name for target in arg]
+                          for arg in obj.calls[1].args],
+                         [["b.o"], ["b.c"], ["extra"]])
+
+        a_o = self._db.get_target("a.o")
+        self.assertEqual(a_o.variables["CCFLAGS"], ("-O2", "-g"))
+        self.assertEqual([dep.name for dep in a_o.deps], ["a.c"])
+        self.assertEqual([inc.name for inc in
+                          self._db.get_target("a.c").incs], ["a.h"])
+        self.assertEqual(a_o.rule_calls["target"], [obj.calls[0]])
+
+        # A dependency line without dependencies still creates the target.
+        self.assertEqual(list(self._db.get_target("b.o").deps), [])
+
+    def test_rule_stack(self):
+        """Test calls are linked to their caller at the right depth."""
+        self._parse([
+            ">> rule A",
+            ">> rule B",
+            ">> A x",
+            ">>>> B y",
+            ">>>>>> A z",
+            ">>>> set V on y = 1",
+            ">>>>>> B w",
+            ">> B v",
+            ">>>> if $(V)",
+            ">>>> A u",
+            ">>>>>> switch $(V)",
+            ">>>>>> local x = 1 ;",
+            ">>>>>> B t",
+            ">>>>>> return $(x) ;",
+        ])
+
+        a_x, a_z, a_u = self._db.get_rule("A").calls
+        b_y, b_w, b_v, b_t = self._db.get_rule("B").calls
+        self.assertIs(b_y.caller, a_x)
+        self.assertIs(a_z.caller, b_y)
+        # The set line sits between B y and B w on the stack.
+        self.assertIsNone(b_w.caller)
+        self.assertIsNone(b_v.caller)
+        # Statements in a rule's body are at the same depth as the calls it
+        # makes, so don't get in the way.
+        self.assertIs(a_u.caller, b_v)
+        self.assertIs(b_t.caller, a_u)
+        self.assertEqual(list(a_x.sub_calls), [b_y])
+
+    def test_multiple_edges(self):
+        """Test lines adding edges between several targets."""
+        self._parse([
+            ">> Depends p q : r s",
+            ">> Includes t : r u",
+        ])
+
+        self.assertEqual([target.name for target in
+                          self._db.find_targets("")],
+                         ["p", "r", "s", "q", "t", "u"])
+        p, q, r, s, t, u = self._db.get_targets("pqrstu")
+        self.assertEqual(list(p.deps), [r, s])
+        self.assertEqual(list(q.deps), [r, s])
+        self.assertEqual(list(t.incs), [r, u])
+
+    def test_get_rule_depth(self):
+        """Test the depth given by the prefix of a line."""
+        self.assertEqual(self._d5_parser.get_rule_depth(">>"), 1)
+        self.assertEqual(self._d5_parser.get_rule_depth(">>>>>>"), 3)
+        self.assertEqual(self._d5_parser.get_rule_depth(">"), 18)
+        self.assertEqual(self._d5_parser.get_rule_depth(">>>"), 19)
@@ -9,6 +9,7 @@
 __all__ = ()
 
 
+import random
 import unittest
 
 from .. import database
@@ -53,6 +54,239 @@ class DatabaseTest(unittest.TestCase):
         check_find("foo\d", ["foo1", "foo2"])
         check_find("f.*bar", ["foo-bar", "<f>bar"])
 
+        # Regexes containing literals long enough to be searched for.
+        check_find("bar", ["foo-bar", "<f>bar"])
+        check_find("^foo-?bar$", ["foo-bar"])
+        check_find("o-ba|f>b", ["foo-bar", "<f>bar"])
+        check_find("(?i)FOO-BAR", ["foo-bar"])
+        check_find("[fg]oo1", ["foo1"])
+
+        # Targets added after a search are found too.
+        self._db.get_target("bar")
+        check_find("bar", ["foo-bar", "<f>bar", "bar"])
+
+        with self.assertRaises(ValueError):
+            list(self._db.find_targets("foo("))
+
+    def test_lookup_target(self):
+        """Test the lookup_target method."""
+        foo = self._db.get_target("foo")
+        self.assertIs(self._db.lookup_target("foo"), foo)
+        self.assertIsNone(self._db.lookup_target("fo"))
+        self.assertEqual(repr(self._db), "Database(1 targets, 0 rules)")
+
+    def test_find_grists(self):
+        """Test finding targets and grists by filename."""
+        plain = self._db.get_target("foo.h")
+        first = self._db.get_target("<a!b>foo.h")
+        self._db.get_target("<a!b>bar.h")
+        second = self._db.get_target("<c>foo.h")
+        self._db.get_target("<c>foo.hh")
+
+        self.assertEqual(self._db.targets_with_filename("foo.h"),
+                         [plain, first, second])
+        self.assertEqual(self._db.find_grists("foo.h"), ["", "<a!b>", "<c>"])
+        self.assertEqual(self._db.find_grists("bar.h"), ["<a!b>"])
+        self.assertEqual(self._db.find_grists("baz.h"), [])
+
+    def test_find_rules(self):
+        """Test the find_rules method."""
+        self._db.declare_rule("Object")
+        self._db.declare_rule("Objects")
+        self._db.declare_rule("Library")
+        self.assertEqual([rule.name for rule in self._db.find_rules("Obj")],
+                         ["Object", "Objects"])
+        self.assertEqual([rule.name for rule in self._db.find_rules("y$")],
+                         ["Library"])
+
+    def test_compact(self):
+        """Test that compacting the graph doesn't change its contents."""
+        a, b, c, d = (self._db.get_target(name) for name in "abcd")
+        a.add_dependency(c)
+        a.add_dependency(b)
+        b.add_dependency(c)
+        a.add_inclusion(d)
+        c.add_inclusion(d)
+
+        def check_graph():
+            self.assertEqual(list(a.deps), [c, b])
+            self.assertEqual(list(b.deps), [c])
+            self.assertEqual(list(c.deps), [])
+            self.assertEqual(set(c.deps_rev), {a, b})
+            self.assertEqual(list(a.incs), [d])
+            self.assertEqual(set(d.incs_rev), {a, c})
+
+        self._db.compact()
+        self.assertIsInstance(a.deps, tuple)
+        check_graph()
+        self.assertEqual(set(a.deps_rev), set())
+
+        # Modifying the graph after compacting it is allowed.
+        d.add_dependency(a)
+        a.add_dependency(c)
+        check_graph()
+        self.assertEqual(list(d.deps), [a])
+        self.assertEqual(set(a.deps_rev), {d})
+
+    def test_get_targets(self):
+        """Test getting targets in bulk."""
+        a, b, c = self._db.get_targets(["a", "b", "c"])
+        self.assertEqual(self._db.get_targets(["c", "d", "a"]),
+                         [c, self._db.get_target("d"), a])
+
+    def test_load_edges(self):
+        """Test bulk loading edges."""
+        a, b = self._db.get_targets(["a", "b"])
+        a.add_dependency(b)
+
+        self._db.load_edges([("a", "c", "dep"), ("a", "b", "dep"),
+                             ("c", "d", "inc"), (2, 1, "dep"),
+                             ("a", "c", "dep"), ("e", "a", "inc")])
+        c, d, e = self._db.get_targets(["c", "d", "e"])
+        self.assertEqual([t.name for t in self._db.find_targets("")],
+                         ["a", "b", "c", "d", "e"])
+        self.assertEqual(list(a.deps), [b, c])
+        self.assertEqual(list(c.deps), [b])
+        self.assertEqual(set(b.deps_rev), {a, c})
+        self.assertEqual(list(c.incs), [d])
+        self.assertEqual(list(e.incs), [a])
+        self.assertEqual(set(a.incs_rev), {e})
+
+        # Edges can still be added one at a time, and loaded in bulk again.
+        e.add_dependency(a)
+        self._db.load_edges([("e", "b", "dep"), ("e", "a", "dep")])
+        self.assertEqual(list(e.deps), [a, b])
+        self.assertEqual(set(a.deps_rev), {e})
+
+        with self.assertRaises(ValueError):
+            self._db.load_edges([("a", "b", "foo")])
+
+    def test_load_edges_matches_add(self):
+        """Test that bulk loading edges matches adding them one at a time."""
+        rng = random.Random(0)
+        edges = [("t{}".format(rng.randrange(50)),
+                  "t{}".format(rng.randrange(50)),
+                  rng.choice(["dep", "inc"]))
+                 for _ in range(1000)]
+        one_at_a_time = database.Database()
+        for src, dst, kind in edges:
+            src = one_at_a_time.get_target(src)
+            dst = one_at_a_time.get_target(dst)
+            if kind == "dep":
+                src.add_dependency(dst)
+            else:
+                src.add_inclusion(dst)
+        self._db.load_edges(edges[:500])
+        self._db.load_edges(edges[500:])
+
+        def dump(db):
+            return [(target.name,
+                     [dep.name for dep in target.deps],
+                     sorted(dep.name for dep in target.deps_rev),
+                     [inc.name for inc in target.incs],
+                     sorted(inc.name for inc in target.incs_rev))
+                    for target in db.find_targets("")]
+        self.assertEqual(dump(self._db), dump(one_at_a_time))
+
+    def test_load_indexed_edges(self):
+        """Test bulk loading edges between a table of targets."""
+        a = self._db.get_target("a")
+        self._db.load_indexed_edges(["c", "a", "b", 0, "d"],
+                                    {"dep": ([1, 1, 0], [0, 2, 3]),
+                                     "inc": ([4], [2])})
+        b, c, d = self._db.get_targets(["b", "c", "d"])
+        self.assertEqual([t.name for t in self._db.find_targets("")],
+                         ["a", "c", "b", "d"])
+        self.assertEqual(list(a.deps), [c, b])
+        self.assertEqual(list(c.deps), [a])
+        self.assertEqual(list(d.incs), [b])
+
+        # Targets are created even without any edges.
+        self._db.load_indexed_edges(["e"], {"dep": ([], [])})
+        self.assertIsNotNone(self._db.lookup_target("e"))
+
+        with self.assertRaises(ValueError):
+            self._db.load_indexed_edges(["a"], {"foo": ([0], [0])})
+
+    def test_load_calls(self):
+        """Test that bulk loading rule calls matches adding them in turn."""
+        calls = [("A", ["x", ":", "y"], -1),
+                 ("B", ["y"], 0),
+                 ("A", ["z", "x", ":", ":", "w"], 0),
+                 ("B", [], 2)]
+        one_at_a_time = database.Database()
+        for db in self._db, one_at_a_time:
+            db.get_target("w")
+            db.declare_rule("A")
+            db.declare_rule("B")
+        for rule_name, args, caller in calls:
+            one_at_a_time.add_call(one_at_a_time.get_rule(rule_name), args,
+                                   caller)
+        self.assertEqual(self._db.num_calls(), 0)
+        # Arguments are indexes in the table, with -1 between arguments.
+        # Target "w" is given by its ID.
+        self._db.load_calls(["x", "y", "z", 0],
+                            [self._db.get_rule(rule_name)
+                             for rule_name, _, _ in calls],
+                            [caller for _, _, caller in calls],
+                            [0, -1, 1, 1, 2, 0, -1, -1, 3],
+                            [3, 4, 9, 9])
+        self.assertEqual(self._db.num_calls(), 4)
+
+        def dump(db):
+            return ([t.name for t in db.find_targets("")],
+                    [(call.get_as_string(),
+                      call.caller and call.caller.get_id(),
+                      [sub_call.get_id() for sub_call in call.sub_calls])
+                     for rule in db.find_rules("") for call in rule.calls],
+                    [{target_type: [call.get_id() for call in type_calls]
+                      for target_type, type_calls in t.rule_calls.items()}
+                     for t in db.find_targets("")])
+        self.assertEqual(dump(self._db), dump(one_at_a_time))
+        self.assertEqual(dump(self._db)[1][1],
+                         ("A#1 z x : : w", "A#0", ["B#1"]))
+        self.assertEqual(self._db.get_target("x").rule_calls["target"],
+                         self._db.get_rule("A").calls)
+
+    def test_var_values(self):
+        """Test that equal variable values are shared between targets."""
+        a, b, c = (self._db.get_target(name) for name in "abc")
+        a.set_var_value("HDRS", ["x", "y"])
+        b.set_var_value("HDRS", ["x", "y"])
+        b.set_var_value("DEFINES", ("x", "y"))
+        c.set_var_value("HDRS", ["x"])
+
+        self.assertEqual(a.variables["HDRS"], ("x", "y"))
+        self.assertIs(a.variables["HDRS"], b.variables["HDRS"])
+        self.assertIs(b.variables["DEFINES"], b.variables["HDRS"])
+        self.assertEqual(self._db.targets_with_var_value(["x", "y"], "HDRS"),
+                         [a, b])
+        self.assertEqual(self._db.targets_with_var_value(["x", "y"],
+                                                         "DEFINES"),
+                         [b])
+        self.assertEqual(self._db.targets_with_var_value(("x",)), [c])
+        self.assertEqual(self._db.targets_with_var_value(["z"]), [])
+
+    def test_targets_for_file(self):
+        """Test finding targets by binding or filename."""
+        hdr = self._db.get_target("<src>foo.h")
+        hdr.set_binding("/work/src/foo.h")
+        other = self._db.get_target("<inc>foo.h")
+        other.set_binding("/work/inc/foo.h")
+        plain = self._db.get_target("foo.h")
+        self._db.get_target("<src>bar.h").set_binding("/work/src/xfoo.h")
+
+        self.assertEqual(self._db.targets_for_file("/work/src/foo.h"), [hdr])
+        self.assertEqual(self._db.targets_for_file("src/foo.h"), [hdr])
+        self.assertEqual(self._db.targets_for_file("foo.h"),
+                         [hdr, other, plain])
+        self.assertEqual(self._db.targets_for_file("rc/foo.h"), [])
+
+        # Bindings set later are found too.
+        new = self._db.get_target("new.c")
+        new.set_binding("/work/src/new.c")
+        self.assertEqual(self._db.targets_for_file("src/new.c"), [new])
+
 
 class TargetTest(unittest.TestCase):
     """Tests for the Target class."""
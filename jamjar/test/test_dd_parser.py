@@ -45,3 +45,20 @@ class DdParserTest(unittest.TestCase):
         self.assertEqual(len(targets[0].incs),1)
         self.assertEqual(targets[0].incs[0].name, "b")
 
+    def test_parse_lines(self):
+        """Test that parsing line by line matches parsing the file."""
+        logfile = os.path.join(self._logdir, "example_dd.log")
+        self._dd_parser.parse_logfile(logfile)
+
+        by_line = database.Database()
+        parser = parsers.DDParser(by_line)
+        with open(logfile) as f:
+            for line in f:
+                parser.parse_line(line)
+
+        def edges(db):
+            return [(target.name,
+                     [dep.name for dep in target.deps],
+                     [inc.name for inc in target.incs])
+                    for target in db.find_targets("")]
+        self.assertEqual(edges(self._db), edges(by_line))
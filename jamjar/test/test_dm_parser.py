@@ -9,6 +9,7 @@
 __all__ = ()
 
 
+import datetime
 import unittest
 
 from .. import database
@@ -35,3 +36,44 @@ class DmParserTest(unittest.TestCase):
         #target = database.Target(targets.pop().name)
         #self.assertEqual(target.name, ...)
 
+    def test_parse_lines(self):
+        """Test parsing of each type of line."""
+        lines = [
+            "make\t--\t<grist>foo.o",
+            "time\t--\t<grist>foo.c: Mon Nov 16 10:15:42 2015",
+            "bind\t--\t<grist>foo.c: /src/foo.c",
+            "made+\tupdate\t<grist>foo.o",
+            "made\tstable\t<grist>foo.c",
+            "cc -c foo.c -o foo.o",
+            "makefile: nothing to be done",
+            "timeout",
+        ]
+        for line in lines:
+            self._dm_parser.parse_line(line + "\n")
+
+        foo_o = self._db.get_target("<grist>foo.o")
+        foo_c = self._db.get_target("<grist>foo.c")
+        self.assertEqual(len(list(self._db.find_targets(""))), 2)
+        self.assertTrue(foo_o.rebuilt)
+        self.assertEqual(foo_o.rebuild_info.reason, "update")
+        self.assertFalse(foo_c.rebuilt)
+        self.assertEqual(foo_c.binding, "/src/foo.c")
+        self.assertEqual(foo_c.timestamp,
+                         datetime.datetime(2015, 11, 16, 10, 15, 42))
+
+    def test_parse_timestamps(self):
+        """Test parsing of timestamps, including padded days."""
+        lines = [
+            "time\t--\ta: Mon Nov  2 10:15:42 2015",
+            "time\t--\tb: Mon Nov  2 10:15:42 2015",
+            "time\t--\tc: Thu Nov 12 09:00:00 2015",
+            "time\t--\td: unbound",
+        ]
+        for line in lines:
+            self._dm_parser.parse_line(line + "\n")
+
+        a, b, c, d = (self._db.get_target(name) for name in "abcd")
+        self.assertEqual(a.timestamp, datetime.datetime(2015, 11, 2, 10, 15, 42))
+        self.assertIs(a.timestamp, b.timestamp)
+        self.assertEqual(c.timestamp, datetime.datetime(2015, 11, 12, 9))
+        self.assertIsNone(d.timestamp)
@@ -0,0 +1,242 @@
+#------------------------------------------------------------------------------
+# test_parse.py - Tests for the top-level parse driver
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Parse driver tests."""
+
+__all__ = ()
+
+
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from .. import database
+from .. import parsers
+from .. import snapshot
+from ..parsers import _parallel
+from ..parsers import _scan
+
+
+_MIXED_LOG = """\
+Depends "p" : "q" ;
+make -- p
+made update p
+   Rebuilding "p": it is older than "q"
+        "q" inherits timestamp from "r"
+        "r" inherits timestamp from "s"
+bind -- p: /src/p
+Includes "a" : "b" ;
+Depends "p" : "t" ;
+"""
+
+
+class ParseTest(unittest.TestCase):
+    """Tests for the parsers.parse function."""
+
+    def setUp(self):
+        fd, self._logfile = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            f.write(_MIXED_LOG)
+
+    def tearDown(self):
+        os.remove(self._logfile)
+
+    def test_single_pass(self):
+        """Test that one pass gives the same results as separate passes."""
+        combined = self._parse("dmc")
+        separate = database.Database()
+        for parser_cls in (parsers.DDParser, parsers.DMParser,
+                           parsers.DCParser):
+            parser_cls(separate).parse_logfile(self._logfile)
+
+        self.assertEqual(_dump(combined), _dump(separate))
+
+        p = combined.get_target("p")
+        self.assertEqual([t.name for t in p.deps], ["q", "t"])
+        self.assertEqual(p.binding, "/src/p")
+        self.assertEqual(p.rebuild_info.dep.name, "q")
+        self.assertEqual([t.name for t in
+                          combined.get_target("q").timestamp_chain],
+                         ["r", "s"])
+
+    def test_parser_selection(self):
+        """Test that only the selected parsers are run."""
+        db = self._parse("d")
+        p = db.get_target("p")
+        self.assertEqual(len(p.deps), 2)
+        self.assertIsNone(p.binding)
+        self.assertFalse(p.rebuilt)
+
+
+    def test_scan(self):
+        """Test that scanning the log matches handing every line over."""
+        log = (_MIXED_LOG +
+               '   Rebuilding "x": it depends on newer "y"\r\n'
+               '        "y" inherits timestamp from "z"\r\n'
+               "...patience...\n"
+               '        "z" inherits timestamp from "w"\n'
+               ">> rule R\n"
+               "   >> R x : y\n"
+               "Depends \"x\" : \"w\" ;")
+        with open(self._logfile, "w", newline="") as f:
+            f.write(log)
+
+        scanned = self._parse("dmc5")
+        by_line = database.Database()
+        parsers_to_run = [parser_cls(by_line) for parser_cls in
+                          (parsers.DDParser, parsers.DCParser,
+                           parsers.DMParser, parsers.D5Parser)]
+        for line in io.StringIO(log, newline=None):
+            for parser in parsers_to_run:
+                parser.parse_line(line)
+
+        self.assertEqual(snapshot._flatten(scanned),
+                         snapshot._flatten(by_line))
+        self.assertEqual([t.name for t in
+                          scanned.get_target("y").timestamp_chain], ["z"])
+        self.assertEqual([t.name for t in scanned.get_target("x").deps],
+                         ["w"])
+
+    def test_compressed(self):
+        """Test parsing compressed logs."""
+        with open(self._logfile, "rb") as f:
+            data = f.read()
+        expected = snapshot._flatten(self._parse("dmc"))
+
+        for fmt, compress in (("gzip", gzip.compress),
+                              ("bzip2", bz2.compress),
+                              ("xz", lzma.compress)):
+            with self.subTest(fmt=fmt):
+                with open(self._logfile, "wb") as f:
+                    f.write(compress(data))
+                self.assertEqual(_scan.compression(self._logfile), fmt)
+                # Use small blocks, so lines are split across reads.
+                with mock.patch.object(_scan, "_BLOCK_SIZE", 7):
+                    db = self._parse("dmc", jobs=2)
+                self.assertEqual(snapshot._flatten(db), expected)
+
+    @unittest.skipIf(_scan.zstandard is not None,
+                     "zstandard package is installed")
+    def test_compressed_unsupported(self):
+        """Test parsing zstd-compressed logs without zstandard."""
+        with open(self._logfile, "wb") as f:
+            f.write(b"\x28\xb5\x2f\xfd" + bytes(16))
+        with self.assertRaises(ValueError):
+            self._parse("dmc")
+
+    def test_parallel(self):
+        """Test that parsing in parallel matches parsing serially."""
+        lines = []
+        for i in range(50):
+            lines += [
+                'Depends "p{}" : "q{}" ;\n'.format(i, i),
+                "make -- p{}\n".format(i),
+                "made update p{}\n".format(i),
+                '   Rebuilding "p{}": it is older than "q{}"\n'.format(i, i),
+            ]
+            # Long chains, that are likely to span chunk boundaries.
+            lines += ['        "c{}.{}" inherits timestamp from "c{}.{}"\n'
+                      .format(i, j, i, j + 1) for j in range(i % 7)]
+            lines += [
+                "bind -- p{}: /src/p{}\n".format(i, i),
+                ">> rule Rule{}\n".format(i % 5),
+                ">> Rule{} p{} : q{}\n".format(i % 3, i, i),
+                ">>>> Rule{} q{}\n".format(i % 4, i),
+                ">>>> if $(VAR) = {}\n".format(i),
+                ">>>>>> Rule{} r{}\n".format(i % 5, i),
+                ">>>> set VAR on p{} = {}\n".format(i, i),
+                ">>>>>> DEPENDS q{} : r{} s{}\n".format(i, i, i),
+            ]
+        with open(self._logfile, "w") as f:
+            f.writelines(lines)
+
+        for options in ("dmc5", "d"):
+            serial = self._parse(options)
+            for jobs in (2, 3):
+                with self.subTest(options=options, jobs=jobs):
+                    parallel = self._parse(options, jobs=jobs)
+                    self.assertEqual(snapshot._flatten(parallel),
+                                     snapshot._flatten(serial))
+
+    def test_follow(self):
+        """Test following a log as it's written."""
+        db = database.Database()
+        follower = parsers.Follower(db, self._logfile,
+                                    [parsers.DDParser(db),
+                                     parsers.DCParser(db)],
+                                    poll_interval=0.01, batch_size=2)
+        follower.start()
+        try:
+            follower.catch_up()
+            self.assertEqual(follower.lines_applied, 9)
+            self.assertEqual(len(db.get_target("p").deps), 2)
+
+            with open(self._logfile, "a") as f:
+                f.write('Depends "p" : "u" ;\nDepends "p" ')
+                f.flush()
+                self._wait_for_lines(follower, 10)
+                # The incomplete line isn't parsed until it's finished.
+                self.assertEqual([t.name for t in db.get_target("p").deps],
+                                 ["q", "t", "u"])
+                f.write(': "v" ;\n')
+            self._wait_for_lines(follower, 11)
+            self.assertEqual([t.name for t in db.get_target("p").deps],
+                             ["q", "t", "u", "v"])
+        finally:
+            follower.stop()
+
+    def test_chunk_ranges(self):
+        """Test that logs are split into chunks of whole lines."""
+        with open(self._logfile, "rb") as f:
+            data = f.read()
+        for num_chunks in (1, 2, 5, len(data), len(data) * 2):
+            chunks = _parallel._chunk_ranges(self._logfile, num_chunks)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], len(data))
+            for (_, end), (start, _) in zip(chunks, chunks[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(data[end - 1:end], b"\n")
+
+
+    #--------------------------------------------------------------------------
+    # Helpers
+    #
+
+    def _parse(self, options, jobs=1):
+        """Parse the test log with the given options into a new database."""
+        db = database.Database()
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsers.parse(db, self._logfile, options, jobs=jobs)
+        return db
+
+    def _wait_for_lines(self, follower, num_lines):
+        """Apply updates until a follower has applied some number of lines."""
+        deadline = time.monotonic() + 10
+        while (follower.lines_applied < num_lines and
+               time.monotonic() < deadline):
+            follower.apply_updates(timeout=0.01)
+        self.assertEqual(follower.lines_applied, num_lines)
+
+
+def _dump(db):
+    """Summarise the contents of a database for comparison."""
+    return {
+        target.name: ([dep.name for dep in target.deps],
+                      [inc.name for inc in target.incs],
+                      target.binding,
+                      target.rebuilt,
+                      target.rebuild_info.reason,
+                      target.timestamp_chain and
+                          [t.name for t in target.timestamp_chain])
+        for target in db.find_targets("")
+    }
@@ -11,6 +11,7 @@ __all__ = ()
 
 import collections
 import unittest
+from unittest import mock
 
 from .. import database
 from .. import query
@@ -118,6 +119,176 @@ class DependencyTest(unittest.TestCase):
                  "e", "f",
         ])
 
+    def test_all_deps(self):
+        """Test the deduplicated all_deps function."""
+        deps = query.all_deps(self._targets["x"])
+        self.assertEqual(
+            set(deps), {self._db.get_target(name) for name in "yzdref"})
+        self.assertEqual(len(deps), 6)
+        self._check_result(query.all_deps(self._targets["f"]), [])
+        self.assertEqual(query.dep_count(self._targets["x"]), 6)
+        self.assertEqual(query.dep_count(self._targets["c"]), 2)
+
+    def test_depends_on(self):
+        """Test the depends_on function."""
+        x = self._targets["x"]
+        self.assertTrue(query.depends_on(x, self._targets["f"]))
+        self.assertTrue(query.depends_on(x, self._targets["r"]))
+        self.assertFalse(query.depends_on(x, self._targets["q"]))
+        self.assertFalse(query.depends_on(x, x))
+        self.assertFalse(query.depends_on(self._targets["f"], x))
+
+    def test_all_deps_memo(self):
+        """Test all_deps when closures are reused and dropped from the memo."""
+        t = self._targets
+        expected = {name: {dep.name for dep in query.all_deps_bf(target)}
+                    for name, target in t.items()}
+        with mock.patch.object(query, "_DEPS_MEMO_SIZE", 3):
+            for _ in range(2):
+                # Targets low in the graph first, so their closures are
+                # reused by those above, then everything again.
+                for name in "fedcbayzx":
+                    self.assertEqual(
+                        [dep.name for dep in query.all_deps(t[name])],
+                        sorted(expected[name], key=lambda n: t[n]._id))
+
+    def test_all_deps_cycle(self):
+        """Test all_deps with a dependency cycle."""
+        self._targets["f"].add_dependency(self._targets["d"])
+        self._check_result(query.all_deps(self._targets["d"]), ["d", "f"])
+        self.assertTrue(query.depends_on(self._targets["d"],
+                                         self._targets["d"]))
+        self.assertEqual(query.dep_count(self._targets["a"]), 5)
+
+    def test_all_deps_invalidation(self):
+        """Test that all_deps results are updated when the graph changes."""
+        c = self._targets["c"]
+        self.assertEqual(query.dep_count(c), 2)
+        self._targets["f"].add_dependency(self._get_target("new"))
+        self.assertEqual(query.dep_count(c), 3)
+        self.assertTrue(query.depends_on(c, self._targets["new"]))
+
+    def test_new_target_after_query(self):
+        """Test queries on a target created after the graph was queried."""
+        self.assertEqual(query.level(self._targets["a"]), 3)
+        new = self._get_target("new")
+        self.assertEqual(query.level(new), 0)
+        self.assertEqual(query.all_deps(new), [])
+        self.assertEqual(query.cycle(new), [])
+        self.assertEqual(list(query.dep_chains(new)), [[new]])
+
+    def test_rdeps(self):
+        """Test the rdeps function."""
+        # d is a dep of b and y directly, and of z and y via their
+        # inclusion of b.
+        self.assertEqual(set(query.rdeps(self._targets["d"])),
+                         {self._targets[name] for name in "byz"})
+        for target in self._targets.values():
+            for dep in query.deps(target):
+                self.assertIn(target, set(query.rdeps(dep)))
+
+    def test_level(self):
+        """Test the topological levels of targets."""
+        levels = {name: query.level(target)
+                  for name, target in self._targets.items()}
+        self.assertEqual(levels, {
+            "f": 0, "d": 1, "e": 1, "b": 2, "c": 2, "a": 3,
+            "p": 4, "q": 3, "r": 2, "x": 4, "y": 3, "z": 2,
+        })
+        self.assertEqual(query.cycles(self._db), [])
+        self.assertEqual(query.cycle(self._targets["a"]), [])
+
+    def test_cycles(self):
+        """Test finding dependency cycles, including via inclusions."""
+        t = self._targets
+        # Everything f's inclusion of a depends on now depends on f.
+        t["f"].add_inclusion(t["a"])
+        t["p"].add_dependency(t["p"])
+        cycles = query.cycles(self._db)
+        self.assertEqual(len(cycles), 2)
+        self._check_result(cycles[0], "bcdef")
+        self._check_result(cycles[1], "p")
+        self._check_result(query.cycle(t["d"]), "bcdef")
+        self.assertEqual(query.cycle(t["a"]), [])
+        self.assertEqual(query.level(t["f"]), 0)
+        self.assertEqual(query.level(t["a"]), 1)
+        self.assertEqual(query.level(t["x"]), 3)
+
+    def test_all_deps_bf_df_cycle(self):
+        """Test that the all_deps iterators don't go round cycles."""
+        self._targets["f"].add_dependency(self._targets["d"])
+        self._check_result(query.all_deps_bf(self._targets["c"]), "efd")
+        self._check_result(query.all_deps_df(self._targets["c"]), "efd")
+
+    def test_impact(self):
+        """Test the impact function."""
+        t = self._targets
+        # Everything is affected by f, including q and p via r's inclusion
+        # of c.
+        self._check_result(query.impact([t["f"]]), "abcdepqrxyz")
+        self._check_result(query.impact([t["c"]]), "apqrxy")
+        self._check_result(query.impact([t["c"], t["f"]]), "abcdepqrxyz")
+        self._check_result(query.impact([t["x"]]), [])
+        self.assertEqual(query.impact([]), [])
+        # Anything that depends on a target is affected by it.
+        for target in t.values():
+            impacted = set(query.impact([target]))
+            for other in t.values():
+                if query.depends_on(other, target):
+                    self.assertIn(other, impacted)
+
+    def test_impact_memo(self):
+        """Test impact when results are reused and dropped from the memo."""
+        t = self._targets
+        expected = {name: [target.name for target in query.impact([t[name]])]
+                    for name in t}
+        # Start again with an empty memo.
+        self._db._changed()
+        # Enough for some results, but not all of them at once.
+        with mock.patch.object(query, "_IMPACT_MEMO_SIZE", 12):
+            for _ in range(2):
+                for name in "xcfdr":
+                    self.assertEqual(
+                        [target.name for target in query.impact([t[name]])],
+                        expected[name])
+            impact = self._db.cached("impact", None)
+            self.assertLessEqual(impact._size, 12)
+            self.assertEqual(impact._size,
+                             sum(len(key) + len(result) for key, result
+                                 in impact._results.items()))
+
+    def test_impact_cycle(self):
+        """Test impact with a dependency cycle."""
+        self._targets["f"].add_dependency(self._targets["d"])
+        self.assertIn(self._targets["d"], query.impact([self._targets["d"]]))
+        self._check_result(query.impact([self._targets["a"]]), [])
+
+    def test_shortest_path(self):
+        """Test the shortest_path function."""
+        path = query.shortest_path(self._targets["x"], self._targets["f"])
+        self._check_result(path, ["x", "y", "d", "f"])
+        path = query.shortest_path(self._targets["x"], self._targets["r"])
+        self._check_result(path, ["x", "y", "r"])
+        self.assertIsNone(
+            query.shortest_path(self._targets["f"], self._targets["x"]))
+        self.assertIsNone(
+            query.shortest_path(self._targets["x"], self._targets["q"]))
+
+    def test_shortest_paths(self):
+        """Test the k-shortest paths function."""
+        paths = query.shortest_paths(self._targets["x"], self._targets["f"], 10)
+        self._check_result(paths[0], ["x", "y", "d", "f"])
+        self.assertEqual([len(path) for path in paths], [4, 4, 4, 4, 5])
+        self._check_chains_result(paths, [
+            ["x", "y", "d", "f"],
+            ["x", "y", "e", "f"],
+            ["x", "z", "d", "f"],
+            ["x", "z", "e", "f"],
+            ["x", "y", "r", "e", "f"],
+        ])
+        paths = query.shortest_paths(self._targets["x"], self._targets["f"], 2)
+        self.assertEqual(len(paths), 2)
+
     def test_dep_chains_basic(self):
         """Test the dep_chains function for one chain.""",
         chains = query.dep_chains(self._targets["c"])
@@ -153,6 +324,67 @@ class DependencyTest(unittest.TestCase):
             ["x", "z"],
         ])
 
+    def test_dep_chains_include_target(self):
+        """Test the include_target parameter of dep_chains."""
+        chains = query.dep_chains(self._targets["x"],
+                                  include_target=lambda t: t.name != "d")
+        self._check_chains_result(chains, [
+            ["x", "y", "r", "e", "f"],
+            ["x", "y", "e", "f"],
+            ["x", "z", "e", "f"],
+        ])
+
+        # Chains that can't reach the bottom of the graph are dropped.
+        chains = query.dep_chains(self._targets["x"],
+                                  include_target=lambda t: t.name != "f")
+        self._check_chains_result(chains, [])
+
+    def test_dep_chains_limit(self):
+        """Test the limit parameter of dep_chains."""
+        chains = list(query.dep_chains(self._targets["x"], limit=2))
+        self.assertEqual(len(chains), 2)
+        self._check_chains_result(chains, [
+            ["x", "y", "d", "f"],
+            ["x", "y", "r", "e", "f"],
+        ])
+
+    def test_dep_chains_cycle(self):
+        """Test that dep_chains doesn't follow dependency cycles."""
+        self._targets["f"].add_dependency(self._targets["d"])
+        chains = query.dep_chains(self._targets["c"])
+        self._check_chains_result(chains, [
+            ["c", "e", "f", "d"],
+        ])
+        self.assertEqual(query.count_dep_chains(self._targets["c"]), 1)
+
+    def test_count_dep_chains(self):
+        """Test counting dep chains."""
+        for name in ("a", "c", "f", "x", "y"):
+            for max_depth in (0, 1, 2, 3, 10):
+                self.assertEqual(
+                    query.count_dep_chains(self._targets[name],
+                                           max_depth=max_depth),
+                    len(list(query.dep_chains(self._targets[name],
+                                              max_depth=max_depth))))
+        self.assertEqual(query.count_dep_chains(self._targets["x"]), 5)
+
+    def test_count_dep_chains_large(self):
+        """Test counting chains when there are far too many to list."""
+        # A ladder of 200 rungs, with 2^200 chains from top to bottom.
+        prev = [self._get_target("top")]
+        for rung in range(200):
+            targets = [self._get_target("l{}".format(rung)),
+                       self._get_target("r{}".format(rung))]
+            for target in prev:
+                for dep in targets:
+                    target.add_dependency(dep)
+            prev = targets
+        self.assertEqual(query.count_dep_chains(self._targets["top"]),
+                         2 ** 200)
+        chains = list(query.dep_chains(self._targets["top"], limit=3))
+        self.assertEqual(len(chains), 3)
+        self.assertEqual(len(chains[0]), 201)
+
 
     #--------------------------------------------------------------------------
     # Helpers
@@ -186,3 +418,100 @@ class DependencyTest(unittest.TestCase):
             self._targets[name] = self._db.get_target(name)
         return self._targets[name]
 
+
+
+class RebuildTest(unittest.TestCase):
+    """Test queries related to rebuild causes."""
+
+    # Rebuilt targets and the dependencies Jam reported as their reason.
+    _rebuilt = {
+        "top": None,
+        "lib1": None,
+        "lib2": None,
+        "obj1": "hdr",
+        "obj2": "hdr",
+        "hdr": "gen",
+        "gen": None,
+    }
+
+    _deps = {
+        "top": ["lib1", "lib2", "clean"],
+        "lib1": ["obj1"],
+        "lib2": ["obj1", "obj2"],
+        "obj1": ["hdr"],
+        "obj2": ["hdr"],
+    }
+
+    def setUp(self):
+        self._db = database.Database()
+        for name, deps in self._deps.items():
+            target = self._db.get_target(name)
+            for dep in deps:
+                target.add_dependency(self._db.get_target(dep))
+        for name, reason in self._rebuilt.items():
+            target = self._db.get_target(name)
+            if reason is None:
+                target.set_rebuilt()
+            else:
+                target.set_rebuilt_dep(self._db.get_target(reason))
+
+    def tearDown(self):
+        self._db = None
+
+    def test_rebuild_causes(self):
+        """Test the rebuild_causes function."""
+        self.assertEqual(self._names(query.rebuild_causes(self._get("top"))),
+                         ["lib1", "lib2"])
+        self.assertEqual(self._names(query.rebuild_causes(self._get("obj1"))),
+                         ["hdr"])
+        self.assertEqual(self._names(query.rebuild_causes(self._get("gen"))),
+                         [])
+
+    def test_rebuild_chains(self):
+        """Test the rebuild_chains function."""
+        chains = query.rebuild_chains(self._get("top"))
+        self.assertEqual([self._names(chain) for chain in chains], [
+            ["top", "lib1", "obj1", "hdr", "gen"],
+            ["top", "lib2", "obj1", "hdr", "gen"],
+            ["top", "lib2", "obj2", "hdr", "gen"],
+        ])
+        self.assertEqual(len(query.rebuild_chains(self._get("top"),
+                                                  limit=2)), 2)
+        self.assertEqual([self._names(chain) for chain in
+                          query.rebuild_chains(self._get("gen"))],
+                         [["gen"]])
+
+    def test_rebuild_tree(self):
+        """Test the rebuild_tree function."""
+        tree = [(depth, target.name, repeated) for depth, target, repeated
+                in query.rebuild_tree(self._get("top"))]
+        self.assertEqual(tree, [
+            (0, "top", False),
+            (1, "lib1", False),
+            (2, "obj1", False),
+            (3, "hdr", False),
+            (4, "gen", False),
+            (1, "lib2", False),
+            (2, "obj1", True),
+            (2, "obj2", False),
+            (3, "hdr", True),
+        ])
+
+    def test_rebuild_cycle(self):
+        """Test that rebuild queries cope with cycles."""
+        self._get("gen").set_rebuilt_dep(self._get("obj1"))
+        chains = query.rebuild_chains(self._get("obj2"))
+        self.assertEqual([self._names(chain) for chain in chains],
+                         [["obj2", "hdr", "gen", "obj1"]])
+        self.assertEqual(len(list(query.rebuild_tree(self._get("obj2")))), 5)
+
+
+    #--------------------------------------------------------------------------
+    # Helpers
+    #
+
+    def _get(self, name):
+        return self._db.get_target(name)
+
+    def _names(self, targets):
+        return [target.name for target in targets]
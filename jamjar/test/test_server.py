@@ -0,0 +1,102 @@
+#------------------------------------------------------------------------------
+# test_server.py - Query server module tests
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Query server tests."""
+
+__all__ = ()
+
+
+import concurrent.futures
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from .. import database
+from .. import server
+
+
+class ServerTest(unittest.TestCase):
+    """Tests for serving queries on databases."""
+
+    def setUp(self):
+        self._dbs = {}
+        for log, edges in (("one.log", [("a", "b"), ("b", "c")]),
+                           ("two.log", [("x", "y")])):
+            db = database.Database()
+            db.load_edges((x, y, "dep") for x, y in edges)
+            db.compact()
+            self._dbs[log] = db
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._servers = []
+
+    def tearDown(self):
+        for query_server, thread in self._servers:
+            query_server.shutdown()
+            thread.join()
+        self._tmpdir.cleanup()
+
+    def _serve(self, dbs, address):
+        query_server = server.Server(dbs, address)
+        thread = threading.Thread(target=query_server.serve_forever)
+        thread.start()
+        self._servers.append((query_server, thread))
+        return query_server
+
+    def test_unix_socket(self):
+        """Test queries over a Unix socket."""
+        path = os.path.join(self._tmpdir.name, "jamjar.sock")
+        self._serve(self._dbs, path)
+
+        with server.Client(path, log="one.log") as client:
+            self.assertEqual(client.query("logs"), ["one.log", "two.log"])
+            self.assertEqual(client.query("all_deps", "a"), ["b", "c"])
+            self.assertEqual(client.query("dep_chains", "a", "limit=1"),
+                             {"count": 1, "chains": [["a", "b", "c"]]})
+            with self.assertRaisesRegex(ValueError, "No such target"):
+                client.query("deps", "x")
+            # The connection is still usable after an error.
+            self.assertEqual(client.query("rdeps", "c"), ["b"])
+
+            client.log = "two.log"
+            self.assertEqual(client.query("deps", "x"), ["y"])
+            client.log = None
+            with self.assertRaisesRegex(ValueError, "Several logs"):
+                client.query("deps", "x")
+
+        # The socket is removed once the server stops.
+        query_server, thread = self._servers.pop()
+        query_server.shutdown()
+        thread.join()
+        self.assertFalse(os.path.exists(path))
+
+    def test_tcp_concurrent(self):
+        """Test concurrent queries from several clients over TCP."""
+        query_server = self._serve({"one.log": self._dbs["one.log"]},
+                                   "localhost:0")
+        host, port = query_server.address
+
+        def run_client(idx):
+            with server.Client("{}:{}".format(host, port)) as client:
+                return [client.query("dep_count", "a") for _ in range(20)]
+
+        with concurrent.futures.ThreadPoolExecutor(5) as executor:
+            results = list(executor.map(run_client, range(5)))
+        self.assertEqual(results, [[2] * 20] * 5)
+
+    def test_bad_request(self):
+        """Test that malformed requests get an error response."""
+        path = os.path.join(self._tmpdir.name, "jamjar.sock")
+        self._serve(self._dbs, path)
+
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(path)
+            with sock.makefile("rwb") as f:
+                f.write(b"not json\n[1]\n")
+                f.flush()
+                self.assertIn(b'"error"', f.readline())
+                self.assertIn(b'"error"', f.readline())
@@ -0,0 +1,162 @@
+#------------------------------------------------------------------------------
+# test_snapshot.py - Snapshot module tests
+#
+# October 2026
+#------------------------------------------------------------------------------
+
+"""Database snapshot tests."""
+
+__all__ = ()
+
+
+import contextlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from .. import database
+from .. import parsers
+from .. import snapshot
+
+
+_LOG = """\
+>> rule Outer
+>> rule Inner
+>> Outer prog : main.o
+>>>> Inner main.o : main.c
+>>>> set CFLAGS on main.o main.c = -O2 -g
+>>>> Depends prog : main.o
+>>>> Includes main.c : <src>defs.h
+Depends "main.o" : "main.c" ;
+time -- main.c: Mon Nov  2 10:00:00 2015
+bind -- main.c: /src/main.c
+made update main.o
+   Rebuilding "prog": it is older than "main.o"
+        "main.o" inherits timestamp from "main.c"
+"""
+
+
+class SnapshotTest(unittest.TestCase):
+    """Tests for saving and loading database snapshots."""
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._logfile = os.path.join(self._dir, "jam.log")
+        with open(self._logfile, "w") as f:
+            f.write(_LOG)
+        self._db = database.Database()
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsers.parse(self._db, self._logfile, "dmc5")
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+        self._db = None
+
+    def test_round_trip(self):
+        """Test that a loaded snapshot matches the original database."""
+        path = os.path.join(self._dir, "db.snapshot")
+        snapshot.save(self._db, path)
+        loaded = snapshot.load(path)
+
+        self.assertEqual(repr(loaded), repr(self._db))
+        self.assertEqual(_dump(loaded), _dump(self._db))
+
+        # Check that object identity within the database is preserved.
+        prog = loaded.get_target("prog")
+        main_o = loaded.get_target("main.o")
+        self.assertIs(prog.deps[0], main_o)
+        self.assertIn(prog, main_o.deps_rev)
+        self.assertIs(prog.rebuild_info.dep, main_o)
+        inner_call = loaded.get_rule("Inner").calls[0]
+        self.assertIs(inner_call.caller, loaded.get_rule("Outer").calls[0])
+        self.assertIs(main_o.rule_calls["target"][0], inner_call)
+
+    def test_key_mismatch(self):
+        """Test that a snapshot isn't loaded with the wrong key."""
+        path = os.path.join(self._dir, "db.snapshot")
+        snapshot.save(self._db, path, key="a")
+        self.assertIsNone(snapshot.load(path, key="b"))
+        self.assertIsNotNone(snapshot.load(path, key="a"))
+
+    def test_not_a_snapshot(self):
+        """Test that loading something other than a snapshot fails cleanly."""
+        self.assertIsNone(snapshot.load(self._logfile))
+
+    def test_damaged(self):
+        """Test that loading a snapshot with a damaged body fails cleanly."""
+        path = os.path.join(self._dir, "db.snapshot")
+        snapshot.save(self._db, path, key="a")
+        with open(path, "rb") as f:
+            f.read(len(snapshot._MAGIC))
+            pickle.load(f)
+            body_start = f.tell()
+            body = f.read()
+
+        bodies = [
+            # Truncated.
+            body[:len(body) // 2],
+            # Not the expected layout.
+            pickle.dumps({}),
+            pickle.dumps([[1, 2], "x"]),
+            # Referring to a module that doesn't exist.
+            b"cno_such_module\nthing\n.",
+        ]
+        for damaged in bodies:
+            with self.subTest(body=damaged[:20]):
+                with open(path, "r+b") as f:
+                    f.seek(body_start)
+                    f.write(damaged)
+                    f.truncate()
+                self.assertIsNone(snapshot.load(path, key="a"))
+
+    def test_cache(self):
+        """Test that a cached snapshot is only used while the log is unchanged."""
+        cache_dir = os.path.join(self._dir, "cache")
+        self.assertIsNone(
+            snapshot.load_cached(self._logfile, "dmc5", cache_dir=cache_dir))
+
+        snapshot.save_cached(self._db, self._logfile, "dmc5",
+                             cache_dir=cache_dir)
+        loaded = snapshot.load_cached(self._logfile, "dmc5",
+                                      cache_dir=cache_dir)
+        self.assertEqual(_dump(loaded), _dump(self._db))
+        self.assertIsNone(
+            snapshot.load_cached(self._logfile, "dd", cache_dir=cache_dir))
+
+        with open(self._logfile, "a") as f:
+            f.write('Depends "prog" : "extra" ;\n')
+        self.assertIsNone(
+            snapshot.load_cached(self._logfile, "dmc5", cache_dir=cache_dir))
+
+
+def _dump(db):
+    """Summarise the full contents of a database for comparison."""
+    names = lambda targets: (None if targets is None
+                             else [target.name for target in targets])
+    targets = {
+        target.name: (names(target.deps),
+                      sorted(names(target.deps_rev)),
+                      names(target.incs),
+                      sorted(names(target.incs_rev)),
+                      target.timestamp,
+                      target.binding,
+                      target.rebuilt,
+                      target.rebuild_info.reason,
+                      target.rebuild_info.dep and target.rebuild_info.dep.name,
+                      names(target.timestamp_chain),
+                      list(target.variables.items()),
+                      {target_type: [call.get_id() for call in calls]
+                       for target_type, calls in target.rule_calls.items()})
+        for target in db.find_targets("")
+    }
+    rules = {
+        rule.name: [(call.get_as_string(),
+                     call.caller and call.caller.get_id(),
+                     [sub_call.get_id() for sub_call in call.sub_calls])
+                    for call in rule.calls]
+        for rule in db.find_rules("")
+    }
+    return targets, rules
@@ -4,9 +4,111 @@
 # November 2015, Zoe Kelly
 #------------------------------------------------------------------------------
 
-import cmd, sys, io, pydoc
+import cmd, sys, io, os, shlex, shutil, subprocess
 
-from . import database, query
+from . import batch, database
+
+
+class _PagerOutput:
+    """
+    File-like object that streams everything written to it into a pager.
+
+    The pager is only started once something is written. Writes block while
+    the pager isn't reading (e.g. while it waits for the user to scroll), so
+    output is produced no faster than it's viewed. Once the user quits the
+    pager, writes raise BrokenPipeError.
+    """
+    def __init__(self, command):
+        self._command = command
+        self._pager = None
+        self._stream = None
+
+    def write(self, text):
+        if self._stream is None:
+            self._start()
+        return self._stream.write(text)
+
+    def flush(self):
+        if self._stream is not None:
+            self._stream.flush()
+
+    def close(self):
+        """End the output, and wait for the user to quit the pager."""
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except BrokenPipeError:
+                pass
+            self._pager.wait()
+
+    def _start(self):
+        env = dict(os.environ)
+        # As git does, have less exit straight away if everything fits on
+        # one screen, and leave the output on the screen when it exits.
+        env.setdefault("LESS", "FRX")
+        self._pager = subprocess.Popen(self._command, shell=True,
+                                       stdin=subprocess.PIPE, env=env)
+        # Send each line as soon as it's written.
+        self._stream = io.TextIOWrapper(self._pager.stdin,
+                                        encoding=sys.__stdout__.encoding,
+                                        errors="backslashreplace",
+                                        line_buffering=True)
+
+
+def _pager_command():
+    """Get the command to page output with, or None if it can't be paged."""
+    if not sys.__stdout__.isatty() or os.environ.get("TERM") == "dumb":
+        return None
+    command = os.environ.get("PAGER") or "less"
+    try:
+        program = shlex.split(command)[0]
+    except (ValueError, IndexError):
+        return None
+    return command if shutil.which(program) is not None else None
+
+
+def _format_count(count):
+    """Format a count, in scientific notation if it has more than 6 digits."""
+    if count < 10 ** 6:
+        return str(count)
+    # Chain counts can be far too big to convert to a float, so find the
+    # leading digits with integer arithmetic. Start from an underestimate of
+    # the exponent, from the number of bits.
+    exponent = (count.bit_length() - 1) * 30102 // 100000
+    while 10 ** (exponent + 1) <= count:
+        exponent += 1
+    leading = count // 10 ** (exponent - 1)
+    return "{}.{}e+{:02}".format(leading // 10, leading % 10, exponent)
+
+
+class _LocalQueries:
+    """Runs queries (see :func:`batch.run_query`) on a database."""
+    def __init__(self, db):
+        self.database = db
+
+    def refresh(self):
+        # Pick up anything parsed from the log since the last command.
+        self.database.refresh()
+
+    def query(self, name, *args):
+        return batch.run_query(self.database, name, list(args))
+
+
+class _RemoteQueries:
+    """Runs queries on a database held by a server."""
+    def __init__(self, client):
+        self.client = client
+
+    def refresh(self):
+        # Databases don't change while they're being served.
+        pass
+
+    def query(self, name, *args):
+        try:
+            return self.client.query(name, *args)
+        except BrokenPipeError as e:
+            # Don't let this be mistaken for the user quitting the pager.
+            raise ConnectionError(str(e)) from e
 
 
 class _BaseCmd(cmd.Cmd):
@@ -32,6 +134,23 @@ class _BaseCmd(cmd.Cmd):
             return super().onecmd(line)
         except KeyboardInterrupt:
             pass
+        except BrokenPipeError:
+            # The user quit the pager before the command finished.
+            if self.out is None:
+                raise
+        except OSError:
+            # The connection to a query server was lost, which ends the
+            # session. Finish any paged output first.
+            self.flush_pager()
+            raise
+
+    def _query(self, query_name, *args):
+        """Run a query with the mode's backend, printing any error."""
+        try:
+            return self.queries.query(query_name, *args)
+        except ValueError as e:
+            print(e)
+            return None
 
     def turn_paging_on(self):
         self.paging_on = True
@@ -41,28 +160,42 @@ class _BaseCmd(cmd.Cmd):
         sys.stdout = sys.__stdout__
 
     def precmd(self, line):
+        self.queries.refresh()
         self.start_pager()
         return (line)
 
     def start_pager(self):
+        """Send the output of the next command to a pager, if paging is on."""
         if self.paging_on:
-            self.out = io.StringIO()
-            sys.stdout = self.out
+            command = _pager_command()
+            if command is not None:
+                self.out = _PagerOutput(command)
+                sys.stdout = self.out
 
     def postcmd(self, stop, line):
         self.flush_pager()
         return (stop)
 
     def flush_pager(self):
+        """Finish paging the output of a command."""
        # Reset
         sys.stdout = sys.__stdout__
 
-        if self.paging_on:
-            # Page output of this command
-            if self.out is not None:
-                pydoc.pager(self.out.getvalue())
+        if self.out is not None:
+            self.out.close()
         self.out = None
 
+    def run_submode(self, submode):
+        """
+        Run a submode's command loop.
+
+        Output of the current command is finished first, so that the pager
+        and the submode's prompt don't both try to use the terminal.
+        """
+        self.flush_pager()
+        submode.stdout = sys.stdout
+        submode.cmdloop()
+
     def do_paging_off(self, arg):
         """"Turn paging off"""
         self.turn_paging_off()
@@ -101,53 +234,38 @@ class _BaseCmd(cmd.Cmd):
             return "({}) ".format(prompt_string)
 
 
-class UI(_BaseCmd):
-    def __init__(self, db, *, paging_on=False):
-        super().__init__(paging_on)
-        self.file = None
-        self.intro = "Welcome to JamJar.  Type help or ? to list commands.\n"
-        self.prompt = self.format_prompt("jamjar", "green")
-        self.database = db
+class _MainMode(_BaseCmd):
+    """
+    Base class for the top level of the UI.
 
+    Subclasses set self.queries to the backend that runs queries (e.g.
+    :class:`_LocalQueries`), and create the submode for a target.
+    """
     def do_targets(self, target_string):
         """Get information about targets matching a regex."""
-        try:
-            target_list = list(self.database.find_targets(target_string))
-        except ValueError as e:
-            print("Invalid target string: {}".format(str(e)))
-            return
-        if len(target_list) == 0:
-            print("No targets found")
-        elif len(target_list) == 1:
-            TargetSubmode(target=target_list[0],
-                          paging_on=self.paging_on,
-                          db=self.database).cmdloop()
-        else:
-            target = self._target_selection(target_list)
-            if target is not None:
-                TargetSubmode(target=target,
-                              paging_on=self.paging_on,
-                              db=self.database).cmdloop()
+        self._select_target("targets", target_string)
 
     def do_rebuilt_targets(self, target_string):
         """Get information about targets that were rebuilt matching a regex."""
-        try:
-            target_list = list(self.database.find_rebuilt_targets(target_string))
-        except ValueError as e:
-            print("Invalid target string: {}".format(str(e)))
+        self._select_target("rebuilt_targets", target_string)
+
+    def _select_target(self, query_name, target_string):
+        target_list = self._query(query_name, target_string)
+        if target_list is None:
             return
         if len(target_list) == 0:
             print("No targets found")
+            return
         elif len(target_list) == 1:
-            TargetSubmode(target=target_list[0],
-                          paging_on=self.paging_on,
-                          db=self.database).cmdloop()
+            target = target_list[0]
         else:
             target = self._target_selection(target_list)
-            if target is not None:
-                TargetSubmode(target=target,
-                              paging_on=self.paging_on,
-                              db=self.database).cmdloop()
+        if target is not None:
+            self.run_submode(self._target_submode(target))
+
+    def _target_submode(self, name):
+        """Create the submode for the target with a given name."""
+        raise NotImplementedError
 
     def _target_selection(self, targets):
         for idx, target in enumerate(targets):
@@ -174,6 +292,50 @@ class UI(_BaseCmd):
                 break
         return target
 
+    def do_impact(self, arg):
+        """
+        Show the targets affected by changes to targets or files.
+        usage: impact NAME...
+        """
+        if not arg.split():
+            print("usage: impact NAME...")
+            return
+        result = self._query("impact", *arg.split())
+        if result is None:
+            return
+        print("{} targets affected by changes to:".format(result["count"]))
+        for target in result["changed"]:
+            print("    {}".format(target))
+        print("affected targets:")
+        for target in result["targets"]:
+            print("    {}".format(target))
+
+    def do_cycles(self, arg):
+        """Show all dependency cycles, largest first."""
+        cycles = self._query("cycles")
+        if cycles is None:
+            return
+        print("{} cycles".format(len(cycles)))
+        for cycle in cycles:
+            print("{} targets:".format(len(cycle)))
+            for target in cycle:
+                print("    {}".format(target))
+
+
+class UI(_MainMode):
+    def __init__(self, db, *, paging_on=False):
+        super().__init__(paging_on)
+        self.file = None
+        self.intro = "Welcome to JamJar.  Type help or ? to list commands.\n"
+        self.prompt = self.format_prompt("jamjar", "green")
+        self.database = db
+        self.queries = _LocalQueries(db)
+
+    def _target_submode(self, name):
+        return TargetSubmode(target=self.database.lookup_target(name),
+                             paging_on=self.paging_on,
+                             db=self.database)
+
     def do_rules(self, rule_string):
         """Get information about rules matching a regex."""
         try:
@@ -184,15 +346,15 @@ class UI(_BaseCmd):
         if len(rules_list) == 0:
             print("No rules found")
         elif len(rules_list) == 1:
-            RuleSubmode(rule=rules_list[0],
-                        paging_on=self.paging_on,
-                        db=self.database).cmdloop()
+            self.run_submode(RuleSubmode(rule=rules_list[0],
+                                         paging_on=self.paging_on,
+                                         db=self.database))
         else:
             rule = self._rule_selection(rules_list)
             if rule is not None:
-                RuleSubmode(rule=rule,
-                            paging_on=self.paging_on,
-                            db=self.database).cmdloop()
+                self.run_submode(RuleSubmode(rule=rule,
+                                             paging_on=self.paging_on,
+                                             db=self.database))
 
     def _rule_selection(self, rules):
         for idx, rule in enumerate(rules):
@@ -228,43 +390,26 @@ class Submode(_BaseCmd):
     def __init__(self, paging_on, db):
         super().__init__(paging_on)
         self.database = db
+        self.queries = _LocalQueries(db)
 
     def do_switch_to_target(self, target_string):
         """Switch to the TargetSubmode for the specified target"""
-        try:
-            target_list = list(self.database.find_targets(target_string))
-        except ValueError as err:
-            print("Invalid target string: {}".format(str(err)))
-            return
-
-        target = None
-        for targ in target_list:
-            if targ.name == target_string:
-                target = targ
+        target = self.database.lookup_target(target_string)
         if target != None:
-            TargetSubmode(target=target,
-                          paging_on=self.paging_on,
-                          db=self.database).cmdloop()
+            self.run_submode(TargetSubmode(target=target,
+                                           paging_on=self.paging_on,
+                                           db=self.database))
             return True
         else:
             print("Target {} not found".format(target_string))
 
     def do_switch_to_rule(self, rule_string):
         """Switch to the RuleSubmode for the specified rule"""
-        try:
-            rule_list = list(self.database.find_rules(rule_string))
-        except ValueError as err:
-            print("Invalid rule string: {}".format(str(err)))
-            return
-
-        matching_rule = None
-        for rule in rule_list:
-            if rule.name == rule_string:
-                matching_rule = rule
+        matching_rule = self.database.get_rule(rule_string)
         if matching_rule != None:
-            RuleSubmode(rule=matching_rule,
-                        paging_on=self.paging_on,
-                        db=self.database).cmdloop()
+            self.run_submode(RuleSubmode(rule=matching_rule,
+                                         paging_on=self.paging_on,
+                                         db=self.database))
             return True
         else:
             print("Rule {} not found".format(rule_string))
@@ -288,16 +433,7 @@ class Submode(_BaseCmd):
             print("Invalid format (id not a number), should match: ExampleRule#81")
             return
 
-        try:
-            rule_list = list(self.database.find_rules(rule_string))
-        except ValueError as err:
-            print("Invalid rule part of string: {}".format(str(err)))
-            return
-
-        matching_rule = None
-        for rule in rule_list:
-            if rule.name == rule_string:
-                matching_rule = rule
+        matching_rule = self.database.get_rule(rule_string)
         if matching_rule is None:
             print("Rule {} not found".format(rule_string))
             return
@@ -311,120 +447,216 @@ class Submode(_BaseCmd):
             print("{} is not an existing id for rule {}".format(id_string, rule_string))
             return
 
-        RuleCallSubmode(call=call,
-                        paging_on=self.paging_on,
-                        db=self.database).cmdloop()
+        self.run_submode(RuleCallSubmode(call=call,
+                                         paging_on=self.paging_on,
+                                         db=self.database))
         return True
 
 
-class TargetSubmode(Submode):
-    """ Submode to interact with a particular target """
-    def __init__(self, target, *, paging_on, db=None):
-        super().__init__(paging_on, db)
-        self.target = target
-        self.prompt = self.format_prompt(self.target.brief_name(), "green")
+class _TargetCommands(_BaseCmd):
+    """
+    Base class for target submodes, with the commands that query the
+    dependency graph. Subclasses set self.queries to the backend that runs
+    queries, and self.target_name to the name of the target to query.
+    """
+    def _target_query(self, query_name, *args, usage=None):
+        """Run a query on the current target, printing any error."""
+        result = self._query(query_name, self.target_name, *args)
+        if result is None and usage is not None:
+            print("usage: {}".format(usage))
+        return result
 
     def do_deps(self, arg):
         """
         Show all direct dependencies, including those arising from includes.
         """
-        self._print_targets(query.deps(self.target))
+        self._print_targets(self._target_query("deps") or ())
 
     def do_deps_rebuilt(self, arg):
         """Show direct dependencies that have been rebuilt."""
-        self._print_targets(query.deps_rebuilt(self.target))
+        self._print_targets(self._target_query("deps_rebuilt") or ())
+
+    def do_all_deps(self, arg):
+        """Show all direct and indirect dependencies, each only once."""
+        deps = self._target_query("all_deps")
+        if deps is not None:
+            print("{} dependencies:".format(len(deps)))
+            self._print_targets(deps)
+
+    def do_impact(self, arg):
+        """
+        Show all targets affected by a change to this target: everything that
+        depends on it (directly or indirectly), or includes it.
+        """
+        result = self._query("impact", self.target_name)
+        if result is not None:
+            print("{} targets affected:".format(result["count"]))
+            self._print_targets(result["targets"])
+
+    def do_cycle(self, arg):
+        """Show the dependency cycle this target is in, if any."""
+        cycle = self._target_query("cycle")
+        if cycle is None:
+            return
+        elif not cycle:
+            print("{} is not in a cycle".format(self.target_name))
+        else:
+            print("{} targets in cycle:".format(len(cycle)))
+            self._print_targets(cycle)
+
+    def do_depends_on(self, target_string):
+        """Show whether this target depends (indirectly) on another target."""
+        result = self._target_query("depends_on", target_string)
+        if result is None:
+            return
+        elif result:
+            print("{} depends on {}".format(self.target_name, target_string))
+        else:
+            print("{} does not depend on {}".format(self.target_name,
+                                                    target_string))
+
+    def do_path_to(self, arg):
+        """
+        Show the shortest dependency chains from this target to another.
+        usage: path_to TARGET [k=N]
+        """
+        args = arg.split()
+        if not args:
+            print("usage: path_to TARGET [k=N]")
+            return
+        paths = self._target_query("shortest_paths", *args,
+                                   usage="path_to TARGET [k=N]")
+        if paths is None:
+            return
+        if not paths:
+            print("{} does not depend on {}".format(self.target_name,
+                                                    args[0]))
+        for path in paths:
+            self._print_chain(path)
 
     def do_dep_chains(self, arg):
-        """Show all chains of dependencies below this target."""
-        # Yuck.
-        kwargs = self._arg_to_kwargs(arg)
-        if "max_depth" in kwargs:
-            kwargs["max_depth"] = int(kwargs["max_depth"])
-        for chain in query.dep_chains(self.target, **kwargs):
-            self._print_chain(chain)
+        """
+        Show chains of dependencies below this target (the first 100, by
+        default).
+        usage: dep_chains [max_depth=N] [limit=N]
+        """
+        self._print_chains(self._target_query(
+            "dep_chains", *arg.split(),
+            usage="dep_chains [max_depth=N] [limit=N]"))
 
     def do_dep_chains_rebuilt(self, arg):
-        """Show all chains of dependencies below this target."""
-        for chain in query.dep_chains_rebuilt(self.target):
-            self._print_chain(chain)
+        """
+        Show chains of rebuilt dependencies below this target (the first 100,
+        by default).
+        usage: dep_chains_rebuilt [limit=N]
+        """
+        self._print_chains(self._target_query(
+            "dep_chains_rebuilt", *arg.split(),
+            usage="dep_chains_rebuilt [limit=N]"))
 
     def do_rebuild_chains(self, arg):
-        """Show Jam's view on why this target was rebuilt."""
-        for chain in query.rebuild_chains(self.target):
-            self._print_chain(chain)
+        """
+        Show Jam's view on why this target was rebuilt.
+
+        Shown as a tree: each target was rebuilt because of the targets
+        indented below it. Targets that have already been shown, along with
+        their causes, are marked (see above) rather than being repeated.
+        """
+        tree = self._target_query("rebuild_tree") or ()
+        for depth, target, repeated in tree:
+            print("{}{}{}".format("  " * depth,
+                                  target,
+                                  " (see above)" if repeated else ""))
 
     def do_show(self, arg):
         """Dump all available meta-data for this target."""
-        print("name:", self.target.name)
-        print("depends on:")
-        self._print_targets(self.target.deps)
-        print("depended on by:")
-        self._print_targets(self.target.deps_rev)
-        print("includes:")
-        self._print_targets(self.target.incs)
-        print("included by:")
-        self._print_targets(self.target.incs_rev)
+        info = self._target_query("show")
+        if info is None:
+            return
+        print("name:", info["name"])
+        for label, key in (("depends on:", "deps"),
+                           ("depended on by:", "deps_rev"),
+                           ("includes:", "incs"),
+                           ("included by:", "incs_rev")):
+            print(label)
+            self._print_targets(info[key])
         print("variables:")
-        for key in self.target.variables:
-            print("    {} = {}".format(key, self.target.variables[key]))
-        if "target" in self.target.rule_calls:
-            print("target of:")
-            for rule_name in self.target.rule_calls["target"]:
-                print("    {}".format(rule_name))
-        if "source" in self.target.rule_calls:
-            print("source for:")
-            for rule_name in self.target.rule_calls["source"]:
-                print("    {}".format(rule_name))
-        if "other" in self.target.rule_calls:
-            print("higher ordered target in:")
-            for rule_name in self.target.rule_calls["other"]:
-                print("    {}".format(rule_name))
-        if (self.target.timestamp_chain is not None and
-                len(self.target.timestamp_chain) > 0):
-            print("timestamp:", self.target.timestamp_chain[-1].timestamp)
+        for key, values in info["variables"].items():
+            print("    {} = {}".format(key, values))
+        for label, target_type in (("target of:", "target"),
+                                   ("source for:", "source"),
+                                   ("higher ordered target in:", "other")):
+            if target_type in info["rule_calls"]:
+                print(label)
+                for call_id in info["rule_calls"][target_type]:
+                    print("    {}".format(call_id))
+        print("timestamp:", info["timestamp"])
+        if info["timestamp_chain"]:
             print("timestamp inherited from:")
-            self._print_targets(self.target.timestamp_chain)
+            self._print_targets(info["timestamp_chain"])
+        print("binding:", info["binding"])
+        print("rebuilt:", info["rebuilt"])
+        if info["rebuilt"]:
+            print("    rebuilt reason:", info["rebuild_reason"])
+            if info["rebuild_dep"] is not None:
+                print("    dependency:", info["rebuild_dep"])
+
+    def _print_chains(self, result):
+        """Print a summary line, then the chains in a dep_chains result."""
+        if result is None:
+            return
+        count = result["count"]
+        chains = result["chains"]
+        count_string = _format_count(count)
+        if len(chains) < count:
+            print("{} chains, first {} shown".format(count_string,
+                                                     len(chains)))
         else:
-            print("timestamp:", self.target.timestamp)
-        print("binding:", self.target.binding)
-        print("rebuilt:", self.target.rebuilt)
-        if self.target.rebuilt:
-            print("    rebuilt reason:", self.target.rebuild_info.reason)
-            if self.target.rebuild_info.dep is not None:
-                print("    dependency:", self.target.rebuild_info.dep.name)
+            print("{} chains".format(count_string))
+        for chain in chains:
+            self._print_chain(chain)
+
+    def _print_chain(self, chain):
+        """Print a sequence of target names forming a dependency chain."""
+        print(" -> ".join(chain))
+
+    def _print_targets(self, targets):
+        """Print a sequence of target names."""
+        for target in targets:
+            print("    {}".format(target))
+
+
+class TargetSubmode(_TargetCommands, Submode):
+    """ Submode to interact with a particular target """
+    def __init__(self, target, *, paging_on, db=None):
+        super().__init__(paging_on, db)
+        self.target = target
+        self.target_name = target.name
+        self.prompt = self.format_prompt(self.target.brief_name(), "green")
 
     def do_alternative_grists(self, arg):
         """
         Show the grists of all the targets with the same
         filename as the current target.
         """
-        filename = self.target.filename()
-        targets = list(self.database.find_targets(filename))
-        grists = list()
-        for target in targets:
-            if target.filename() == filename:
-                grists.append(target.grist())
+        grists = self.database.find_grists(self.target.filename())
         grists.sort()
         for grist in grists:
             print("    {}".format(grist))
 
-    def _arg_to_kwargs(self, arg):
-        """Parse an input argument consisting of param=value pairs."""
-        kwargs = {}
-        args = arg.split()
-        for arg in args:
-            key, value = arg.split("=")
-            kwargs[key] = value
-        return kwargs
-
-    def _print_chain(self, chain):
-        """Print a sequence of targets forming a dependency chain."""
-        print(" -> ".join(target.name for target in chain))
+    def do_same_value(self, variable_name):
+        """
+        Show the other targets where a target specific variable has the same
+        value as on the current target.
+        """
+        values = self.target.variables.get(variable_name)
+        if values is None:
+            print("Variable {} not set on this target".format(variable_name))
+            return
+        targets = self.database.targets_with_var_value(values, variable_name)
+        self._print_targets(target.name for target in targets
+                            if target is not self.target)
 
-    def _print_targets(self, targets):
-        """Print a sequence of targets."""
-        for target in targets:
-            print("    {}".format(target.name))
 
 class RuleSubmode(Submode):
     """ Submode to interact with a jam rule """
@@ -464,8 +696,9 @@ class RuleSubmode(Submode):
                 break
 
         if call is not None:
-            RuleCallSubmode(call=call,
-                            paging_on=self.paging_on).cmdloop()
+            self.run_submode(RuleCallSubmode(call=call,
+                                             paging_on=self.paging_on,
+                                             db=self.database))
 
 
 class RuleCallSubmode(Submode):
@@ -517,3 +750,31 @@ class RuleCallSubmode(Submode):
         while len(stack) > 0:
             print(stack.pop())
 
+
+class RemoteUI(_MainMode):
+    """
+    UI for querying a database held by a server (see :mod:`jamjar.server`).
+
+    This provides the same commands as :class:`UI` for finding targets, and
+    :class:`RemoteTargetSubmode` the same query commands as
+    :class:`TargetSubmode`.
+    """
+    def __init__(self, client, *, paging_on=False):
+        super().__init__(paging_on)
+        self.queries = _RemoteQueries(client)
+        self.intro = ("Welcome to JamJar (remote).  Type help or ? to list "
+                      "commands.\n")
+        self.prompt = self.format_prompt("jamjar", "green")
+
+    def _target_submode(self, name):
+        return RemoteTargetSubmode(name, queries=self.queries,
+                                   paging_on=self.paging_on)
+
+
+class RemoteTargetSubmode(_TargetCommands):
+    """ Submode to interact with a particular target held by a server """
+    def __init__(self, target, *, queries, paging_on):
+        super().__init__(paging_on)
+        self.queries = queries
+        self.target_name = target
+        self.prompt = self.format_prompt(target, "green")